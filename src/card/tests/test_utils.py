@@ -0,0 +1,42 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from card.utils import get_card_number_owners, is_duplicate
+from make_queue.models.course import Printer3DCourse
+from users.models import User
+
+
+class CardUtilsTests(TestCase):
+    def setUp(self):
+        User.objects.create_user("user1", card_number="0000000001")
+        Printer3DCourse.objects.create(
+            username="course_user",
+            date=timezone.localdate(),
+            _card_number="0000000002",
+        )
+
+    def test_get_card_number_owners_searches_users_and_courses_in_one_query(self):
+        with CaptureQueriesContext(connection) as context:
+            owners = get_card_number_owners(["0000000001", "0000000002", "0000000003"])
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertSetEqual(
+            set(owners), {("0000000001", "user1"), ("0000000002", "course_user")}
+        )
+        self.assertListEqual(get_card_number_owners([]), [])
+
+    def test_get_card_number_owners_normalizes_card_numbers(self):
+        # Scanned card numbers can have an `EM` prefix, but should be returned in the
+        # same form as they're stored in the database
+        self.assertSetEqual(
+            set(get_card_number_owners(["EM 0000000001", " EM 0000000002 ", ""])),
+            {("0000000001", "user1"), ("0000000002", "course_user")},
+        )
+
+    def test_is_duplicate(self):
+        self.assertTrue(is_duplicate("0000000001", "user2"))
+        self.assertFalse(is_duplicate("0000000001", "user1"))
+        self.assertTrue(is_duplicate("EM 0000000002", "user1"))
+        self.assertFalse(is_duplicate("0000000002", "course_user"))
+        self.assertFalse(is_duplicate("0000000003", "user1"))
@@ -1,3 +1,5 @@
+from collections.abc import Iterable
+
 from django.core.exceptions import ValidationError
 
 from card.formfields import CardNumberField
@@ -20,6 +22,43 @@ def is_valid(card_number):
     return True
 
 
+def get_db_card_number(card_number) -> str | None:
+    """
+    :param card_number: A card number string - possibly with an ``EM`` prefix - or a
+        ``CardNumber``
+    :return: ``card_number`` in the form it's stored in the database, i.e. without a
+        possible ``EM`` prefix - or ``None`` if it's empty
+    """
+    return User._meta.get_field("card_number").get_prep_value(card_number)
+
+
+def get_card_number_owners(card_numbers: Iterable[str]) -> list[tuple[str, str]]:
+    """
+    Finds the users and 3D printer courses that the card numbers belong to, using a
+    single query.
+
+    :param card_numbers: The card numbers to look for, in any of the forms accepted by
+        ``get_db_card_number()``
+    :return: Tuples of each card number that is in use - in the form returned by
+        ``get_db_card_number()`` - and the username of the user or course it belongs to
+    """
+    card_numbers = {get_db_card_number(card_number) for card_number in card_numbers}
+    card_numbers.discard(None)
+    if not card_numbers:
+        return []
+    owners = User.objects.filter(card_number__in=card_numbers).values_list(
+        "card_number", "username"
+    )
+    course_owners = Printer3DCourse.objects.filter(
+        _card_number__in=card_numbers
+    ).values_list("_card_number", "username")
+    return [
+        # (The card numbers are converted to `CardNumber` objects by the model field)
+        (card_number.number, username)
+        for card_number, username in owners.union(course_owners, all=True)
+    ]
+
+
 def is_duplicate(card_number, username):
     """
     Checks if given card number is a duplicate. Excludes card number connected to user
@@ -29,9 +68,7 @@ def is_duplicate(card_number, username):
     :param username: username of user to exclude
     :return: True if card_number is duplicate
     """
-    return (
-        User.objects.filter(card_number=card_number).exclude(username=username).exists()
-        or Printer3DCourse.objects.filter(_card_number=card_number)
-        .exclude(username=username)
-        .exists()
+    return any(
+        owner_username != username
+        for _card_number, owner_username in get_card_number_owners([card_number])
     )
@@ -1,12 +1,14 @@
-from datetime import timedelta
+from dataclasses import asdict
 from http import HTTPStatus
 
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.http import HttpResponse
 from django.utils import timezone
+from django.views import View
 from django.views.generic import DeleteView, TemplateView
 
 from card import utils as card_utils
+from checkin import card_registration
 from checkin.models import RegisterProfile, Skill, SuggestSkill
 from util.view_utils import PreventGetRequestsMixin, UTF8JsonResponse
 
@@ -61,18 +63,22 @@ class AdminAPISuggestSkillDeleteView(
 
 class AdminAPIRegisterProfileView(PreventGetRequestsMixin, TemplateView):
     def post(self, request):
-        scan_exists = RegisterProfile.objects.exists()
+        reader_scans = RegisterProfile.objects.filter(
+            reader=request.POST.get("reader", ""), batch=False
+        )
+        latest_scan = reader_scans.order_by("-last_scan").first()
+        scan_exists = latest_scan is not None
         response_dict = {
             "scan_exists": scan_exists,
             "scan_is_recent": False,
         }
         if scan_exists:
             scan_is_recent = (
-                timezone.now() - RegisterProfile.objects.first().last_scan
-            ) < timedelta(seconds=60)
+                timezone.now() - latest_scan.last_scan
+            ) < RegisterProfile.SCAN_TIME_TO_LIVE
             response_dict["scan_is_recent"] = scan_is_recent
             if scan_is_recent:
-                card_number = RegisterProfile.objects.first().card_id
+                card_number = latest_scan.card_id
                 is_duplicate = card_utils.is_duplicate(
                     card_number, request.user.username
                 )
@@ -80,5 +86,30 @@ class AdminAPIRegisterProfileView(PreventGetRequestsMixin, TemplateView):
                     return HttpResponse(status=HTTPStatus.CONFLICT)
                 request.user.card_number = card_number
                 request.user.save()
-        RegisterProfile.objects.all().delete()
+        reader_scans.delete()
         return UTF8JsonResponse(response_dict)
+
+
+class AdminAPIRegisterCardBatchView(
+    PermissionRequiredMixin, PreventGetRequestsMixin, View
+):
+    """
+    Registers the cards scanned in batch mode by the ``reader`` to the users with the
+    ``usernames`` - in the order the cards were scanned.
+    See ``card_registration.register_card_batch()``.
+    """
+
+    permission_required = ("users.change_user",)
+
+    def post(self, request):
+        try:
+            result = card_registration.register_card_batch(
+                reader=request.POST.get("reader", ""),
+                usernames=request.POST.getlist("usernames"),
+            )
+        except ValueError as e:
+            return UTF8JsonResponse({"error": str(e)}, status=HTTPStatus.BAD_REQUEST)
+        return UTF8JsonResponse(
+            asdict(result),
+            status=HTTPStatus.OK if result.succeeded else HTTPStatus.CONFLICT,
+        )
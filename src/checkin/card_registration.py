@@ -0,0 +1,114 @@
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from card import utils as card_utils
+from checkin.consumers import broadcast_card_scan_on_commit
+from checkin.models import RegisterProfile
+from users.models import User
+
+
+def stage_card_scan(card_number: str, *, reader: str, batch: bool):
+    """
+    Stores a scan of ``card_number`` by ``reader``, for registering it to a user, and
+    sends it to the clients listening to the reader through ``CardScanConsumer``.
+    Expired scans (of all readers) are deleted.
+
+    :param batch: Whether the scan should be added to the reader's previous scans in
+        batch mode - so that a whole group's cards can be registered at once using
+        ``register_card_batch()`` - instead of replacing them
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        RegisterProfile.objects.expired(now).delete()
+        reader_scans = RegisterProfile.objects.filter(reader=reader)
+        if not batch:
+            reader_scans.delete()
+        else:
+            # Scans from outside of batch mode are not part of the batch
+            reader_scans.filter(batch=False).delete()
+            # Prevents the batch from expiring while cards are still being scanned
+            # (the batch is ordered by pk, so the scan order is not changed)
+            reader_scans.update(last_scan=now)
+            if reader_scans.filter(card_id=card_number).exists():
+                # The card has already been scanned as part of the batch
+                return
+        scan = RegisterProfile.objects.create(
+            card_id=card_number, last_scan=now, reader=reader, batch=batch
+        )
+        broadcast_card_scan_on_commit(scan)
+
+
+@dataclass(kw_only=True)
+class CardBatchResult:
+    registered_usernames: list[str] = field(default_factory=list)
+    # The scanned card numbers that already belong to other users or courses
+    duplicate_card_numbers: list[str] = field(default_factory=list)
+    unknown_usernames: list[str] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.duplicate_card_numbers and not self.unknown_usernames
+
+
+def register_card_batch(*, reader: str, usernames: Sequence[str]) -> CardBatchResult:
+    """
+    Registers the cards scanned in batch mode by ``reader`` to the users with
+    ``usernames`` - in the order the cards were scanned - in a single transaction.
+    The card numbers are checked for duplicates using a single query; if any of them
+    are duplicates, or any of the users don't exist, nothing is registered, and the
+    scans are kept, so that the batch can be corrected and registered again.
+
+    :raise ValueError: If the number of usernames doesn't match the number of scans,
+        or the usernames are not unique
+    """
+    with transaction.atomic():
+        scans = list(
+            RegisterProfile.objects.select_for_update()
+            .unexpired()
+            .filter(reader=reader, batch=True)
+            .order_by("pk")
+        )
+        if len(scans) != len(usernames):
+            raise ValueError(
+                f"{len(usernames)} usernames were given for {len(scans)} scanned cards."
+            )
+        if len(set(usernames)) != len(usernames):
+            raise ValueError("Each user can only be registered one card.")
+        # (The card numbers are compared to the ones returned by
+        # `get_card_number_owners()`, so they must be in the same form)
+        username_to_card_number = {
+            username: card_utils.get_db_card_number(scan.card_id)
+            for username, scan in zip(usernames, scans, strict=True)
+        }
+        card_number_to_username = {
+            card_number: username
+            for username, card_number in username_to_card_number.items()
+        }
+
+        users = User.objects.in_bulk(usernames, field_name="username")
+        card_number_owners = card_utils.get_card_number_owners(card_number_to_username)
+        result = CardBatchResult(
+            duplicate_card_numbers=sorted(
+                {
+                    card_number
+                    for card_number, owner_username in card_number_owners
+                    if owner_username != card_number_to_username.get(card_number)
+                }
+            ),
+            unknown_usernames=[
+                username for username in usernames if username not in users
+            ],
+        )
+        if not result.succeeded:
+            return result
+
+        for username, user in users.items():
+            user.card_number = username_to_card_number[username]
+        User.objects.bulk_update(users.values(), ["card_number"])
+        RegisterProfile.objects.filter(pk__in=[scan.pk for scan in scans]).delete()
+
+    result.registered_usernames = list(usernames)
+    return result
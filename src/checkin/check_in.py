@@ -0,0 +1,42 @@
+from django.db import connection
+from django.utils import timezone
+
+from card import utils as card_utils
+from checkin.models import Profile
+from users.models import User
+
+
+def toggle_check_in(card_number) -> tuple[int, bool] | None:
+    """
+    Checks the user with ``card_number`` in if they're checked out, and out if they're
+    checked in.
+    This is done with a single ``UPDATE ... RETURNING`` query, which looks the profile
+    up through the card number.
+
+    :return: The pk of the profile, and whether it's checked in after the toggle - or
+        ``None`` if no profile belongs to ``card_number``
+    """
+    card_number = card_utils.get_db_card_number(card_number)
+    if card_number is None:
+        return None
+
+    profile_table = Profile._meta.db_table
+    user_table = User._meta.db_table
+    last_checkin = Profile._meta.get_field("last_checkin").get_db_prep_value(
+        timezone.now(), connection
+    )
+    with connection.cursor() as cursor:
+        # (The right-hand sides of the assignments refer to the old values)
+        cursor.execute(
+            f"UPDATE {profile_table}"
+            " SET on_make = NOT on_make,"
+            " last_checkin = CASE WHEN on_make THEN last_checkin ELSE %s END"
+            f" WHERE user_id = (SELECT id FROM {user_table} WHERE card_number = %s)"
+            " RETURNING id, on_make",
+            [last_checkin, card_number],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    profile_pk, on_make = row
+    return profile_pk, bool(on_make)
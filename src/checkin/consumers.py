@@ -0,0 +1,81 @@
+import hashlib
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from checkin.models import RegisterProfile
+from util.logging_utils import get_request_logger
+
+
+def get_card_scans_group_name(reader: str) -> str:
+    # (Group names can only contain some ASCII characters, so the reader is hashed)
+    return f"checkin.card_scans.{hashlib.md5(reader.encode()).hexdigest()}"
+
+
+def broadcast_card_scan_on_commit(scan: RegisterProfile):
+    """
+    Sends ``scan`` to the websocket clients listening to its reader through
+    ``CardScanConsumer``, when the current transaction is committed - or right away,
+    if not in a transaction.
+    """
+    message = {
+        "type": "card.scanned",
+        "data": {
+            "type": "card.scanned",
+            "card_number": scan.card_id,
+            "batch": scan.batch,
+            "scan_time": scan.last_scan.isoformat(),
+        },
+    }
+
+    def broadcast():
+        try:
+            async_to_sync(get_channel_layer().group_send)(
+                get_card_scans_group_name(scan.reader), message
+            )
+        # The clients can still poll for the scan if the channel layer is unavailable
+        except Exception as e:  # noqa: BLE001
+            get_request_logger().exception(
+                f"Failed broadcasting scan of reader {scan.reader!r}.", exc_info=e
+            )
+
+    transaction.on_commit(broadcast)
+
+
+class CardScanConsumer(JsonWebsocketConsumer):
+    """
+    Pushes the cards scanned by the reader in the URL (or the reader with an empty
+    name, if not in the URL) to the client as soon as they're scanned, so that the
+    card registration pages don't have to poll for new scans.
+    As the card numbers are sent, only users with the ``users.change_user``
+    permission can connect.
+    The updates are sent by ``broadcast_card_scan_on_commit()``.
+    """
+
+    group_name: str
+
+    def connect(self):
+        if not self.scope["user"].has_perm("users.change_user"):
+            self.close()
+            return
+
+        self.group_name = get_card_scans_group_name(
+            self.scope["url_route"]["kwargs"].get("reader", "")
+        )
+        async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
+        self.accept()
+
+    def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            async_to_sync(self.channel_layer.group_discard)(
+                self.group_name, self.channel_name
+            )
+
+    def receive_json(self, content, **kwargs):
+        # The clients are only supposed to listen
+        pass
+
+    def card_scanned(self, event: dict):
+        self.send_json(event["data"])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from checkin.occupancy import CHECK_IN_EXPIRY_TIME, check_out_expired_profiles
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks out the profiles that have been checked in for longer than"
+        f" {CHECK_IN_EXPIRY_TIME}. Should be run periodically - e.g. every 15 minutes"
+        " - to keep the occupancy statistics accurate."
+    )
+
+    def handle(self, *args, **options):
+        num_checked_out = check_out_expired_profiles()
+        self.stdout.write(f"Checked out {num_checked_out} profiles.")
@@ -0,0 +1,111 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_initial_occupancy_hour(apps, schema_editor):
+    Profile = apps.get_model("checkin", "Profile")
+    OccupancyHour = apps.get_model("checkin", "OccupancyHour")
+    # Start the occupancy statistics with the profiles that are currently checked in
+    num_checked_in = Profile.objects.filter(on_make=True).count()
+    if num_checked_in:
+        OccupancyHour.objects.create(
+            hour=timezone.now().replace(minute=0, second=0, microsecond=0),
+            occupancy=num_checked_in,
+            peak_occupancy=num_checked_in,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checkin", "0012_profile_user_non_nullable"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OccupancyHour",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(unique=True, verbose_name="hour")),
+                (
+                    "num_check_ins",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="number of check-ins"
+                    ),
+                ),
+                (
+                    "num_check_outs",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="number of check-outs"
+                    ),
+                ),
+                (
+                    "occupancy",
+                    models.PositiveIntegerField(default=0, verbose_name="occupancy"),
+                ),
+                (
+                    "peak_occupancy",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="peak occupancy"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "occupancy hour",
+                "verbose_name_plural": "occupancy hours",
+                "ordering": ("-hour",),
+            },
+        ),
+        migrations.CreateModel(
+            name="CheckInEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[
+                            ("check_in", "check in"),
+                            ("check_out", "check out"),
+                            ("expired", "expired"),
+                        ],
+                        max_length=20,
+                        verbose_name="type",
+                    ),
+                ),
+                ("time", models.DateTimeField(db_index=True, verbose_name="time")),
+                (
+                    "profile",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="check_in_events",
+                        to="checkin.profile",
+                        verbose_name="profile",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "check-in event",
+                "verbose_name_plural": "check-in events",
+                "ordering": ("-time",),
+            },
+        ),
+        migrations.RunPython(create_initial_occupancy_hour, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checkin", "0013_checkinevent_occupancyhour"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="registerprofile",
+            name="reader",
+            field=models.CharField(blank=True, max_length=100, verbose_name="reader"),
+        ),
+        migrations.AddIndex(
+            model_name="registerprofile",
+            index=models.Index(
+                fields=["reader", "last_scan"], name="registerprofile_reader_idx"
+            ),
+        ),
+    ]
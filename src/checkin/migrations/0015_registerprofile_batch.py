@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("checkin", "0014_registerprofile_reader"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="registerprofile",
+            name="batch",
+            field=models.BooleanField(default=False, verbose_name="batch"),
+        ),
+    ]
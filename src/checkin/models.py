@@ -1,6 +1,9 @@
+from datetime import datetime, timedelta
 from typing import Final
 
 from django.db import models
+from django.db.models import Max, Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from users.models import User
@@ -8,6 +11,29 @@ from util.modelfields import CompressedImageField
 from util.storage import OverwriteStorage, UploadToUtils
 
 
+class SkillQuerySet(models.QuerySet):
+    def present(self, *, checked_in_after: datetime) -> "SkillQuerySet[Skill]":
+        """
+        :return: The skills of the checked-in profiles that were checked in after
+            ``checked_in_after``, annotated with the highest ``skill_level`` of these
+            profiles (as ``max_skill_level``) and the latest time one of them was
+            checked in (as ``latest_checkin``) - with the latest first
+        """
+        # (Filtering in a single `filter()` call, so that both conditions - and the
+        # annotations - apply to the same profiles)
+        return (
+            self.filter(
+                user_skills__profile__on_make=True,
+                user_skills__profile__last_checkin__gt=checked_in_after,
+            )
+            .annotate(
+                max_skill_level=Max("user_skills__skill_level"),
+                latest_checkin=Max("user_skills__profile__last_checkin"),
+            )
+            .order_by("-latest_checkin", "title")
+        )
+
+
 class Skill(models.Model):
     title = models.CharField(
         max_length=100, unique=True, verbose_name=_("title (Norwegian)")
@@ -27,6 +53,8 @@ class Skill(models.Model):
         verbose_name=_("illustration image"),
     )
 
+    objects = SkillQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -129,9 +157,120 @@ class SuggestSkill(models.Model):
         return self.title
 
 
+class CheckInEvent(models.Model):
+    """
+    An append-only log of when each profile was checked in and out.
+    The events are summarized per hour in ``OccupancyHour``; see ``checkin.occupancy``.
+    """
+
+    class Type(models.TextChoices):
+        CHECK_IN = "check_in", _("check in")
+        CHECK_OUT = "check_out", _("check out")
+        # When the profile was automatically checked out after having been checked in
+        # for too long; see `checkin.occupancy.check_out_expired_profiles()`
+        EXPIRED = "expired", _("expired")
+
+    profile = models.ForeignKey(
+        to=Profile,
+        on_delete=models.CASCADE,
+        related_name="check_in_events",
+        verbose_name=_("profile"),
+    )
+    type = models.CharField(choices=Type.choices, max_length=20, verbose_name=_("type"))
+    time = models.DateTimeField(db_index=True, verbose_name=_("time"))
+
+    class Meta:
+        ordering = ("-time",)
+        verbose_name = _("check-in event")
+        verbose_name_plural = _("check-in events")
+
+    def __str__(self):
+        return f"{self.profile} - {self.get_type_display()}"
+
+
+class OccupancyHour(models.Model):
+    """
+    The number of profiles that were checked in during an hour, which is updated
+    incrementally when ``CheckInEvent``s are created.
+    Hours without any events have no object, as their occupancy is the same as
+    ``occupancy`` of the latest previous hour.
+    """
+
+    # The start of the hour
+    hour = models.DateTimeField(unique=True, verbose_name=_("hour"))
+    num_check_ins = models.PositiveIntegerField(
+        default=0, verbose_name=_("number of check-ins")
+    )
+    num_check_outs = models.PositiveIntegerField(
+        default=0, verbose_name=_("number of check-outs")
+    )
+    # The occupancy after the latest event of the hour
+    occupancy = models.PositiveIntegerField(default=0, verbose_name=_("occupancy"))
+    peak_occupancy = models.PositiveIntegerField(
+        default=0, verbose_name=_("peak occupancy")
+    )
+
+    class Meta:
+        ordering = ("-hour",)
+        verbose_name = _("occupancy hour")
+        verbose_name_plural = _("occupancy hours")
+
+    def __str__(self):
+        return f"{self.hour}: {self.peak_occupancy}"
+
+
+class RegisterProfileQuerySet(models.QuerySet):
+    def unexpired(
+        self, now: datetime = None
+    ) -> "RegisterProfileQuerySet[RegisterProfile]":
+        """
+        :return: The scans whose time to live (see ``RegisterProfile``) has not passed
+        """
+        return self.filter(self._get_unexpired_q(now))
+
+    def expired(
+        self, now: datetime = None
+    ) -> "RegisterProfileQuerySet[RegisterProfile]":
+        return self.exclude(self._get_unexpired_q(now))
+
+    @staticmethod
+    def _get_unexpired_q(now: datetime | None) -> Q:
+        if now is None:
+            now = timezone.now()
+        return Q(
+            batch=False, last_scan__gt=now - RegisterProfile.SCAN_TIME_TO_LIVE
+        ) | Q(batch=True, last_scan__gt=now - RegisterProfile.BATCH_SCAN_TIME_TO_LIVE)
+
+
 class RegisterProfile(models.Model):
+    """
+    A card scanned by an RFID reader, which is waiting to be registered to a user.
+    Each reader has its own queue of scans, which expire after their time to live;
+    see ``checkin.card_registration``.
+    """
+
+    # A scanned card must be registered within this time after being scanned
+    SCAN_TIME_TO_LIVE: Final = timedelta(seconds=60)
+    # The scans of a batch expire together, this long after the latest scan of the
+    # batch
+    BATCH_SCAN_TIME_TO_LIVE: Final = timedelta(minutes=30)
+
     card_id = models.CharField(max_length=100, verbose_name=_("card number"))
     last_scan = models.DateTimeField()
+    # Identifies the reader that scanned the card, so that several readers can be
+    # used at the same time
+    reader = models.CharField(max_length=100, blank=True, verbose_name=_("reader"))
+    # Whether the scan is part of a batch; see `card_registration.stage_card_scan()`
+    batch = models.BooleanField(default=False, verbose_name=_("batch"))
+
+    objects = RegisterProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["reader", "last_scan"], name="registerprofile_reader_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.card_id
@@ -0,0 +1,159 @@
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from checkin.models import CheckInEvent, OccupancyHour, Profile
+
+# Profiles that have been checked in for longer than this are checked out by
+# `check_out_expired_profiles()`
+CHECK_IN_EXPIRY_TIME = timedelta(hours=3)
+
+
+def get_hour_start(time: datetime) -> datetime:
+    # (Done in UTC, so that the hours can be iterated over without being affected by
+    # daylight saving time)
+    return time.astimezone(UTC).replace(minute=0, second=0, microsecond=0)
+
+
+def record_check_in_events(
+    profile_pks: Iterable[int], event_type: CheckInEvent.Type, *, time: datetime = None
+):
+    """
+    Creates a ``CheckInEvent`` of ``event_type`` for each of the profiles, and adds
+    them to the ``OccupancyHour`` of ``time``.
+    """
+    profile_pks = list(profile_pks)
+    if not profile_pks:
+        return
+    if time is None:
+        time = timezone.now()
+
+    with transaction.atomic():
+        CheckInEvent.objects.bulk_create(
+            CheckInEvent(profile_id=profile_pk, type=event_type, time=time)
+            for profile_pk in profile_pks
+        )
+        if event_type == CheckInEvent.Type.CHECK_IN:
+            _add_to_occupancy_hour(time, num_check_ins=len(profile_pks))
+        else:
+            _add_to_occupancy_hour(time, num_check_outs=len(profile_pks))
+
+
+def _add_to_occupancy_hour(
+    time: datetime, *, num_check_ins: int = 0, num_check_outs: int = 0
+):
+    hour = get_hour_start(time)
+    latest_hour = OccupancyHour.objects.order_by("-hour").first()
+    # (Events with a time before the latest hour - e.g. due to clock differences
+    # between servers - are added to the latest hour, as the following hours'
+    # occupancies would otherwise have to be updated as well)
+    if latest_hour and latest_hour.hour > hour:
+        hour = latest_hour.hour
+    # The people who were already checked in are included in a new hour
+    previous_occupancy = latest_hour.occupancy if latest_hour else 0
+    # (`get_or_create()` handles another event creating the same hour concurrently)
+    occupancy_hour, _created = OccupancyHour.objects.get_or_create(
+        hour=hour,
+        defaults={
+            "occupancy": previous_occupancy,
+            "peak_occupancy": previous_occupancy,
+        },
+    )
+    # Lock the hour, so that concurrent events are added one at a time
+    occupancy_hour = OccupancyHour.objects.select_for_update().get(pk=occupancy_hour.pk)
+    occupancy_hour.num_check_ins += num_check_ins
+    occupancy_hour.num_check_outs += num_check_outs
+    occupancy_hour.occupancy = max(
+        occupancy_hour.occupancy + num_check_ins - num_check_outs, 0
+    )
+    occupancy_hour.peak_occupancy = max(
+        occupancy_hour.peak_occupancy, occupancy_hour.occupancy
+    )
+    occupancy_hour.save()
+
+
+def check_out_expired_profiles(*, now: datetime = None) -> int:
+    """
+    Checks out all the profiles that have been checked in for longer than
+    ``CHECK_IN_EXPIRY_TIME``, and records an ``EXPIRED`` event for each of them.
+    As the events are recorded at ``now``, this should be run periodically - e.g.
+    every 15 minutes - for the occupancy to be accurate.
+
+    :return: The number of profiles that were checked out
+    """
+    if now is None:
+        now = timezone.now()
+    with transaction.atomic():
+        expired_profile_pks = list(
+            Profile.objects.select_for_update()
+            .filter(on_make=True, last_checkin__lte=now - CHECK_IN_EXPIRY_TIME)
+            .values_list("pk", flat=True)
+        )
+        if not expired_profile_pks:
+            return 0
+        # (`update()` doesn't change `last_checkin`, as opposed to `save()`)
+        Profile.objects.filter(pk__in=expired_profile_pks).update(on_make=False)
+        record_check_in_events(expired_profile_pks, CheckInEvent.Type.EXPIRED, time=now)
+    return len(expired_profile_pks)
+
+
+def get_current_occupancy() -> int:
+    """
+    :return: The number of profiles that are currently checked in, according to the
+        latest ``OccupancyHour``
+    """
+    return OccupancyHour.objects.values_list("occupancy", flat=True).first() or 0
+
+
+def get_occupancy_heatmap(
+    *, start: datetime, end: datetime = None
+) -> list[list[float]]:
+    """
+    Calculates the average peak occupancy of each hour of each weekday (in the
+    current time zone) between ``start`` and ``end``, from the ``OccupancyHour``s -
+    i.e. without reading the ``CheckInEvent``s.
+
+    :param end: Defaults to now
+    :return: A list with a list per weekday - starting with Monday - containing the
+        average peak occupancy of each hour of the day
+    """
+    if end is None:
+        end = timezone.now()
+    start_hour = get_hour_start(start)
+    occupancy_hours = {
+        hour: (occupancy, peak_occupancy)
+        for hour, occupancy, peak_occupancy in OccupancyHour.objects.filter(
+            hour__gte=start_hour, hour__lt=end
+        ).values_list("hour", "occupancy", "peak_occupancy")
+    }
+    # The occupancy of the hours before the first hour with any events
+    occupancy = (
+        OccupancyHour.objects.filter(hour__lt=start_hour)
+        .values_list("occupancy", flat=True)
+        .first()
+        or 0
+    )
+
+    peak_occupancy_sums = [[0] * 24 for _weekday in range(7)]
+    num_hours = [[0] * 24 for _weekday in range(7)]
+    hour = start_hour
+    while hour < end:
+        if hour in occupancy_hours:
+            occupancy, peak_occupancy = occupancy_hours[hour]
+        else:
+            # Nobody checked in or out during the hour
+            peak_occupancy = occupancy
+        local_hour = timezone.localtime(hour)
+        peak_occupancy_sums[local_hour.weekday()][local_hour.hour] += peak_occupancy
+        num_hours[local_hour.weekday()][local_hour.hour] += 1
+        hour += timedelta(hours=1)
+
+    return [
+        [
+            peak_occupancy_sum / num if num else 0
+            for peak_occupancy_sum, num in zip(sums, nums, strict=True)
+        ]
+        for sums, nums in zip(peak_occupancy_sums, num_hours, strict=True)
+    ]
@@ -3,6 +3,8 @@
 var csrfToken;
 // noinspection ES6ConvertVarToLetConst
 var registerProfileURL;
+// noinspection ES6ConvertVarToLetConst
+var listenForCardScans;
 
 $(".container .ui.rating").rating();
 $(".container .ui.dropdown").dropdown();
@@ -62,6 +64,29 @@ function registerProfilePost($element) {
     });
 }
 
+function connectToCardScans() {
+    // Card registration is currently not in use, and only users who can change users can listen for card scans;
+    // see `profile_detail.html`
+    if (typeof registerProfileURL === "undefined" || !listenForCardScans)
+        return;
+
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const socket = new WebSocket(`${protocol}://${window.location.host}/ws/checkin/card-scans/`);
+    socket.onmessage = (event) => {
+        const update = JSON.parse(event.data);
+        if (update.type !== "card.scanned" || update.batch)
+            return;
+        // The user must still click the button to register the card, so that the card is not registered to whoever
+        // happens to have the page open
+        const $element = $(".register-profile:not(.disabled)");
+        $element.removeClass("red");
+        $element.attr("data-tooltip", gettext("Card scanned - click to register it"));
+        $element.attr("data-position", "right center");
+    };
+}
+
+$(connectToCardScans);
+
 $("#profile-pic").click(function () {
     $("#input-image").click();
 });
@@ -0,0 +1,165 @@
+import json
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from checkin import card_registration, check_in
+from checkin.api.views import AdminAPIRegisterCardBatchView
+from checkin.models import Profile, RegisterProfile
+from checkin.views import AdminRegisterCardView
+from users.models import User
+
+
+@override_settings(CHECKIN_KEY="secret")
+class CardBatchRegistrationTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f"user{i}") for i in range(3)]
+        self.usernames = [user.username for user in self.users]
+        self.admin = User.objects.create_user("admin")
+        self.admin.add_perms("users.change_user")
+
+    @staticmethod
+    def scan(card_number: str, *, reader="reader1", batch=True):
+        request = RequestFactory().post(
+            "/ignored_path",
+            {
+                "secret": "secret",
+                "card_id": card_number,
+                "reader": reader,
+                "batch": "true" if batch else "false",
+            },
+        )
+        return AdminRegisterCardView.as_view()(request)
+
+    def register_batch(self, usernames: list[str], *, reader="reader1"):
+        request = RequestFactory().post(
+            "/ignored_path", {"reader": reader, "usernames": usernames}
+        )
+        request.user = self.admin
+        return AdminAPIRegisterCardBatchView.as_view()(request)
+
+    def test_scans_are_queued_per_reader(self):
+        for card_number in ("0000000001", "0000000002", "0000000001"):
+            self.assertEqual(self.scan(card_number).status_code, HTTPStatus.OK)
+        self.scan("0000000003", reader="reader2")
+        self.assertListEqual(
+            list(
+                RegisterProfile.objects.filter(reader="reader1")
+                .order_by("pk")
+                .values_list("card_id", flat=True)
+            ),
+            ["0000000001", "0000000002"],
+        )
+
+        # Scanning outside of batch mode should only replace the reader's scans
+        self.scan("0000000004", batch=False)
+        self.assertListEqual(
+            list(RegisterProfile.objects.values_list("reader", "card_id")),
+            [("reader2", "0000000003"), ("reader1", "0000000004")],
+        )
+
+    def test_batch_is_registered_in_the_order_of_the_scans(self):
+        for card_number in ("0000000001", "0000000002", "0000000003"):
+            self.scan(card_number)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.register_batch(self.usernames)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertListEqual(
+            json.loads(response.content)["registered_usernames"], self.usernames
+        )
+        duplicate_check_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "card_number" in query["sql"] and "UNION" in query["sql"]
+        ]
+        self.assertEqual(len(duplicate_check_queries), 1)
+
+        for user, card_number in zip(
+            self.users, ("0000000001", "0000000002", "0000000003"), strict=True
+        ):
+            user.refresh_from_db()
+            self.assertEqual(user.card_number.number, card_number)
+        self.assertFalse(RegisterProfile.objects.exists())
+
+    def test_invalid_batch_registers_nothing(self):
+        User.objects.create_user("other_user", card_number="0000000002")
+        for card_number in ("0000000001", "0000000002", "0000000003"):
+            self.scan(card_number)
+
+        response = self.register_batch([*self.usernames[:2], "unknown_user"])
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertListEqual(
+            json.loads(response.content)["duplicate_card_numbers"], ["0000000002"]
+        )
+        self.assertListEqual(
+            json.loads(response.content)["unknown_usernames"], ["unknown_user"]
+        )
+        self.assertFalse(
+            User.objects.filter(username__in=self.usernames)
+            .exclude(card_number=None)
+            .exists()
+        )
+        self.assertEqual(RegisterProfile.objects.count(), 3)  # noqa: PLR2004
+
+        response = self.register_batch(self.usernames[:2])
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_em_prefixed_scans_are_checked_for_duplicates(self):
+        User.objects.create_user("other_user", card_number="0000000002")
+        now = timezone.now()
+        for card_number in ("EM 0000000001", "EM 0000000002"):
+            RegisterProfile.objects.create(
+                card_id=card_number, last_scan=now, reader="reader1", batch=True
+            )
+
+        result = card_registration.register_card_batch(
+            reader="reader1", usernames=self.usernames[:2]
+        )
+        self.assertListEqual(result.duplicate_card_numbers, ["0000000002"])
+        self.assertFalse(
+            User.objects.filter(username__in=self.usernames)
+            .exclude(card_number=None)
+            .exists()
+        )
+
+    def test_registered_cards_can_be_used_for_checking_in(self):
+        profile = Profile.objects.create(user=self.users[0])
+        self.scan("0000000001")
+        self.register_batch(self.usernames[:1])
+        self.assertEqual(check_in.toggle_check_in("0000000001"), (profile.pk, True))
+
+    def test_expired_scans_are_not_registered(self):
+        now = timezone.now()
+        for card_number in ("0000000001", "0000000002"):
+            self.scan(card_number)
+        # Scanning should keep the batch from expiring
+        RegisterProfile.objects.update(
+            last_scan=now
+            - RegisterProfile.BATCH_SCAN_TIME_TO_LIVE
+            + timedelta(minutes=1)
+        )
+        self.scan("0000000003")
+        self.assertEqual(RegisterProfile.objects.unexpired().count(), 3)  # noqa: PLR2004
+
+        self.scan("0000000004", reader="reader2", batch=False)
+        RegisterProfile.objects.filter(reader="reader2").update(
+            last_scan=now - RegisterProfile.SCAN_TIME_TO_LIVE
+        )
+        RegisterProfile.objects.filter(reader="reader1").update(
+            last_scan=now - RegisterProfile.BATCH_SCAN_TIME_TO_LIVE
+        )
+        self.assertFalse(RegisterProfile.objects.unexpired().exists())
+        response = self.register_batch(self.usernames)
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+        # The expired scans should be deleted when another card is scanned
+        self.scan("0000000005", reader="reader3")
+        self.assertListEqual(
+            list(RegisterProfile.objects.values_list("card_id", flat=True)),
+            ["0000000005"],
+        )
@@ -0,0 +1,62 @@
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase
+
+from checkin.card_registration import stage_card_scan
+from checkin.urls import websocket_urlpatterns
+from users.models import User
+
+
+class CardScanConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.admin = User.objects.create_user("admin")
+        self.admin.add_perms("users.change_user")
+
+    async def connect(self, path: str, user) -> tuple[WebsocketCommunicator, bool]:
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        communicator.scope["user"] = user
+        connected, _subprotocol = await communicator.connect()
+        return communicator, connected
+
+    async def scan_and_commit(self, card_number: str, *, reader: str, batch=False):
+        def scan_and_execute_callbacks():
+            with self.captureOnCommitCallbacks(execute=True):
+                stage_card_scan(card_number, reader=reader, batch=batch)
+
+        await sync_to_async(scan_and_execute_callbacks)()
+
+    async def test_scans_are_pushed_to_the_clients_of_the_reader(self):
+        admin_communicator, connected = await self.connect(
+            "/ws/checkin/card-scans/reader1/", self.admin
+        )
+        self.assertTrue(connected)
+        other_reader_communicator, connected = await self.connect(
+            "/ws/checkin/card-scans/", self.admin
+        )
+        self.assertTrue(connected)
+
+        await self.scan_and_commit("0123456789", reader="reader1", batch=True)
+        update = await admin_communicator.receive_json_from()
+        self.assertEqual(update["type"], "card.scanned")
+        self.assertEqual(update["card_number"], "0123456789")
+        self.assertTrue(update["batch"])
+        self.assertTrue(await other_reader_communicator.receive_nothing())
+
+        await self.scan_and_commit("0123456789", reader="", batch=False)
+        update = await other_reader_communicator.receive_json_from()
+        self.assertEqual(update["card_number"], "0123456789")
+        self.assertTrue(await admin_communicator.receive_nothing())
+
+        for communicator in (admin_communicator, other_reader_communicator):
+            await communicator.disconnect()
+
+    async def test_only_users_who_can_change_users_can_connect(self):
+        for user in (AnonymousUser(), self.user):
+            with self.subTest(user=user):
+                communicator, connected = await self.connect(
+                    "/ws/checkin/card-scans/", user
+                )
+                self.assertFalse(connected)
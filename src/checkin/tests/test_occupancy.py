@@ -0,0 +1,128 @@
+from datetime import UTC, datetime, timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from checkin.models import CheckInEvent, OccupancyHour, Profile
+from checkin.occupancy import (
+    CHECK_IN_EXPIRY_TIME,
+    check_out_expired_profiles,
+    get_current_occupancy,
+    get_occupancy_heatmap,
+    record_check_in_events,
+)
+from users.models import User
+
+
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.profiles = [
+            Profile.objects.create(user=User.objects.create_user(f"user{i}"))
+            for i in range(3)
+        ]
+        self.profile_pks = [profile.pk for profile in self.profiles]
+        # A Monday
+        self.monday = datetime(2024, 1, 8, 10, 15, tzinfo=UTC)
+
+    def test_events_are_rolled_up_per_hour(self):
+        self.assertEqual(get_current_occupancy(), 0)
+        record_check_in_events(
+            self.profile_pks, CheckInEvent.Type.CHECK_IN, time=self.monday
+        )
+        record_check_in_events(
+            self.profile_pks[:2],
+            CheckInEvent.Type.CHECK_OUT,
+            time=self.monday + timedelta(minutes=30),
+        )
+        record_check_in_events(
+            self.profile_pks[:1],
+            CheckInEvent.Type.CHECK_IN,
+            time=self.monday + timedelta(hours=2),
+        )
+        self.assertEqual(CheckInEvent.objects.count(), 6)  # noqa: PLR2004
+
+        first_hour, second_hour = OccupancyHour.objects.order_by("hour")
+        self.assertEqual(first_hour.hour, self.monday.replace(minute=0))
+        self.assertEqual(first_hour.num_check_ins, 3)  # noqa: PLR2004
+        self.assertEqual(first_hour.num_check_outs, 2)  # noqa: PLR2004
+        self.assertEqual(first_hour.occupancy, 1)
+        self.assertEqual(first_hour.peak_occupancy, 3)  # noqa: PLR2004
+        self.assertEqual(second_hour.occupancy, 2)  # noqa: PLR2004
+        self.assertEqual(second_hour.peak_occupancy, 2)  # noqa: PLR2004
+        self.assertEqual(get_current_occupancy(), 2)  # noqa: PLR2004
+
+    def test_concurrent_events_at_hour_boundary_are_added_to_the_same_hour(self):
+        record_check_in_events(
+            self.profile_pks[:2],
+            CheckInEvent.Type.CHECK_IN,
+            time=self.monday.replace(minute=59),
+        )
+        next_hour = self.monday.replace(minute=0) + timedelta(hours=1)
+        get_or_create = OccupancyHour.objects.get_or_create
+
+        def get_or_create_after_concurrent_event(**kwargs):
+            # Another event creates the hour after this one has found the latest hour
+            OccupancyHour.objects.create(
+                hour=next_hour, num_check_ins=1, occupancy=3, peak_occupancy=3
+            )
+            return get_or_create(**kwargs)
+
+        with mock.patch.object(
+            OccupancyHour.objects,
+            "get_or_create",
+            side_effect=get_or_create_after_concurrent_event,
+        ):
+            record_check_in_events(
+                self.profile_pks[2:],
+                CheckInEvent.Type.CHECK_OUT,
+                time=next_hour + timedelta(minutes=1),
+            )
+
+        occupancy_hour = OccupancyHour.objects.get(hour=next_hour)
+        self.assertEqual(occupancy_hour.num_check_ins, 1)
+        self.assertEqual(occupancy_hour.num_check_outs, 1)
+        self.assertEqual(occupancy_hour.occupancy, 2)  # noqa: PLR2004
+        self.assertEqual(occupancy_hour.peak_occupancy, 3)  # noqa: PLR2004
+
+    def test_heatmap_carries_occupancy_over_hours_without_events(self):
+        record_check_in_events(
+            self.profile_pks[:2], CheckInEvent.Type.CHECK_IN, time=self.monday
+        )
+        record_check_in_events(
+            self.profile_pks[:2],
+            CheckInEvent.Type.CHECK_OUT,
+            time=self.monday + timedelta(hours=2, minutes=5),
+        )
+        with timezone.override(UTC):
+            heatmap = get_occupancy_heatmap(
+                start=self.monday - timedelta(hours=1),
+                end=self.monday.replace(minute=0) + timedelta(days=14),
+            )
+        monday_hours = heatmap[0]
+        # (Averaged over the two Mondays)
+        self.assertListEqual(monday_hours[9:14], [0, 1, 1, 1, 0])
+        self.assertTrue(all(value == 0 for value in heatmap[1]))
+
+    def test_expired_profiles_are_checked_out_in_bulk(self):
+        now = timezone.now()
+        Profile.objects.filter(pk__in=self.profile_pks).update(on_make=True)
+        record_check_in_events(self.profile_pks, CheckInEvent.Type.CHECK_IN)
+        expired_profile_pks = self.profile_pks[:2]
+        Profile.objects.filter(pk__in=expired_profile_pks).update(
+            last_checkin=now - CHECK_IN_EXPIRY_TIME - timedelta(minutes=1)
+        )
+
+        with mock.patch.object(Profile, "save") as save_mock:
+            self.assertEqual(check_out_expired_profiles(now=now), 2)  # noqa: PLR2004
+        save_mock.assert_not_called()
+        self.assertSetEqual(
+            set(Profile.objects.filter(on_make=False).values_list("pk", flat=True)),
+            set(expired_profile_pks),
+        )
+        self.assertEqual(
+            CheckInEvent.objects.filter(type=CheckInEvent.Type.EXPIRED).count(),
+            2,  # noqa: PLR2004
+        )
+        self.assertEqual(get_current_occupancy(), 1)
+        self.assertEqual(check_out_expired_profiles(now=now), 0)
@@ -0,0 +1,176 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from checkin.models import CheckInEvent, Profile, Skill, UserSkill
+from checkin.views import AdminCheckInView, UserSkillListView
+from make_queue.models.course import Printer3DCourse
+from users.models import User
+
+
+@override_settings(CHECKIN_KEY="secret")
+class AdminCheckInViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user", card_number="0123456789")
+        self.profile = Profile.objects.create(user=self.user)
+
+    def tap(self, card_number: str):
+        request = RequestFactory().post(
+            "/ignored_path", {"secret": "secret", "card_id": card_number}
+        )
+        return AdminCheckInView.as_view()(request)
+
+    def assert_tap_response(self, card_number: str, expected_content: bytes):
+        response = self.tap(card_number)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.content, expected_content)
+
+    def test_tapping_toggles_check_in_with_a_single_profile_query(self):
+        self.assert_tap_response("0123456789", b"check in")
+        self.profile.refresh_from_db()
+        self.assertTrue(self.profile.on_make)
+        last_checkin = self.profile.last_checkin
+
+        with CaptureQueriesContext(connection) as context:
+            self.assert_tap_response("0123456789", b"check out")
+        profile_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if Profile._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(profile_queries), 1)
+        self.assertTrue(profile_queries[0].startswith("UPDATE"))
+        self.profile.refresh_from_db()
+        self.assertFalse(self.profile.on_make)
+        # Checking out should not change the check-in time
+        self.assertEqual(self.profile.last_checkin, last_checkin)
+
+        self.assert_tap_response("0123456789", b"check in")
+        self.profile.refresh_from_db()
+        self.assertGreater(self.profile.last_checkin, last_checkin)
+        self.assertListEqual(
+            list(self.profile.check_in_events.values_list("type", flat=True)),
+            [
+                CheckInEvent.Type.CHECK_IN,
+                CheckInEvent.Type.CHECK_OUT,
+                CheckInEvent.Type.CHECK_IN,
+            ][::-1],
+        )
+
+    def test_unregistered_cards_are_rejected(self):
+        response = self.tap("9876543210")
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+        user2 = User.objects.create_user("user2", card_number="9876543210")
+        # Users without a profile can't be checked in
+        response = self.tap("9876543210")
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        Profile.objects.create(user=user2)
+        self.assert_tap_response("9876543210", b"check in")
+
+    def test_changing_card_number_checks_in_the_new_owner(self):
+        self.assert_tap_response("0123456789", b"check in")
+
+        self.user.card_number = "1111111111"
+        self.user.save()
+        response = self.tap("0123456789")
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        self.assert_tap_response("1111111111", b"check out")
+
+        # A card number moved to another user through a 3D printer course should
+        # check in that user instead
+        self.user.card_number = None
+        self.user.save()
+        user2 = User.objects.create_user("user2")
+        profile2 = Profile.objects.create(user=user2)
+        Printer3DCourse.objects.create(
+            user=user2,
+            username=user2.username,
+            date=timezone.localdate(),
+            _card_number="1111111111",
+        )
+        self.assert_tap_response("1111111111", b"check in")
+        profile2.refresh_from_db()
+        self.assertTrue(profile2.on_make)
+
+
+class UserSkillListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.skill1 = Skill.objects.create(title="Ferdighet 1", title_en="Skill 1")
+        self.skill2 = Skill.objects.create(title="Ferdighet 2", title_en="Skill 2")
+        self.skill3 = Skill.objects.create(title="Ferdighet 3", title_en="Skill 3")
+
+    def create_profile(self, username: str, *, on_make=True, skill_levels: dict):
+        profile = Profile.objects.create(
+            user=User.objects.create_user(username), on_make=on_make
+        )
+        UserSkill.objects.bulk_create(
+            UserSkill(profile=profile, skill=skill, skill_level=level)
+            for skill, level in skill_levels.items()
+        )
+        return profile
+
+    def get_present_skills(self) -> list[Skill]:
+        response = UserSkillListView.as_view()(RequestFactory().get("/ignored_path"))
+        return response.context_data["present_skills"]
+
+    def test_present_skills_are_aggregated_over_non_expired_profiles(self):
+        self.create_profile(
+            "user1", skill_levels={self.skill1: UserSkill.Level.BEGINNER}
+        )
+        latest_profile = self.create_profile(
+            "user2",
+            skill_levels={
+                self.skill1: UserSkill.Level.EXPERIENCED,
+                self.skill2: UserSkill.Level.BEGINNER,
+            },
+        )
+        self.create_profile(
+            "user3", on_make=False, skill_levels={self.skill3: UserSkill.Level.EXPERT}
+        )
+        expired_profile = self.create_profile(
+            "user4", skill_levels={self.skill1: UserSkill.Level.EXPERT}
+        )
+        Profile.objects.filter(pk=expired_profile.pk).update(
+            last_checkin=timezone.now() - timedelta(hours=4)
+        )
+
+        present_skills = self.get_present_skills()
+        self.assertListEqual(
+            [(skill, skill.max_skill_level) for skill in present_skills],
+            # (Both skills were last checked in at the same time, by `latest_profile`)
+            [
+                (self.skill1, UserSkill.Level.EXPERIENCED),
+                (self.skill2, UserSkill.Level.BEGINNER),
+            ],
+        )
+        latest_profile.refresh_from_db()
+        self.assertEqual(present_skills[0].latest_checkin, latest_profile.last_checkin)
+        expired_profile.refresh_from_db()
+        self.assertFalse(expired_profile.on_make)
+
+    def test_number_of_queries_does_not_depend_on_number_of_profiles(self):
+        def get_num_queries() -> int:
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                self.get_present_skills()
+            return len(context.captured_queries)
+
+        self.create_profile("user1", skill_levels={self.skill1: 1})
+        num_queries = get_num_queries()
+        for i in range(2, 5):
+            self.create_profile(
+                f"user{i}", skill_levels={self.skill1: 2, self.skill2: 3}
+            )
+        self.assertEqual(get_num_queries(), num_queries)
+
+        # The skills should be cached
+        with CaptureQueriesContext(connection) as context:
+            self.get_present_skills()
+        self.assertEqual(len(context.captured_queries), 0)
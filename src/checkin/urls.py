@@ -1,7 +1,7 @@
 from django.contrib.auth.decorators import login_required
 from django.urls import path
 
-from checkin import views
+from checkin import consumers, views
 
 urlpatterns = [
     # This path is currently not in use
@@ -13,6 +13,21 @@ urlpatterns = [
     ),
 ]
 
+# --- WebSocket URL patterns (imported in `web/asgi.py`) ---
+
+websocket_urlpatterns = [
+    path(
+        "ws/checkin/card-scans/",
+        consumers.CardScanConsumer.as_asgi(),
+        name="ws_card_scans",
+    ),
+    path(
+        "ws/checkin/card-scans/<str:reader>/",
+        consumers.CardScanConsumer.as_asgi(),
+        name="ws_card_scans",
+    ),
+]
+
 # --- Admin URL patterns (imported in `web/urls.py`) ---
 
 adminpatterns = [
@@ -44,5 +59,7 @@ adminapipatterns = [
     # These paths are currently not in use:
     # path("register/profile/", api_views.AdminAPIRegisterProfileView.as_view(),
     #      name='admin_api_register_profile'),
+    # path("register/card/batch/", api_views.AdminAPIRegisterCardBatchView.as_view(),
+    #      name='admin_api_register_card_batch'),
     # path("suggest/", include(suggest_skill_adminapipatterns)),
 ]
@@ -3,6 +3,8 @@ from http import HTTPStatus
 
 from django.contrib import messages
 from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.core.cache import cache
+from django.db import transaction
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
@@ -13,63 +15,67 @@ from django.views import View
 from django.views.generic import TemplateView
 
 from card.views import RFIDView
-from checkin.models import Profile, RegisterProfile, Skill, SuggestSkill, UserSkill
+from checkin import card_registration, check_in, occupancy
+from checkin.models import (
+    CheckInEvent,
+    Profile,
+    Skill,
+    SuggestSkill,
+    UserSkill,
+)
 from make_queue.models.course import CoursePermission
 from util.view_utils import PreventGetRequestsMixin
 
 
 class AdminCheckInView(RFIDView):
     def card_number_valid(self, card_number):
-        profiles = Profile.objects.filter(user__card_number=card_number)
-        if not profiles.exists():
-            return HttpResponse(
-                f"{escape(card_number)} is not registered",
-                status=HTTPStatus.UNAUTHORIZED,
-            )
+        with transaction.atomic():
+            # (This is called for every card tap at the door, so the profile is
+            # toggled with a single query; see `toggle_check_in()`)
+            result = check_in.toggle_check_in(card_number)
+            if result is None:
+                return HttpResponse(
+                    f"{escape(card_number)} is not registered",
+                    status=HTTPStatus.UNAUTHORIZED,
+                )
 
-        if profiles.first().on_make:
-            profiles.update(on_make=False)
-            return HttpResponse("check out".encode(), status=HTTPStatus.OK)
-        else:
-            profiles.update(on_make=True, last_checkin=timezone.now())
+            profile_pk, on_make = result
+            occupancy.record_check_in_events(
+                [profile_pk],
+                CheckInEvent.Type.CHECK_IN if on_make else CheckInEvent.Type.CHECK_OUT,
+            )
+        if on_make:
             return HttpResponse("check in".encode(), status=HTTPStatus.OK)
+        else:
+            return HttpResponse("check out".encode(), status=HTTPStatus.OK)
 
 
 class UserSkillListView(TemplateView):
     template_name = "checkin/user_skill_list.html"
-    expiry_time = (60 * 60) * 3
 
-    def is_checkin_expired(self, profile):
-        return (timezone.now() - profile.last_checkin).seconds >= self.expiry_time
-
-    def check_out_expired(self, profile):
-        if self.is_checkin_expired(profile):
-            profile.on_make = False
-            profile.save()
+    # The page is polled by a wall display, so the skills are cached for a short time
+    CACHE_KEY = "checkin.present_skills"
+    CACHE_TIMEOUT = 30
 
     def get_context_data(self, **kwargs):
         """
-        Creates dict with skill titles as keys and
-        the highest corresponding skill level as its pair value (quick fix) to show on
-        website.
+        Lists the skills of the checked-in profiles, with the highest skill level of
+        the profiles and the latest time one of them was checked in.
         """
-        skill_dict = {}
-
-        for profile in Profile.objects.filter(on_make=True):
-            self.check_out_expired(profile)
-            for user_skill in profile.user_skills.all():
-                skill = user_skill.skill
-
-                if (
-                    skill not in skill_dict or skill.skill_level > skill_dict[skill][0]
-                ) and not self.is_checkin_expired(profile):
-                    skill_dict[skill] = (user_skill.skill_level, profile.last_checkin)
+        present_skills = cache.get(self.CACHE_KEY)
+        if present_skills is None:
+            now = timezone.now()
+            occupancy.check_out_expired_profiles(now=now)
+            present_skills = list(
+                Skill.objects.present(
+                    checked_in_after=now - occupancy.CHECK_IN_EXPIRY_TIME
+                )
+            )
+            cache.set(self.CACHE_KEY, present_skills, self.CACHE_TIMEOUT)
 
         return {
             **super().get_context_data(**kwargs),
-            "skill_dict": sorted(
-                skill_dict.items(), key=lambda item: item[1][1], reverse=True
-            ),
+            "present_skills": present_skills,
         }
 
 
@@ -235,18 +241,26 @@ class AdminSuggestSkillView(PermissionRequiredMixin, TemplateView):
 
 
 class AdminRegisterCardView(RFIDView):
+    """
+    Stores the scanned card for registering it to a user.
+    The reader can identify itself with the ``reader`` parameter, and set ``batch``
+    to ``true`` to queue the scan - e.g. when registering the cards of a whole course
+    group; see ``checkin.card_registration``.
+    """
+
     def card_number_valid(self, card_number):
-        if Profile.objects.filter(user__card__number=card_number).exists():
+        reader = self.request.POST.get("reader", "")
+        batch = self.request.POST.get("batch") == "true"
+        # (The cards of a batch are checked for duplicates when the batch is
+        # registered)
+        if not batch and Profile.objects.filter(user__card_number=card_number).exists():
             return HttpResponse(
                 f"{escape(card_number)} is already registered",
                 status=HTTPStatus.CONFLICT,
             )
-        else:
-            RegisterProfile.objects.all().delete()
-            RegisterProfile.objects.create(
-                card_id=card_number, last_scan=timezone.now()
-            )
-            return HttpResponse("Card scanned", status=HTTPStatus.OK)
+
+        card_registration.stage_card_scan(card_number, reader=reader, batch=batch)
+        return HttpResponse("Card scanned", status=HTTPStatus.OK)
 
 
 class AdminProfilePictureUpdateView(PreventGetRequestsMixin, View):
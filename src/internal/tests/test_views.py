@@ -57,6 +57,7 @@ class InternalContentBoxTests(TestCase):
         # Clear the cache again, after filling it with URLs prefixed with `/en`
         # when testing with the `LANGUAGE_CODE` setting set to `en` below
         clear_url_caches()
+        super().tearDownClass()
 
     def test_internal_content_boxes_can_only_be_edited_with_required_permission(self):
         self.assertEqual(
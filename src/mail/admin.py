@@ -0,0 +1,56 @@
+from django.contrib import admin
+
+from mail.models import MailingJob, MailingRecipient, OutboxEmail
+
+
+class MailingRecipientInline(admin.TabularInline):
+    model = MailingRecipient
+    fields = ("email", "language", "status", "sent_time", "error")
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class MailingJobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "created_by", "creation_date", "finished_date")
+    list_filter = ("status",)
+    search_fields = ("name", "recipients__email")
+    ordering = ("-creation_date",)
+
+    readonly_fields = ("status", "created_by", "creation_date", "finished_date")
+    inlines = (MailingRecipientInline,)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related("created_by")
+
+
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "status",
+        "num_attempts",
+        "next_attempt_time",
+        "creation_date",
+        "sent_time",
+    )
+    list_filter = ("status",)
+    search_fields = ("idempotency_key", "message__to", "message__subject")
+    ordering = ("-creation_date",)
+
+    # The status and next attempt time can be changed, to retry dead emails
+    readonly_fields = (
+        "idempotency_key",
+        "message",
+        "num_attempts",
+        "last_error",
+        "creation_date",
+        "sent_time",
+    )
+
+
+admin.site.register(MailingJob, MailingJobAdmin)
+admin.site.register(OutboxEmail, OutboxEmailAdmin)
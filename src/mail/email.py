@@ -1,14 +1,167 @@
+import hashlib
 import mimetypes
+import re
 import smtplib
+import time
+from collections.abc import Sequence
 from pathlib import Path
 
 from channels.consumer import SyncConsumer
-from django.core.mail import EmailMultiAlternatives
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, EmailMultiAlternatives, get_connection
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+from django.http import HttpRequest
 from django.template.loader import get_template
+from django.utils.html import conditional_escape
+from django.utils.translation import get_language
 
 from util.logging_utils import get_request_logger
 
 
+class PersistentEmailConnection:
+    """
+    A long-lived connection to the email server, which is reused for all the emails
+    sent through it, instead of connecting (and doing the TLS handshake and
+    authentication) for every email.
+
+    As the server might close the connection after some time of inactivity, its
+    liveness is checked (by sending ``NOOP``) before being used if it has been idle
+    for more than ``settings.EMAIL_CONNECTION_MAX_IDLE_SECONDS``, and it's reopened if
+    the server has disconnected.
+
+    Keeps count of the number of sent and failed emails, and of the number of times
+    it has had to reconnect; see ``get_stats()`` (which the email consumer logs after
+    sending outbox emails).
+    """
+
+    def __init__(self, backend: str = None):
+        """
+        :param backend: The import path of the email backend to use; defaults to
+            ``settings.EMAIL_BACKEND``
+        """
+        self.backend = backend
+        self.connection = None
+        self.last_used_time: float | None = None
+
+        self.start_time = time.monotonic()
+        self.num_sent = 0
+        self.num_failed = 0
+        self.num_batches = 0
+        self.num_reconnects = 0
+
+    def send_messages(self, messages: Sequence[EmailMessage]) -> int:
+        """
+        Sends all of ``messages``; see ``send_each()``.
+
+        :return: The number of sent messages
+        :raises smtplib.SMTPException: The first error, if sending any of the messages
+            failed
+        """
+        errors = self.send_each(messages)
+        for error in errors:
+            if error is not None:
+                raise error
+        return len(messages)
+
+    def send_each(self, messages: Sequence[EmailMessage]) -> list[Exception | None]:
+        """
+        Sends each of ``messages`` over the connection. If the server has closed the
+        connection, it's reopened (once per call), and the messages that have not been
+        sent yet are retried.
+
+        :return: The error raised when sending each of the messages - or ``None`` for
+            the ones that were sent
+        """
+        if not messages:
+            return []
+        errors = []
+        can_reconnect = True
+        for message in messages:
+            error = self._send_message(message)
+            # This is usually raised by the first command sent after the server closed
+            # the connection, in which case the message will not have been sent
+            if isinstance(error, smtplib.SMTPServerDisconnected) and can_reconnect:
+                can_reconnect = False
+                self.num_reconnects += 1
+                error = self._send_message(message)
+            errors.append(error)
+
+        num_failed = len(errors) - errors.count(None)
+        self.num_batches += 1
+        self.num_sent += len(errors) - num_failed
+        self.num_failed += num_failed
+        self.last_used_time = time.monotonic()
+        return errors
+
+    def _send_message(self, message: EmailMessage) -> Exception | None:
+        try:
+            self.get_open_connection().send_messages([message])
+        except (smtplib.SMTPException, OSError) as e:
+            # The connection might be in an unknown state, so start over the next time
+            self.close()
+            return e
+        return None
+
+    def get_open_connection(self):
+        if self.connection is None:
+            self.connection = get_connection(self.backend, fail_silently=False)
+        elif self._is_idle() and not self._is_alive():
+            self.close()
+            self.num_reconnects += 1
+            self.connection = get_connection(self.backend, fail_silently=False)
+        # (Does nothing if the connection is already open)
+        self.connection.open()
+        return self.connection
+
+    def _is_idle(self) -> bool:
+        return (
+            self.last_used_time is not None
+            and time.monotonic() - self.last_used_time
+            > settings.EMAIL_CONNECTION_MAX_IDLE_SECONDS
+        )
+
+    def _is_alive(self) -> bool:
+        # Only SMTP connections can be closed by the other end
+        if not isinstance(self.connection, SMTPEmailBackend):
+            return True
+        smtp_connection = self.connection.connection
+        if smtp_connection is None:
+            return False
+        try:
+            status_code, _message = smtp_connection.noop()
+        except (smtplib.SMTPException, OSError):
+            return False
+        return status_code == 250  # noqa: PLR2004
+
+    def close(self):
+        if self.connection is None:
+            return
+        try:
+            self.connection.close()
+        # The connection is discarded either way
+        except Exception:  # noqa: BLE001
+            pass
+        self.connection = None
+
+    def get_stats(self) -> dict[str, int | float]:
+        """
+        :return: The number of sent and failed emails, the number of batches and
+            reconnections, and the average number of sent emails per second since the
+            connection was created
+        """
+        elapsed_seconds = time.monotonic() - self.start_time
+        return {
+            "sent": self.num_sent,
+            "failed": self.num_failed,
+            "batches": self.num_batches,
+            "reconnects": self.num_reconnects,
+            "sent_per_second": (
+                self.num_sent / elapsed_seconds if elapsed_seconds else 0.0
+            ),
+        }
+
+
 class EmailConsumer(SyncConsumer):
     """A consumer for sending async email messages.
     Contains two entry points - ``send_text`` and ``send_html`` - which create and send
@@ -31,7 +184,7 @@ class EmailConsumer(SyncConsumer):
       a tuple of the filename, content and content type. ``serialize_file`` can be used
       to create this tuple from a file.
 
-    To send an asynchronous email, use
+    To send an asynchronous email, preferably use ``mail.outbox.enqueue_email()``, or
     ``async_to_sync(get_channel_layer().send)('email', message)``, where ``message`` is
     a message dictionary as described above. ``async_to_sync`` can be imported from
     ``asgiref.sync`` and ``get_channel_layer`` can be imported from ``channels.layers``.
@@ -39,8 +192,13 @@ class EmailConsumer(SyncConsumer):
     ``uv run manage.py runworker -v 2 email``. To run the worker, ``redis`` must be
     installed and running. Requires a standard Django setup of email credentials to send
     emails.
+
+    All the emails are sent through the same ``PersistentEmailConnection``, which is
+    shared by all the consumer instances in the worker process.
     """
 
+    connection = PersistentEmailConnection()
+
     def send_text(self, message):
         """
         For sending a plaintext message.
@@ -49,8 +207,8 @@ class EmailConsumer(SyncConsumer):
         """
         msg = self.create_message(message)
         try:
-            msg.send(fail_silently=False)
-        except smtplib.SMTPException as e:
+            self.connection.send_messages([msg])
+        except (smtplib.SMTPException, OSError) as e:
             get_request_logger().exception(
                 f"Failed sending plain text email:\n{message}", exc_info=e
             )
@@ -61,15 +219,62 @@ class EmailConsumer(SyncConsumer):
 
         :param message: The message dictionary
         """
-        msg = self.create_message(message)
-        msg.attach_alternative(message["html_render"], "text/html")
+        msg = self.create_html_message(message)
         try:
-            msg.send(fail_silently=False)
-        except smtplib.SMTPException as e:
+            self.connection.send_messages([msg])
+        except (smtplib.SMTPException, OSError) as e:
             get_request_logger().exception(
                 f"Failed sending HTML email:\n{message}", exc_info=e
             )
 
+    def send_mailing(self, message):
+        """
+        For sending a chunk of the emails of a mailing job. If there are still pending
+        recipients afterwards, the job is enqueued again - so that the rest of its
+        chunks are interleaved with the other messages sent to the consumer - but not
+        to be sent before enough time has passed to stay below
+        ``settings.MAILING_MAX_EMAILS_PER_SECOND``. If that time has not passed yet,
+        the message is put back on the channel, instead of blocking the consumer.
+
+        :param message: A dictionary containing the pk of the ``MailingJob`` under
+            ``'job'``, and possibly the time before which the chunk should not be sent
+            under ``'not_before'``; see ``mail.mailing.enqueue_mailing_job()``
+        """
+        # (Imported here, as the models can't be imported when `web/asgi.py` imports
+        # this module)
+        from mail.mailing import enqueue_mailing_job, send_mailing_job
+        from mail.models import MailingJob
+
+        job = MailingJob.objects.filter(pk=message["job"]).first()
+        if job is None:
+            get_request_logger().error(f"Mailing job {message['job']} does not exist.")
+            return
+        if message.get("not_before", 0) > time.time():
+            enqueue_mailing_job(job, not_before=message["not_before"])
+            return
+
+        chunk_start_time = time.time()
+        if send_mailing_job(job, connection=self.connection, max_chunks=1):
+            min_chunk_duration = (
+                settings.MAILING_CHUNK_SIZE / settings.MAILING_MAX_EMAILS_PER_SECOND
+            )
+            enqueue_mailing_job(job, not_before=chunk_start_time + min_chunk_duration)
+
+    def send_outbox(self, message):
+        """
+        For sending the emails in the outbox that are due.
+
+        :param message: Not used
+        """
+        # (Imported here, as the models can't be imported when `web/asgi.py` imports
+        # this module)
+        from mail.outbox import send_outbox_emails
+
+        if send_outbox_emails(connection=self.connection):
+            get_request_logger().info(
+                f"Email connection stats: {self.connection.get_stats()}"
+            )
+
     @staticmethod
     def create_message(message):
         """
@@ -91,6 +296,12 @@ class EmailConsumer(SyncConsumer):
 
         return msg
 
+    @classmethod
+    def create_html_message(cls, message):
+        msg = cls.create_message(message)
+        msg.attach_alternative(message["html_render"], "text/html")
+        return msg
+
 
 def render_html(request, context: dict, template_name: str):
     """
@@ -131,6 +342,88 @@ def render_text(request, context: dict, template_name: str, strip=True):
     return rendered_text.strip() if strip else rendered_text
 
 
+class EmailRenderingRequest(HttpRequest):
+    """
+    A request for rendering emails outside of a request-response cycle - e.g. in a
+    management command - which makes ``get_absolute_uri_for_path`` in the templates
+    produce URIs pointing to ``settings.PARENT_HOST``.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.META["HTTP_HOST"] = settings.PARENT_HOST
+
+    def _get_scheme(self):
+        # The website is only served over HTTPS in production
+        return "http" if settings.DEBUG else "https"
+
+
+# Skeletons are re-rendered when the values in their cache keys change, so this is
+# mainly to prevent unused skeletons from filling up the cache
+SKELETON_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def render_skeleton(
+    request, context: dict, template_name: str, *, cache_key_parts: tuple, strip=False
+):
+    """
+    Helper for rendering a template that's shared by many emails once, and reusing it
+    for each of them. The context should contain placeholders for the
+    recipient-specific values, which can be replaced by calling ``fill_skeleton()``
+    on the returned string.
+
+    :param request: The request object from the view.
+    :param context: The context to render the template for.
+    :param template_name: The name of the template file
+    :param cache_key_parts: Values that identify the context - e.g. the pk and last
+        modified date of the object the email is about. The template name, the current
+        language and the request's host are always included in the cache key.
+    :param strip: If ``True``, the rendered skeleton will have leading and trailing
+        whitespace removed before being returned.
+    :return: A string representing the content, containing placeholders
+    """
+    key_source = repr(
+        (
+            template_name,
+            get_language(),
+            request.build_absolute_uri("/") if request else None,
+            strip,
+            *cache_key_parts,
+        )
+    )
+    cache_key = f"mail.skeleton.{hashlib.md5(key_source.encode()).hexdigest()}"
+    skeleton = cache.get(cache_key)
+    if skeleton is None:
+        skeleton = render_text(request, context, template_name, strip=strip)
+        cache.set(cache_key, skeleton, SKELETON_CACHE_TIMEOUT)
+    return skeleton
+
+
+def fill_skeleton(skeleton: str, values: dict[str, str], *, autoescape=True):
+    """
+    Replaces the placeholders in a string returned by ``render_skeleton()``.
+
+    :param skeleton: The rendered skeleton
+    :param values: The placeholders as keys, and the values to replace them with as
+        values
+    :param autoescape: If ``True``, the values are escaped - like the template engine
+        would have escaped them - unless they're marked as safe. Should be ``False``
+        for templates that turn autoescaping off.
+    :return: A string representing the content
+    """
+    if not values:
+        return skeleton
+    # (Replacing all the placeholders in a single pass, so that a placeholder inside
+    # one of the values is not replaced)
+    placeholder_pattern = re.compile("|".join(map(re.escape, values)))
+    return placeholder_pattern.sub(
+        lambda match: str(
+            conditional_escape(values[match[0]]) if autoescape else values[match[0]]
+        ),
+        skeleton,
+    )
+
+
 def serialize_file(file):
     """
     Serializes the content of the file so that it can be sent to the email consumer.
@@ -0,0 +1,186 @@
+import smtplib
+from collections.abc import Iterable
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.utils import timezone
+
+from mail.email import PersistentEmailConnection
+from mail.models import MailingJob, MailingRecipient
+from users.models import User
+from util.logging_utils import get_request_logger
+
+
+def create_mailing_job(
+    *,
+    name: str,
+    from_email: str,
+    rendered_messages: dict[str, dict[str, str]],
+    recipients: Iterable[tuple[str, str]],
+    created_by: User | None = None,
+) -> MailingJob:
+    """
+    :param rendered_messages: See ``MailingJob.rendered_messages``
+    :param recipients: Tuples of the email address and language of each recipient;
+        duplicate email addresses are only included once
+    """
+    with transaction.atomic():
+        job = MailingJob.objects.create(
+            name=name,
+            from_email=from_email,
+            rendered_messages=rendered_messages,
+            created_by=created_by,
+        )
+        email_to_language = {email: language for email, language in recipients if email}
+        MailingRecipient.objects.bulk_create(
+            MailingRecipient(job=job, email=email, language=language)
+            for email, language in email_to_language.items()
+        )
+    return job
+
+
+def enqueue_mailing_job(job: MailingJob, *, not_before: float | None = None):
+    """
+    Makes the email consumer send the job's emails when the current transaction is
+    committed - or sends them right away (to the console) if
+    ``settings.PRINT_EMAILS_TO_CONSOLE`` is set.
+
+    :param not_before: The time - as returned by ``time.time()`` - before which the
+        consumer should not start sending the emails
+    """
+    if settings.PRINT_EMAILS_TO_CONSOLE:
+        connection = PersistentEmailConnection(
+            "django.core.mail.backends.console.EmailBackend"
+        )
+        try:
+            send_mailing_job(job, connection=connection)
+        finally:
+            connection.close()
+        return
+
+    message = {"type": "send_mailing", "job": job.pk}
+    if not_before is not None:
+        message["not_before"] = not_before
+
+    def enqueue():
+        try:
+            async_to_sync(get_channel_layer().send)("email", message)
+        except Exception as e:  # noqa: BLE001
+            get_request_logger().exception(
+                f"Failed enqueuing mailing job {job.pk}.", exc_info=e
+            )
+
+    transaction.on_commit(enqueue)
+
+
+def build_email_message(
+    job: MailingJob, recipient: MailingRecipient
+) -> EmailMultiAlternatives:
+    rendered_message = job.rendered_messages.get(recipient.language)
+    if rendered_message is None:
+        # Fall back to any of the languages
+        rendered_message = next(iter(job.rendered_messages.values()))
+    message = EmailMultiAlternatives(
+        rendered_message["subject"],
+        rendered_message["text"],
+        job.from_email,
+        [recipient.email],
+    )
+    if html := rendered_message.get("html"):
+        message.attach_alternative(html, "text/html")
+    return message
+
+
+def send_mailing_job(
+    job: MailingJob,
+    *,
+    connection: PersistentEmailConnection = None,
+    chunk_size: int | None = None,
+    max_chunks: int | None = None,
+) -> bool:
+    """
+    Sends the job's email to each of its pending recipients through ``connection``,
+    and records whether it was sent to each of them.
+    The recipients are processed in chunks of ``chunk_size``, each chunk's statuses
+    being saved in a single query; if interrupted, calling this again continues with
+    the recipients that are still pending.
+
+    :param connection: Defaults to a new ``PersistentEmailConnection``, which is
+        closed afterwards
+    :param chunk_size: Defaults to ``settings.MAILING_CHUNK_SIZE``
+    :param max_chunks: The maximum number of chunks to send; all the pending
+        recipients are sent to if ``None``
+    :return: Whether there are still pending recipients
+    """
+    if connection is None:
+        # Keep the connection open until all the chunks have been sent
+        connection = PersistentEmailConnection()
+        try:
+            return send_mailing_job(
+                job, connection=connection, chunk_size=chunk_size, max_chunks=max_chunks
+            )
+        finally:
+            connection.close()
+    if chunk_size is None:
+        chunk_size = settings.MAILING_CHUNK_SIZE
+
+    MailingJob.objects.filter(pk=job.pk).update(status=MailingJob.Status.SENDING)
+    pending_recipients = job.recipients.filter(
+        status=MailingRecipient.Status.PENDING
+    ).order_by("pk")
+    if max_chunks is not None:
+        pending_recipients = pending_recipients[: max_chunks * chunk_size]
+    pending_recipients = list(pending_recipients)
+    try:
+        # (Connecting before sending anything, so that the recipients are kept pending
+        # instead of being marked as failed if the email server can't be reached)
+        connection.get_open_connection()
+    except (smtplib.SMTPException, OSError) as e:
+        get_request_logger().exception(
+            f"Failed connecting to the email server for mailing job {job.pk}.",
+            exc_info=e,
+        )
+        job.status = MailingJob.Status.FAILED
+        job.save(update_fields=["status"])
+        return False
+
+    for chunk_start in range(0, len(pending_recipients), chunk_size):
+        chunk = pending_recipients[chunk_start : chunk_start + chunk_size]
+        _send_chunk(job, chunk, connection)
+
+    if job.recipients.filter(status=MailingRecipient.Status.PENDING).exists():
+        return True
+    if job.recipients.filter(status=MailingRecipient.Status.FAILED).exists():
+        job.status = MailingJob.Status.FINISHED_WITH_ERRORS
+    else:
+        job.status = MailingJob.Status.FINISHED
+    job.finished_date = timezone.now()
+    job.save(update_fields=["status", "finished_date"])
+    return False
+
+
+def _send_chunk(
+    job: MailingJob,
+    chunk: list[MailingRecipient],
+    connection: PersistentEmailConnection,
+):
+    now = timezone.now()
+    errors = connection.send_each(
+        [build_email_message(job, recipient) for recipient in chunk]
+    )
+    for recipient, error in zip(chunk, errors, strict=True):
+        if error is None:
+            recipient.status = MailingRecipient.Status.SENT
+            recipient.sent_time = now
+            continue
+
+        recipient.status = MailingRecipient.Status.FAILED
+        recipient.error = str(error)
+        get_request_logger().exception(
+            f"Failed sending email to {recipient.email} for mailing job {job.pk}.",
+            exc_info=error,
+        )
+    MailingRecipient.objects.bulk_update(chunk, ["status", "error", "sent_time"])
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mail.email import PersistentEmailConnection
+from mail.models import OutboxEmail
+from mail.outbox import prune_sent_emails, send_outbox_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Attempts sending all the outbox emails that are due - e.g. the ones whose"
+        " previous attempt failed, or that were enqueued while the email consumer"
+        " couldn't be reached - and deletes the emails that were sent long ago."
+        " Should be run periodically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retry-dead",
+            action="store_true",
+            help="Also retry the emails that have been given up on.",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_dead"]:
+            num_revived = OutboxEmail.objects.filter(
+                status=OutboxEmail.Status.DEAD
+            ).update(
+                status=OutboxEmail.Status.PENDING,
+                num_attempts=0,
+                next_attempt_time=timezone.now(),
+            )
+            self.stdout.write(f"Marked {num_revived} dead emails as pending.")
+
+        connection = PersistentEmailConnection()
+        try:
+            num_attempted = send_outbox_emails(connection=connection)
+        finally:
+            connection.close()
+        num_pending = OutboxEmail.objects.filter(
+            status=OutboxEmail.Status.PENDING
+        ).count()
+        self.stdout.write(
+            f"Attempted sending {num_attempted} emails; {num_pending} are still"
+            " pending."
+        )
+        self.stdout.write(f"Email connection stats: {connection.get_stats()}")
+
+        num_pruned = prune_sent_emails()
+        self.stdout.write(f"Deleted {num_pruned} emails that were sent long ago.")
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mail", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "idempotency_key",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="idempotency key"
+                    ),
+                ),
+                ("message", models.JSONField(verbose_name="message")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "pending"),
+                            ("sent", "sent"),
+                            ("dead", "dead"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="status",
+                    ),
+                ),
+                (
+                    "num_attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="number of attempts"
+                    ),
+                ),
+                (
+                    "next_attempt_time",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="next attempt"
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="last error")),
+                (
+                    "creation_date",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="creation date"
+                    ),
+                ),
+                (
+                    "sent_time",
+                    models.DateTimeField(blank=True, null=True, verbose_name="sent"),
+                ),
+            ],
+            options={
+                "verbose_name": "outbox email",
+                "verbose_name_plural": "outbox emails",
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_time"],
+                        name="outboxemail_due_idx",
+                    )
+                ],
+            },
+        ),
+    ]
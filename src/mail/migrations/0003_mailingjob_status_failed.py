@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("mail", "0002_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="mailingjob",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "pending"),
+                    ("sending", "sending"),
+                    ("finished", "finished"),
+                    ("finished_with_errors", "finished with errors"),
+                    ("failed", "failed"),
+                ],
+                default="pending",
+                max_length=20,
+                verbose_name="status",
+            ),
+        ),
+    ]
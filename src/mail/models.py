@@ -0,0 +1,162 @@
+from datetime import datetime
+
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from users.models import User
+
+
+class MailingJob(models.Model):
+    """
+    An email sent to several recipients - e.g. all the participants of an event -
+    which is sent by ``mail.mailing.send_mailing_job()``.
+
+    The email is rendered once per language before the job is created, and stored
+    in ``rendered_messages``, as a dict with the language codes as keys, and dicts
+    with ``subject``, ``text`` and ``html`` keys as values.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        SENDING = "sending", _("sending")
+        FINISHED = "finished", _("finished")
+        # Some of the recipients failed; see their `error`
+        FINISHED_WITH_ERRORS = "finished_with_errors", _("finished with errors")
+        # Connecting to the email server failed; the recipients that the email had not
+        # been sent to yet are still pending
+        FAILED = "failed", _("failed")
+
+    name = models.CharField(max_length=200, verbose_name=_("name"))
+    from_email = models.EmailField(verbose_name=_("from"))
+    rendered_messages = models.JSONField(verbose_name=_("rendered messages"))
+    status = models.CharField(
+        choices=Status.choices,
+        max_length=20,
+        default=Status.PENDING,
+        verbose_name=_("status"),
+    )
+    created_by = models.ForeignKey(
+        to=User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="mailing_jobs",
+        verbose_name=_("created by"),
+    )
+    creation_date = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("creation date")
+    )
+    finished_date = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("finished date")
+    )
+
+    class Meta:
+        verbose_name = _("mailing job")
+        verbose_name_plural = _("mailing jobs")
+
+    def __str__(self):
+        return self.name
+
+
+class MailingRecipient(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        SENT = "sent", _("sent")
+        FAILED = "failed", _("failed")
+
+    job = models.ForeignKey(
+        to=MailingJob,
+        on_delete=models.CASCADE,
+        related_name="recipients",
+        verbose_name=_("mailing job"),
+    )
+    email = models.EmailField(verbose_name=_("email"))
+    # One of the keys of the job's `rendered_messages`
+    language = models.CharField(max_length=10, verbose_name=_("language"))
+    status = models.CharField(
+        choices=Status.choices,
+        max_length=20,
+        default=Status.PENDING,
+        verbose_name=_("status"),
+    )
+    error = models.TextField(blank=True, verbose_name=_("error"))
+    sent_time = models.DateTimeField(null=True, blank=True, verbose_name=_("sent"))
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["job", "status"], name="mailingrecipient_status_idx"),
+        ]
+        verbose_name = _("mailing recipient")
+        verbose_name_plural = _("mailing recipients")
+
+    def __str__(self):
+        return f"{self.email} ({self.job})"
+
+
+class OutboxEmailQuerySet(models.QuerySet):
+    def due(self, now: datetime = None) -> "OutboxEmailQuerySet[OutboxEmail]":
+        """
+        :return: The pending emails whose next sending attempt should be made now
+        """
+        if now is None:
+            now = timezone.now()
+        return self.filter(
+            status=OutboxEmail.Status.PENDING, next_attempt_time__lte=now
+        )
+
+
+class OutboxEmail(models.Model):
+    """
+    An email that should be sent by the email consumer, which is stored in the
+    database - in the same transaction as the changes that caused it to be sent - so
+    that it's not lost if the channel layer or the email server is unavailable.
+    Failed attempts are retried with exponential backoff, until the email has been
+    attempted sent ``settings.EMAIL_OUTBOX_MAX_ATTEMPTS`` times, at which point it's
+    marked as dead.
+
+    See ``mail.outbox``.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", _("pending")
+        SENT = "sent", _("sent")
+        DEAD = "dead", _("dead")
+
+    # Enqueuing an email with the same key as an existing one does nothing
+    idempotency_key = models.CharField(
+        max_length=255, unique=True, verbose_name=_("idempotency key")
+    )
+    # A message dictionary, as described in the docstring of `EmailConsumer`
+    message = models.JSONField(verbose_name=_("message"))
+    status = models.CharField(
+        choices=Status.choices,
+        max_length=20,
+        default=Status.PENDING,
+        verbose_name=_("status"),
+    )
+    num_attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name=_("number of attempts")
+    )
+    next_attempt_time = models.DateTimeField(
+        default=timezone.now, verbose_name=_("next attempt")
+    )
+    last_error = models.TextField(blank=True, verbose_name=_("last error"))
+    creation_date = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("creation date")
+    )
+    sent_time = models.DateTimeField(null=True, blank=True, verbose_name=_("sent"))
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_time"], name="outboxemail_due_idx"
+            ),
+        ]
+        verbose_name = _("outbox email")
+        verbose_name_plural = _("outbox emails")
+
+    def __str__(self):
+        return f"{self.message.get('subject')} ({self.message.get('to')})"
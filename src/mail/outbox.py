@@ -0,0 +1,229 @@
+import uuid
+from collections.abc import Iterable, Sequence
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from mail.email import EmailConsumer, PersistentEmailConnection
+from mail.models import OutboxEmail
+from util.logging_utils import get_request_logger
+
+
+def enqueue_email(message: dict, *, idempotency_key: str = None) -> OutboxEmail:
+    """
+    Stores ``message`` in the outbox, as part of the current transaction, and makes
+    the email consumer send it when the transaction is committed - or sends it right
+    away (to the console) if ``settings.PRINT_EMAILS_TO_CONSOLE`` is set.
+    If the consumer can't be reached, the email is sent the next time the outbox is
+    drained; see ``send_outbox_emails()``.
+
+    :param message: A message dictionary, as described in the docstring of
+        ``EmailConsumer`` (attachments are not supported)
+    :param idempotency_key: If an email with this key has already been enqueued, no
+        new email is enqueued; defaults to a random key
+    :return: The enqueued email - or the existing one with the same key
+    """
+    if idempotency_key is None:
+        idempotency_key = uuid.uuid4().hex
+    outbox_email, created = OutboxEmail.objects.get_or_create(
+        idempotency_key=idempotency_key, defaults={"message": message}
+    )
+    if not created:
+        return outbox_email
+
+    _send_or_notify_consumer([outbox_email])
+    return outbox_email
+
+
+def enqueue_emails(messages: dict[str, dict]) -> int:
+    """
+    Like ``enqueue_email()``, but for several emails, which are stored using a
+    single query.
+
+    :param messages: The emails' idempotency keys as keys, and their message
+        dictionaries as values
+    :return: The number of enqueued emails, i.e. excluding the ones whose keys already
+        existed
+    """
+    existing_keys = set(
+        OutboxEmail.objects.filter(idempotency_key__in=messages).values_list(
+            "idempotency_key", flat=True
+        )
+    )
+    new_keys = [key for key in messages if key not in existing_keys]
+    if not new_keys:
+        return 0
+    # (Ignoring conflicts, in case some of the keys have been enqueued in the meantime)
+    OutboxEmail.objects.bulk_create(
+        (OutboxEmail(idempotency_key=key, message=messages[key]) for key in new_keys),
+        ignore_conflicts=True,
+    )
+    # (Fetching the emails, as `bulk_create()` doesn't set the pks when ignoring
+    # conflicts)
+    _send_or_notify_consumer(
+        OutboxEmail.objects.filter(
+            idempotency_key__in=new_keys, status=OutboxEmail.Status.PENDING
+        )
+    )
+    return len(new_keys)
+
+
+def _send_or_notify_consumer(outbox_emails: Iterable[OutboxEmail]):
+    if settings.PRINT_EMAILS_TO_CONSOLE:
+        outbox_emails = list(outbox_emails)
+
+        def send_to_console():
+            connection = PersistentEmailConnection(
+                "django.core.mail.backends.console.EmailBackend"
+            )
+            attempt_sending(outbox_emails, connection)
+            OutboxEmail.objects.bulk_update(outbox_emails, ATTEMPT_FIELDS)
+
+        # (Like the consumer, only sending the emails if the transaction is committed)
+        transaction.on_commit(send_to_console)
+        return
+
+    def notify_consumer():
+        try:
+            async_to_sync(get_channel_layer().send)("email", {"type": "send_outbox"})
+        # The emails are still sent the next time the outbox is drained
+        except Exception as e:  # noqa: BLE001
+            get_request_logger().exception(
+                "Failed notifying the email consumer about new outbox emails.",
+                exc_info=e,
+            )
+
+    transaction.on_commit(notify_consumer)
+
+
+# The fields changed by `attempt_sending()`
+ATTEMPT_FIELDS = [
+    "status",
+    "num_attempts",
+    "next_attempt_time",
+    "last_error",
+    "sent_time",
+]
+
+
+def attempt_sending(
+    outbox_emails: Sequence[OutboxEmail],
+    connection: PersistentEmailConnection,
+    *,
+    now=None,
+):
+    """
+    Sends ``outbox_emails`` with a single call to the connection's ``send_each()``,
+    and updates their fields (without saving them) according to whether each of them
+    was sent.
+    """
+    if now is None:
+        now = timezone.now()
+    messages = [
+        EmailConsumer.create_html_message(outbox_email.message)
+        if "html_render" in outbox_email.message
+        else EmailConsumer.create_message(outbox_email.message)
+        for outbox_email in outbox_emails
+    ]
+    errors = connection.send_each(messages)
+    for outbox_email, error in zip(outbox_emails, errors, strict=True):
+        outbox_email.num_attempts += 1
+        if error is None:
+            outbox_email.status = OutboxEmail.Status.SENT
+            outbox_email.sent_time = now
+            outbox_email.last_error = ""
+            continue
+
+        outbox_email.last_error = str(error) or type(error).__name__
+        if outbox_email.num_attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            outbox_email.status = OutboxEmail.Status.DEAD
+            get_request_logger().exception(
+                f"Giving up sending outbox email {outbox_email.pk} after"
+                f" {outbox_email.num_attempts} attempts.",
+                exc_info=error,
+            )
+        else:
+            outbox_email.next_attempt_time = now + get_retry_delay(
+                outbox_email.num_attempts
+            )
+
+
+def get_retry_delay(num_attempts: int) -> timedelta:
+    """
+    :return: The delay before the next attempt after ``num_attempts`` failed attempts;
+        doubles for each attempt
+    """
+    return timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_BASE_DELAY_SECONDS * 2 ** (num_attempts - 1)
+    )
+
+
+def send_outbox_emails(*, connection=None, batch_size: int = None) -> int:
+    """
+    Attempts sending all the outbox emails that are due, in batches of
+    ``batch_size``. Each batch is claimed in a short transaction - skipping emails
+    locked by others - by postponing its emails' next attempt by
+    ``settings.EMAIL_OUTBOX_LEASE_SECONDS``, so that several workers can drain the
+    outbox at the same time without sending an email twice, and without keeping the
+    rows locked while talking to the email server. If a worker dies while sending a
+    batch, its emails are attempted again when the lease has expired.
+
+    :param connection: Defaults to a new ``PersistentEmailConnection``, which is
+        closed afterwards
+    :param batch_size: Defaults to ``settings.EMAIL_OUTBOX_BATCH_SIZE``
+    :return: The number of emails that were attempted sent
+    """
+    if connection is None:
+        # Keep the connection open until all the batches have been sent
+        connection = PersistentEmailConnection()
+        try:
+            return send_outbox_emails(connection=connection, batch_size=batch_size)
+        finally:
+            connection.close()
+    if batch_size is None:
+        batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+
+    num_attempted = 0
+    while True:
+        outbox_emails = _claim_due_emails(batch_size)
+        attempt_sending(outbox_emails, connection)
+        OutboxEmail.objects.bulk_update(outbox_emails, ATTEMPT_FIELDS)
+        num_attempted += len(outbox_emails)
+        if len(outbox_emails) < batch_size:
+            return num_attempted
+
+
+def _claim_due_emails(batch_size: int) -> list[OutboxEmail]:
+    now = timezone.now()
+    lease_end_time = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+    with transaction.atomic():
+        outbox_emails = list(
+            OutboxEmail.objects.due(now)
+            .select_for_update(skip_locked=True)
+            .order_by("next_attempt_time", "pk")[:batch_size]
+        )
+        OutboxEmail.objects.filter(
+            pk__in=[outbox_email.pk for outbox_email in outbox_emails]
+        ).update(next_attempt_time=lease_end_time)
+    return outbox_emails
+
+
+def prune_sent_emails(*, now=None) -> int:
+    """
+    Deletes the emails that were sent more than
+    ``settings.EMAIL_OUTBOX_SENT_RETENTION_DAYS`` days ago. (Enqueuing an email with
+    the same idempotency key as a deleted one will send it again.)
+
+    :return: The number of deleted emails
+    """
+    if now is None:
+        now = timezone.now()
+    num_deleted, _deleted_per_model = OutboxEmail.objects.filter(
+        status=OutboxEmail.Status.SENT,
+        sent_time__lt=now - timedelta(days=settings.EMAIL_OUTBOX_SENT_RETENTION_DAYS),
+    ).delete()
+    return num_deleted
@@ -0,0 +1,179 @@
+import smtplib
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.template.loader import get_template
+from django.test import SimpleTestCase, override_settings
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+from mail.email import (
+    EmailConsumer,
+    PersistentEmailConnection,
+    fill_skeleton,
+    render_skeleton,
+)
+
+
+def create_message_dict(to: str, **kwargs) -> dict:
+    return {
+        "to": to,
+        "from": "from@makentnu.no",
+        "subject": "Subject",
+        "text": "Text",
+        **kwargs,
+    }
+
+
+class EmailConsumerTests(SimpleTestCase):
+    def setUp(self):
+        self.connection = PersistentEmailConnection(
+            "django.core.mail.backends.locmem.EmailBackend"
+        )
+        connection_patcher = patch.object(EmailConsumer, "connection", self.connection)
+        connection_patcher.start()
+        self.addCleanup(connection_patcher.stop)
+        self.consumer = EmailConsumer()
+
+    def test_connection_is_reused_between_messages(self):
+        self.consumer.send_text(create_message_dict("a@makentnu.no"))
+        backend = self.connection.connection
+        self.consumer.send_html(
+            create_message_dict("b@makentnu.no", html_render="<p>HTML</p>")
+        )
+        self.assertIs(self.connection.connection, backend)
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[1].alternatives[0][0], "<p>HTML</p>")
+        stats = self.connection.get_stats()
+        self.assertEqual(stats["sent"], 2)
+        self.assertEqual(stats["failed"], 0)
+        self.assertEqual(stats["reconnects"], 0)
+
+    def test_reconnects_and_retries_when_server_has_disconnected(self):
+        self.consumer.send_text(create_message_dict("a@makentnu.no"))
+        original_send_messages = EmailBackend.send_messages
+        calls = []
+
+        def send_messages(backend, messages):
+            calls.append(backend)
+            if len(calls) == 1:
+                raise smtplib.SMTPServerDisconnected
+            return original_send_messages(backend, messages)
+
+        with patch.object(EmailBackend, "send_messages", send_messages):
+            self.consumer.send_text(create_message_dict("b@makentnu.no"))
+        # The message should have been retried through a new connection
+        self.assertEqual(len(calls), 2)
+        self.assertIsNot(calls[0], calls[1])
+        self.assertListEqual(
+            [message.to for message in mail.outbox],
+            [["a@makentnu.no"], ["b@makentnu.no"]],
+        )
+        self.assertEqual(self.connection.get_stats()["reconnects"], 1)
+
+    def test_only_unsent_messages_are_retried_when_server_has_disconnected(self):
+        original_send_messages = EmailBackend.send_messages
+        calls = []
+
+        def send_messages(backend, messages):
+            calls.append(messages[0].to)
+            if len(calls) == 2:  # noqa: PLR2004
+                raise smtplib.SMTPServerDisconnected
+            return original_send_messages(backend, messages)
+
+        messages = [
+            EmailConsumer.create_message(create_message_dict(f"{i}@makentnu.no"))
+            for i in range(3)
+        ]
+        with patch.object(EmailBackend, "send_messages", send_messages):
+            errors = self.connection.send_each(messages)
+        self.assertListEqual(errors, [None, None, None])
+        self.assertListEqual(
+            calls,
+            [
+                ["0@makentnu.no"],
+                ["1@makentnu.no"],
+                ["1@makentnu.no"],
+                ["2@makentnu.no"],
+            ],
+        )
+        self.assertListEqual(
+            [message.to for message in mail.outbox],
+            [["0@makentnu.no"], ["1@makentnu.no"], ["2@makentnu.no"]],
+        )
+        self.assertEqual(self.connection.get_stats()["reconnects"], 1)
+
+    def test_failures_are_counted_and_do_not_stop_the_consumer(self):
+        with patch.object(
+            EmailBackend,
+            "send_messages",
+            side_effect=smtplib.SMTPRecipientsRefused({}),
+        ):
+            self.consumer.send_text(create_message_dict("a@makentnu.no"))
+        self.assertEqual(self.connection.get_stats()["failed"], 1)
+        self.assertIsNone(self.connection.connection)
+
+        self.consumer.send_text(create_message_dict("b@makentnu.no"))
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_CONNECTION_MAX_IDLE_SECONDS=0)
+    def test_idle_connection_is_replaced_if_no_longer_alive(self):
+        self.consumer.send_text(create_message_dict("a@makentnu.no"))
+        backend = self.connection.connection
+
+        with patch.object(PersistentEmailConnection, "_is_alive", return_value=True):
+            self.consumer.send_text(create_message_dict("b@makentnu.no"))
+        self.assertIs(self.connection.connection, backend)
+
+        with patch.object(PersistentEmailConnection, "_is_alive", return_value=False):
+            self.consumer.send_text(create_message_dict("c@makentnu.no"))
+        self.assertIsNot(self.connection.connection, backend)
+        self.assertEqual(self.connection.get_stats()["reconnects"], 1)
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class EmailSkeletonTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_skeleton_is_only_rendered_once_per_cache_key(self):
+        context = {"ticket": {"comment": "[[comment]]"}}
+        with patch("mail.email.get_template", wraps=get_template) as get_template_mock:
+            for _i in range(3):
+                skeleton = render_skeleton(
+                    None,
+                    context,
+                    "email/ticket.txt",
+                    cache_key_parts=("key", 1),
+                    strip=True,
+                )
+            self.assertEqual(get_template_mock.call_count, 1)
+            self.assertIn("[[comment]]", skeleton)
+
+            render_skeleton(
+                None, context, "email/ticket.txt", cache_key_parts=("key", 2)
+            )
+            with translation.override("nb"):
+                render_skeleton(
+                    None, context, "email/ticket.txt", cache_key_parts=("key", 1)
+                )
+            self.assertEqual(get_template_mock.call_count, 3)
+
+    def test_fill_skeleton_escapes_values_and_replaces_in_a_single_pass(self):
+        skeleton = "<p>[[a]]</p><p>[[b]]</p>"
+        values = {"[[a]]": "<b>[[b]]</b>", "[[b]]": "&"}
+        self.assertEqual(
+            fill_skeleton(skeleton, values),
+            "<p>&lt;b&gt;[[b]]&lt;/b&gt;</p><p>&amp;</p>",
+        )
+        self.assertEqual(
+            fill_skeleton(skeleton, values, autoescape=False),
+            "<p><b>[[b]]</b></p><p>&</p>",
+        )
+        self.assertEqual(
+            fill_skeleton(skeleton, {"[[a]]": mark_safe("<b>")}),
+            "<p><b></p><p>[[b]]</p>",
+        )
@@ -0,0 +1,180 @@
+import smtplib
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from mail.email import EmailConsumer, PersistentEmailConnection
+from mail.mailing import create_mailing_job, send_mailing_job
+from mail.models import MailingJob, MailingRecipient
+from users.models import User
+
+
+class MailingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.rendered_messages = {
+            "en": {"subject": "Subject", "text": "Text", "html": "<p>HTML</p>"},
+            "nb": {"subject": "Emne", "text": "Tekst", "html": "<p>HTML</p>"},
+        }
+
+    def create_job(self, recipients) -> MailingJob:
+        return create_mailing_job(
+            name="Mailing",
+            from_email="from@makentnu.no",
+            rendered_messages=self.rendered_messages,
+            recipients=recipients,
+            created_by=self.user,
+        )
+
+    def test_create_mailing_job_skips_duplicate_and_empty_email_addresses(self):
+        job = self.create_job(
+            [("a@makentnu.no", "en"), ("a@makentnu.no", "en"), ("", "nb")]
+        )
+        self.assertEqual(job.status, MailingJob.Status.PENDING)
+        self.assertListEqual(
+            list(job.recipients.values_list("email", flat=True)), ["a@makentnu.no"]
+        )
+
+    def test_send_mailing_job_sends_each_recipient_their_language(self):
+        job = self.create_job(
+            [(f"{i}@makentnu.no", "en" if i % 2 else "nb") for i in range(5)]
+        )
+        connection = PersistentEmailConnection(
+            "django.core.mail.backends.locmem.EmailBackend"
+        )
+        with patch("mail.email.get_connection", wraps=get_connection) as get_mock:
+            has_pending_recipients = send_mailing_job(
+                job, connection=connection, chunk_size=2
+            )
+        self.assertFalse(has_pending_recipients)
+        # A single connection should be used for all the chunks
+        get_mock.assert_called_once()
+        self.assertEqual(connection.get_stats()["batches"], 3)  # noqa: PLR2004
+
+        self.assertEqual(len(mail.outbox), 5)
+        for message in mail.outbox:
+            (email,) = message.to
+            expected_subject = "Subject" if int(email[0]) % 2 else "Emne"
+            self.assertEqual(message.subject, expected_subject)
+            self.assertEqual(message.from_email, "from@makentnu.no")
+            self.assertEqual(message.alternatives[0][0], "<p>HTML</p>")
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, MailingJob.Status.FINISHED)
+        self.assertIsNotNone(job.finished_date)
+        self.assertFalse(
+            job.recipients.exclude(status=MailingRecipient.Status.SENT).exists()
+        )
+        self.assertFalse(job.recipients.filter(sent_time=None).exists())
+
+    def test_send_mailing_job_records_failures_and_only_sends_pending_emails(self):
+        job = self.create_job([(f"{i}@makentnu.no", "en") for i in range(3)])
+        job.recipients.filter(email="0@makentnu.no").update(
+            status=MailingRecipient.Status.SENT
+        )
+        original_send_messages = EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            if messages[0].to == ["1@makentnu.no"]:
+                raise smtplib.SMTPRecipientsRefused({"1@makentnu.no": (550, b"")})
+            return original_send_messages(backend, messages)
+
+        with patch.object(EmailBackend, "send_messages", send_messages):
+            send_mailing_job(
+                job,
+                connection=PersistentEmailConnection(
+                    "django.core.mail.backends.locmem.EmailBackend"
+                ),
+            )
+
+        self.assertListEqual(
+            [message.to for message in mail.outbox], [["2@makentnu.no"]]
+        )
+        failed_recipient = job.recipients.get(email="1@makentnu.no")
+        self.assertEqual(failed_recipient.status, MailingRecipient.Status.FAILED)
+        self.assertNotEqual(failed_recipient.error, "")
+        self.assertEqual(
+            job.recipients.get(email="2@makentnu.no").status,
+            MailingRecipient.Status.SENT,
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, MailingJob.Status.FINISHED_WITH_ERRORS)
+        self.assertIsNotNone(job.finished_date)
+
+    def test_send_mailing_job_keeps_recipients_pending_if_connecting_fails(self):
+        job = self.create_job([(f"{i}@makentnu.no", "en") for i in range(2)])
+        connection = PersistentEmailConnection(
+            "django.core.mail.backends.locmem.EmailBackend"
+        )
+        with patch.object(
+            EmailBackend, "open", side_effect=smtplib.SMTPConnectError(421, b"")
+        ):
+            has_pending_recipients = send_mailing_job(job, connection=connection)
+        self.assertFalse(has_pending_recipients)
+
+        self.assertEqual(len(mail.outbox), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MailingJob.Status.FAILED)
+        self.assertIsNone(job.finished_date)
+        self.assertFalse(
+            job.recipients.exclude(status=MailingRecipient.Status.PENDING).exists()
+        )
+
+    @override_settings(
+        PRINT_EMAILS_TO_CONSOLE=False,
+        EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+        MAILING_CHUNK_SIZE=2,
+        MAILING_MAX_EMAILS_PER_SECOND=1,
+    )
+    def test_email_consumer_sends_a_single_chunk_per_message(self):
+        job = self.create_job([(f"{i}@makentnu.no", "en") for i in range(3)])
+        connection = PersistentEmailConnection()
+        connection_patcher = patch.object(EmailConsumer, "connection", connection)
+        connection_patcher.start()
+        self.addCleanup(connection_patcher.stop)
+        with (
+            patch("mail.mailing.async_to_sync") as async_to_sync_mock,
+            patch("mail.email.time.time", return_value=1000),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            EmailConsumer().send_mailing({"type": "send_mailing", "job": job.pk})
+        self.assertEqual(len(mail.outbox), 2)
+        # The rest of the job should have been enqueued, to not be sent before the
+        # chunk's minimum duration (2 emails at 1 email per second) has passed
+        async_to_sync_mock.return_value.assert_called_once_with(
+            "email", {"type": "send_mailing", "job": job.pk, "not_before": 1002}
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, MailingJob.Status.SENDING)
+
+        # The message should be put back on the channel if it arrives too early
+        with (
+            patch("mail.mailing.async_to_sync") as async_to_sync_mock,
+            patch("mail.email.time.time", return_value=1001),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            EmailConsumer().send_mailing(
+                {"type": "send_mailing", "job": job.pk, "not_before": 1002}
+            )
+        async_to_sync_mock.return_value.assert_called_once_with(
+            "email", {"type": "send_mailing", "job": job.pk, "not_before": 1002}
+        )
+        self.assertEqual(len(mail.outbox), 2)
+
+        with (
+            patch("mail.mailing.async_to_sync") as async_to_sync_mock,
+            patch("mail.email.time.time", return_value=1002),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            EmailConsumer().send_mailing(
+                {"type": "send_mailing", "job": job.pk, "not_before": 1002}
+            )
+        async_to_sync_mock.assert_not_called()
+        self.assertEqual(len(mail.outbox), 3)
+        # The consumer's connection should have been reused for both chunks
+        self.assertEqual(connection.get_stats()["reconnects"], 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MailingJob.Status.FINISHED)
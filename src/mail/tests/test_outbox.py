@@ -0,0 +1,187 @@
+import io
+import smtplib
+from contextlib import redirect_stdout
+from datetime import timedelta
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from mail.email import PersistentEmailConnection
+from mail.models import OutboxEmail
+from mail.outbox import (
+    enqueue_email,
+    get_retry_delay,
+    prune_sent_emails,
+    send_outbox_emails,
+)
+
+
+def create_message_dict(to: str) -> dict:
+    return {
+        "to": to,
+        "from": "from@makentnu.no",
+        "subject": "Subject",
+        "text": "Text",
+        "html_render": "<p>HTML</p>",
+    }
+
+
+@override_settings(
+    PRINT_EMAILS_TO_CONSOLE=False,
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BASE_DELAY_SECONDS=60,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.connection = PersistentEmailConnection(
+            "django.core.mail.backends.locmem.EmailBackend"
+        )
+
+    def test_enqueue_email_is_idempotent_and_notifies_consumer_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            outbox_email = enqueue_email(
+                create_message_dict("a@makentnu.no"), idempotency_key="key"
+            )
+            duplicate = enqueue_email(
+                create_message_dict("a@makentnu.no"), idempotency_key="key"
+            )
+        self.assertEqual(duplicate, outbox_email)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertDictEqual(
+            async_to_sync(get_channel_layer().receive)("email"),
+            {"type": "send_outbox"},
+        )
+        # Nothing should have been sent yet
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(outbox_email.status, OutboxEmail.Status.PENDING)
+
+    def test_email_is_not_lost_if_consumer_is_unreachable(self):
+        with (
+            patch("mail.outbox.get_channel_layer", side_effect=ConnectionError),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            outbox_email = enqueue_email(create_message_dict("a@makentnu.no"))
+
+        self.assertEqual(send_outbox_emails(connection=self.connection), 1)
+        self.assertListEqual(
+            [message.to for message in mail.outbox], [["a@makentnu.no"]]
+        )
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>HTML</p>")
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, OutboxEmail.Status.SENT)
+        self.assertIsNotNone(outbox_email.sent_time)
+        # Already sent emails should not be sent again
+        self.assertEqual(send_outbox_emails(connection=self.connection), 0)
+
+    def test_failed_emails_are_retried_with_backoff_and_then_dead_lettered(self):
+        outbox_email = enqueue_email(create_message_dict("a@makentnu.no"))
+        enqueue_email(create_message_dict("b@makentnu.no"))
+        original_send_messages = EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            if messages[0].to == ["a@makentnu.no"]:
+                raise smtplib.SMTPDataError(451, b"Try again later")
+            return original_send_messages(backend, messages)
+
+        with patch.object(EmailBackend, "send_messages", send_messages):
+            # Should be sent in batches
+            self.assertEqual(
+                send_outbox_emails(connection=self.connection, batch_size=1), 2
+            )
+            self.assertListEqual(
+                [message.to for message in mail.outbox], [["b@makentnu.no"]]
+            )
+            outbox_email.refresh_from_db()
+            self.assertEqual(outbox_email.status, OutboxEmail.Status.PENDING)
+            self.assertEqual(outbox_email.num_attempts, 1)
+            self.assertIn("Try again later", outbox_email.last_error)
+            self.assertGreater(outbox_email.next_attempt_time, timezone.now())
+            # The email should not be retried before the delay has passed
+            self.assertEqual(send_outbox_emails(connection=self.connection), 0)
+
+            for expected_num_attempts in (2, 3):
+                OutboxEmail.objects.update(next_attempt_time=timezone.now())
+                self.assertEqual(send_outbox_emails(connection=self.connection), 1)
+                outbox_email.refresh_from_db()
+                self.assertEqual(outbox_email.num_attempts, expected_num_attempts)
+
+        self.assertEqual(outbox_email.status, OutboxEmail.Status.DEAD)
+        OutboxEmail.objects.update(next_attempt_time=timezone.now())
+        self.assertEqual(send_outbox_emails(connection=self.connection), 0)
+
+    @override_settings(EMAIL_OUTBOX_LEASE_SECONDS=60)
+    def test_emails_are_claimed_before_being_sent(self):
+        outbox_email = enqueue_email(create_message_dict("a@makentnu.no"))
+        original_send_messages = EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            # The email should have been claimed in a committed transaction before
+            # being sent, so that other workers don't send it as well
+            outbox_email.refresh_from_db()
+            self.assertGreater(outbox_email.next_attempt_time, timezone.now())
+            self.assertFalse(OutboxEmail.objects.due().exists())
+            return original_send_messages(backend, messages)
+
+        with patch.object(EmailBackend, "send_messages", send_messages):
+            self.assertEqual(send_outbox_emails(connection=self.connection), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+        # An email claimed by a worker that died should be sent when the lease expires
+        outbox_email2 = enqueue_email(create_message_dict("b@makentnu.no"))
+        with patch.object(EmailBackend, "send_messages", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                send_outbox_emails(connection=self.connection)
+        self.assertEqual(send_outbox_emails(connection=self.connection), 0)
+        with patch(
+            "django.utils.timezone.now",
+            return_value=timezone.now() + timedelta(seconds=61),
+        ):
+            self.assertEqual(send_outbox_emails(connection=self.connection), 1)
+        outbox_email2.refresh_from_db()
+        self.assertEqual(outbox_email2.status, OutboxEmail.Status.SENT)
+
+    @override_settings(PRINT_EMAILS_TO_CONSOLE=True)
+    def test_emails_are_only_printed_to_console_when_committed(self):
+        console_output = io.StringIO()
+        with redirect_stdout(console_output):
+            with self.captureOnCommitCallbacks() as callbacks:
+                outbox_email = enqueue_email(create_message_dict("a@makentnu.no"))
+            self.assertEqual(console_output.getvalue(), "")
+            for callback in callbacks:
+                callback()
+        self.assertIn("a@makentnu.no", console_output.getvalue())
+        outbox_email.refresh_from_db()
+        self.assertEqual(outbox_email.status, OutboxEmail.Status.SENT)
+
+    @override_settings(EMAIL_OUTBOX_SENT_RETENTION_DAYS=30)
+    def test_prune_sent_emails_only_deletes_old_sent_emails(self):
+        now = timezone.now()
+        for key, status, sent_time in (
+            ("old_sent", OutboxEmail.Status.SENT, now - timedelta(days=31)),
+            ("new_sent", OutboxEmail.Status.SENT, now - timedelta(days=29)),
+            ("old_dead", OutboxEmail.Status.DEAD, None),
+            ("pending", OutboxEmail.Status.PENDING, None),
+        ):
+            OutboxEmail.objects.create(
+                idempotency_key=key,
+                message=create_message_dict("a@makentnu.no"),
+                status=status,
+                sent_time=sent_time,
+            )
+        self.assertEqual(prune_sent_emails(now=now), 1)
+        self.assertSetEqual(
+            set(OutboxEmail.objects.values_list("idempotency_key", flat=True)),
+            {"new_sent", "old_dead", "pending"},
+        )
+
+    def test_retry_delay_doubles_for_each_attempt(self):
+        self.assertListEqual(
+            [get_retry_delay(num_attempts) for num_attempts in (1, 2, 3)],
+            [timedelta(minutes=1), timedelta(minutes=2), timedelta(minutes=4)],
+        )
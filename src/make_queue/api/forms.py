@@ -1,6 +1,12 @@
+from datetime import timedelta
+
 from django import forms
+from django.db import models
 
+from make_queue.free_slots import FreeSlotFinder
+from make_queue.models.machine import Machine
 from make_queue.models.reservation import Reservation
+from news.models import TimePlace
 
 
 class APIMachineDataQueryForm(forms.Form):
@@ -37,3 +43,79 @@ class APIReservationListQueryForm(forms.Form):
                 )
 
         return cleaned_data
+
+
+class APIReservationCalendarQueryForm(APIReservationListQueryForm):
+    since = forms.IntegerField(min_value=0, required=False)
+
+
+class APIFreeSlotListQueryForm(forms.Form):
+    MAX_LIMIT = 500
+
+    hours = forms.IntegerField(min_value=0, required=False)
+    minutes = forms.IntegerField(min_value=0, max_value=59, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=MAX_LIMIT, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field_name in ("hours", "minutes"):
+            if cleaned_data.get(field_name) is None:
+                cleaned_data[field_name] = 0
+        if cleaned_data.get("limit") is None:
+            cleaned_data["limit"] = FreeSlotFinder.DEFAULT_LIMIT
+        return cleaned_data
+
+
+class APIBulkReservationCreateForm(forms.Form):
+    """
+    Either ``time_places`` must be provided - in which case event reservations are
+    created during each of the time places - or ``start_time``, ``end_time`` and
+    ``special_text`` - in which case special reservations are created from
+    ``start_time`` to ``end_time``, repeated ``count`` times with ``interval`` in
+    between.
+    """
+
+    MAX_COUNT = 52
+
+    class Interval(models.TextChoices):
+        DAY = "day"
+        WEEK = "week"
+
+    INTERVAL_TO_TIMEDELTA = {
+        Interval.DAY: timedelta(days=1),
+        Interval.WEEK: timedelta(weeks=1),
+    }
+
+    machines = forms.ModelMultipleChoiceField(Machine.objects.all())
+    time_places = forms.ModelMultipleChoiceField(
+        TimePlace.objects.all(), required=False
+    )
+    start_time = forms.DateTimeField(required=False)
+    end_time = forms.DateTimeField(required=False)
+    interval = forms.ChoiceField(choices=Interval.choices, required=False)
+    count = forms.IntegerField(min_value=1, max_value=MAX_COUNT, required=False)
+    special_text = forms.CharField(required=False)
+    comment = forms.CharField(required=False)
+    skip_conflicts = forms.BooleanField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("time_places"):
+            return cleaned_data
+
+        code = "required_without_time_places"
+        errors = {
+            field_name: forms.ValidationError(
+                "This is required when 'time_places' is not provided.", code=code
+            )
+            for field_name in ("start_time", "end_time", "special_text")
+            if not cleaned_data.get(field_name) and field_name not in self.errors
+        }
+        if errors:
+            raise forms.ValidationError(errors)
+
+        if cleaned_data.get("count") is None:
+            cleaned_data["count"] = 1
+        interval = cleaned_data.get("interval") or self.Interval.WEEK
+        cleaned_data["interval"] = self.INTERVAL_TO_TIMEDELTA[interval]
+        return cleaned_data
@@ -1,12 +1,35 @@
+from datetime import timedelta
 from http import HTTPStatus
 
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.utils.translation import gettext_lazy as _
-from django.views.generic import DeleteView, ListView, TemplateView, UpdateView
+from django.views.generic import (
+    DeleteView,
+    FormView,
+    ListView,
+    TemplateView,
+    UpdateView,
+)
 
-from make_queue.api.forms import APIMachineDataQueryForm, APIReservationListQueryForm
-from make_queue.models.reservation import Quota, Reservation, ReservationRule
+from make_queue.api.forms import (
+    APIBulkReservationCreateForm,
+    APIFreeSlotListQueryForm,
+    APIMachineDataQueryForm,
+    APIReservationCalendarQueryForm,
+    APIReservationListQueryForm,
+)
+from make_queue.bulk_reservations import BulkReservationCreator
+from make_queue.free_slots import FreeSlotFinder
+from make_queue.models.reservation import (
+    DeletedReservation,
+    QuotaEvaluator,
+    Reservation,
+    ReservationRule,
+)
 from make_queue.templatetags.reservation_extra import (
     can_delete_reservation,
     can_mark_reservation_finished,
@@ -47,12 +70,9 @@ class APIMachineDataView(
                     end_time__gte=timezone.now()
                 ).exclude(pk=exclude_reservation_pk)
             ],
-            "can_ignore_rules": any(
-                quota.can_create_more_reservations(self.request.user)
-                for quota in Quota.get_user_quotas(
-                    self.request.user, self.machine.machine_type
-                ).filter(ignore_rules=True)
-            ),
+            "can_ignore_rules": QuotaEvaluator.for_request(
+                self.request, self.request.user, self.machine.machine_type
+            ).can_ignore_rules(),
             "rules": [
                 {
                     "periods": rule.get_exact_start_and_end_times_list(
@@ -93,6 +113,43 @@ class APIReservationRuleListView(MachineTypeRelatedViewMixin, ListView):
         return UTF8JsonResponse(context)
 
 
+class APIFreeSlotListView(
+    LoginRequiredMixin,
+    MachineTypeRelatedViewMixin,
+    QueryParameterFormMixin,
+    TemplateView,
+):
+    form_class = APIFreeSlotListQueryForm
+
+    def get_context_data(self, **kwargs):
+        required_duration = timedelta(
+            hours=self.query_params["hours"], minutes=self.query_params["minutes"]
+        )
+        free_slots = FreeSlotFinder(
+            self.machine_type,
+            self.request.user,
+            quota_evaluator=QuotaEvaluator.for_request(
+                self.request, self.request.user, self.machine_type
+            ),
+        ).find_slots(required_duration, limit=self.query_params["limit"])
+        return {
+            "free_slots": [
+                {
+                    "machine": {
+                        "pk": slot.machine.pk,
+                        "name": slot.machine.name,
+                    },
+                    "start_time": iso_datetime_format(slot.start_time),
+                    "end_time": iso_datetime_format(slot.end_time),
+                }
+                for slot in free_slots
+            ],
+        }
+
+    def render_to_response(self, context, **response_kwargs):
+        return UTF8JsonResponse(context)
+
+
 def reservation_type(reservation: Reservation, user: User):
     if reservation.special:
         return "make"
@@ -121,17 +178,31 @@ class APIReservationListView(
         )
 
     def get_context_data(self, **kwargs):
+        can_view_user = self.request.user.has_perm(
+            "make_queue.can_view_reservation_user"
+        )
         return {
             "reservations": [
-                self.build_reservation_dict(reservation, self.request.user)
+                self.build_reservation_dict(
+                    reservation, self.request.user, can_view_user=can_view_user
+                )
                 for reservation in self.object_list
             ]
         }
 
     @staticmethod
     def build_reservation_dict(
-        reservation: Reservation, request_user: User
+        reservation: Reservation, request_user: User, *, can_view_user: bool = None
     ) -> dict[str, str]:
+        """
+        :param can_view_user: Whether ``request_user`` has the
+            ``can_view_reservation_user`` permission; can be passed to avoid checking
+            the permission once per reservation
+        """
+        if can_view_user is None:
+            can_view_user = request_user.has_perm(
+                "make_queue.can_view_reservation_user"
+            )
         reservation_data = {
             "start": iso_datetime_format(reservation.start_time),
             "end": iso_datetime_format(reservation.end_time),
@@ -147,7 +218,7 @@ class APIReservationListView(
             )
         elif reservation.special:
             reservation_data["displayText"] = reservation.special_text
-        elif request_user.has_perm("make_queue.can_view_reservation_user"):
+        elif can_view_user:
             reservation_data.update(
                 {
                     "user": reservation.user.get_full_name(),
@@ -161,6 +232,148 @@ class APIReservationListView(
         return UTF8JsonResponse(context)
 
 
+class APIReservationCalendarView(APIReservationListView):
+    """
+    Like ``APIReservationListView``, but versioned using the machine's
+    ``reservations_version``, which makes it cheap to poll:
+
+    * The response has an ``ETag`` header derived from the version, and requests
+      with a matching ``If-None-Match`` header are responded to with
+      ``304 Not Modified``, without querying the reservations.
+    * If the ``since`` query parameter is provided, only the reservations created or
+      changed after that version are included, and the pks of the reservations that
+      have been deleted since then (or moved outside the requested period) are listed
+      under ``deleted`` - unless the version is too old (see ``get_since()``). The
+      response's ``since`` is ``null`` if all the reservations are included.
+
+    NOTE: Changes to e.g. the users or events that the reservations are connected to
+          do not change the version.
+    """
+
+    form_class = APIReservationCalendarQueryForm
+
+    def get(self, request, *args, **kwargs):
+        can_view_user = request.user.has_perm("make_queue.can_view_reservation_user")
+        self.can_view_user = can_view_user
+        # The response's contents depend on the user
+        self.etag = quote_etag(
+            f"{self.machine.reservations_version}-{request.user.pk}-{can_view_user:d}"
+        )
+        response = get_conditional_response(request, etag=self.etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in {HTTPStatus.OK, HTTPStatus.NOT_MODIFIED}:
+            response.headers["ETag"] = self.etag
+            # Make browsers revalidate the response every time it's requested
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_since(self) -> int | None:
+        since = self.query_params["since"]
+        # The deleted reservations of older versions might have been deleted (see
+        # `DeletedReservation.record()`), so all the reservations are included instead
+        if (
+            since is not None
+            and self.machine.reservations_version - since
+            > DeletedReservation.MAX_VERSION_AGE
+        ):
+            return None
+        return since
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        since = self.get_since()
+        if since is None:
+            return queryset
+        # Reservations that have been changed to no longer overlap the requested period
+        # must be included, so that they can be listed as deleted
+        return (
+            self.machine.reservations.filter(version__gt=since)
+            .select_related("user")
+            .prefetch_related("event__event")
+        )
+
+    def get_context_data(self, **kwargs):
+        start_time = self.query_params["start_date"]
+        end_time = self.query_params["end_date"]
+        since = self.get_since()
+        reservations = []
+        deleted_reservation_pks = []
+        for reservation in self.object_list:
+            if reservation.start_time < end_time and reservation.end_time > start_time:
+                reservations.append(
+                    {
+                        "pk": reservation.pk,
+                        **self.build_reservation_dict(
+                            reservation,
+                            self.request.user,
+                            can_view_user=self.can_view_user,
+                        ),
+                    }
+                )
+            else:
+                deleted_reservation_pks.append(reservation.pk)
+
+        if since is not None:
+            deleted_reservation_pks.extend(
+                self.machine.deleted_reservations.filter(
+                    version__gt=since, start_time__lt=end_time, end_time__gt=start_time
+                ).values_list("reservation_pk", flat=True)
+            )
+        return {
+            "version": self.machine.reservations_version,
+            "since": since,
+            "reservations": reservations,
+            "deleted": deleted_reservation_pks,
+        }
+
+
+class APIBulkReservationCreateView(
+    PermissionRequiredMixin, PreventGetRequestsMixin, FormView
+):
+    """
+    Creates event or special reservations for several machines and periods at once,
+    using ``BulkReservationCreator``. The response lists the outcome of each requested
+    reservation - see ``BulkReservationItem.to_dict()``.
+    """
+
+    permission_required = ("make_queue.can_create_event_reservation",)
+    form_class = APIBulkReservationCreateForm
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        creator = BulkReservationCreator(self.request.user, data["machines"])
+        try:
+            if data["time_places"]:
+                items = creator.create_for_time_places(
+                    data["time_places"],
+                    comment=data["comment"],
+                    skip_conflicts=data["skip_conflicts"],
+                )
+            else:
+                items = creator.create_for_periods(
+                    creator.get_recurring_periods(
+                        data["start_time"],
+                        data["end_time"],
+                        interval=data["interval"],
+                        count=data["count"],
+                    ),
+                    special_text=data["special_text"],
+                    comment=data["comment"],
+                    skip_conflicts=data["skip_conflicts"],
+                )
+        # Another reservation was created in the meantime, on database systems not
+        # supporting locking the machines
+        except ValidationError:
+            return UTF8JsonResponse(
+                {"message": _("Not a valid reservation")}, status=HTTPStatus.CONFLICT
+            )
+        return UTF8JsonResponse({"items": [item.to_dict() for item in items]})
+
+    def form_invalid(self, form):
+        return UTF8JsonResponse(form.errors, status=HTTPStatus.BAD_REQUEST)
+
+
 class APIReservationMarkFinishedView(
     PermissionRequiredMixin, PreventGetRequestsMixin, UpdateView
 ):
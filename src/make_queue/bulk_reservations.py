@@ -0,0 +1,275 @@
+import bisect
+import itertools
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from enum import StrEnum
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import IntegrityError, transaction
+
+from make_queue.consumers import broadcast_machine_update_on_commit
+from make_queue.models.machine import Machine
+from make_queue.models.reservation import (
+    NO_OVERLAP_CONSTRAINT_NAME,
+    Reservation,
+    ReservationValidationResult,
+)
+from news.models import TimePlace
+from users.models import User
+from util.locale_utils import iso_datetime_format
+
+
+@dataclass(kw_only=True)
+class BulkReservationItem:
+    class Status(StrEnum):
+        CREATED = "created"
+        # Overlaps an existing reservation, or another item
+        CONFLICT = "conflict"
+        # E.g. starts after it ends, or the user cannot use the machine
+        INVALID = "invalid"
+
+    reservation: Reservation
+    status: Status = None
+    # The pks of the existing reservations that the reservation overlaps
+    conflicting_reservation_pks: list[int] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "machine": self.reservation.machine_id,
+            "start_time": iso_datetime_format(self.reservation.start_time),
+            "end_time": iso_datetime_format(self.reservation.end_time),
+            "event": self.reservation.event_id,
+            "status": self.status,
+            "reservation": self.reservation.pk,
+            "conflicting_reservations": self.conflicting_reservation_pks,
+        }
+
+
+class BulkReservationCreator:
+    """
+    Creates event or special reservations for several machines and periods at once
+    - e.g. for blocking the printers during all the occurrences of a course.
+
+    Instead of calling ``Reservation.validate()`` and ``Reservation.save()`` for each
+    reservation, which would query the database several times per reservation, this:
+
+    1. locks the machines;
+    2. fetches all the existing reservations of the machines that might overlap any
+       of the new reservations in a single query, and finds the overlaps (both with
+       the existing reservations and between the new ones) in memory;
+    3. inserts the reservations that can be created using a single ``bulk_create()``
+       call, and increments each machine's ``reservations_version`` once;
+
+    all in the same transaction. The result contains one ``BulkReservationItem`` per
+    requested reservation, describing whether it was created, and if not, why.
+    """
+
+    def __init__(self, user: User, machines: Iterable[Machine]):
+        self.user = user
+        self.machines = list(machines)
+
+    @staticmethod
+    def get_recurring_periods(
+        start_time: datetime, end_time: datetime, *, interval: timedelta, count: int
+    ) -> list[tuple[datetime, datetime]]:
+        """Returns ``count`` periods, the first being from ``start_time`` to
+        ``end_time``, and each of the rest starting ``interval`` after the previous
+        one."""
+        return [
+            (start_time + i * interval, end_time + i * interval) for i in range(count)
+        ]
+
+    def create_for_periods(
+        self,
+        periods: Iterable[tuple[datetime, datetime]],
+        *,
+        special_text: str,
+        comment: str = "",
+        skip_conflicts=True,
+    ) -> list[BulkReservationItem]:
+        """Creates special reservations for all the machines in all of ``periods``."""
+        return self.create(
+            [
+                Reservation(
+                    user=self.user,
+                    machine=machine,
+                    start_time=start_time,
+                    end_time=end_time,
+                    special=True,
+                    special_text=special_text,
+                    comment=comment,
+                )
+                for start_time, end_time in periods
+                for machine in self.machines
+            ],
+            skip_conflicts=skip_conflicts,
+        )
+
+    def create_for_time_places(
+        self,
+        time_places: Iterable[TimePlace],
+        *,
+        comment: str = "",
+        skip_conflicts=True,
+    ) -> list[BulkReservationItem]:
+        """Creates event reservations for all the machines during all of
+        ``time_places``."""
+        return self.create(
+            [
+                Reservation(
+                    user=self.user,
+                    machine=machine,
+                    start_time=time_place.start_time,
+                    end_time=time_place.end_time,
+                    event=time_place,
+                    comment=comment,
+                )
+                for time_place in time_places
+                for machine in self.machines
+            ],
+            skip_conflicts=skip_conflicts,
+        )
+
+    def create(
+        self, reservations: list[Reservation], *, skip_conflicts=True
+    ) -> list[BulkReservationItem]:
+        """
+        :param reservations: Unsaved event or special reservations for (some of)
+            ``self.machines``
+        :param skip_conflicts: Whether to create the reservations that can be created
+            even if some of the others cannot; if ``False``, no reservations are
+            created unless all of them can be
+        """
+        if not self.user.has_perm("make_queue.can_create_event_reservation"):
+            raise PermissionDenied
+        items = [BulkReservationItem(reservation=r) for r in reservations]
+        if not items:
+            return items
+
+        try:
+            with transaction.atomic():
+                self._create(items, skip_conflicts=skip_conflicts)
+        except IntegrityError as e:
+            # See `Reservation.save()`
+            if NO_OVERLAP_CONSTRAINT_NAME in str(e):
+                raise ValidationError(
+                    "Not a valid reservation",
+                    code=ReservationValidationResult.Code.OVERLAPPING,
+                ) from e
+            raise
+        return items
+
+    def _create(self, items: list[BulkReservationItem], *, skip_conflicts: bool):
+        machine_pks = {item.reservation.machine_id for item in items}
+        # Prevents other reservations from being created for the machines until the
+        # transaction has ended (on database systems supporting it); see
+        # `Reservation.save()`
+        list(
+            Machine.objects.select_for_update()
+            .filter(pk__in=machine_pks)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+        self.set_invalid_statuses(items)
+        self.set_conflict_statuses(
+            [item for item in items if item.status is None], machine_pks
+        )
+        items_to_create = [item for item in items if item.status is None]
+        if not skip_conflicts and len(items_to_create) < len(items):
+            return
+
+        machine_pk_to_items = defaultdict(list)
+        for item in items_to_create:
+            machine_pk_to_items[item.reservation.machine_id].append(item)
+        for machine_pk, machine_items in machine_pk_to_items.items():
+            version = Machine(pk=machine_pk).increment_reservations_version()
+            for item in machine_items:
+                item.reservation.version = version
+
+        Reservation.objects.bulk_create(item.reservation for item in items_to_create)
+        for item in items_to_create:
+            item.status = BulkReservationItem.Status.CREATED
+        # (`bulk_create()` does not send the `post_save` signal)
+        for machine_pk, machine_items in machine_pk_to_items.items():
+            broadcast_machine_update_on_commit(
+                machine_pk,
+                "reservation.created",
+                reservations=[item.reservation.pk for item in machine_items],
+            )
+
+    def set_invalid_statuses(self, items: list[BulkReservationItem]):
+        # Checked once per machine type, as this might query the database
+        machine_type_to_can_use = {}
+        machines = {machine.pk: machine for machine in self.machines}
+        for item in items:
+            reservation = item.reservation
+            machine = machines.get(reservation.machine_id)
+            if machine is None or reservation.start_time >= reservation.end_time:
+                item.status = BulkReservationItem.Status.INVALID
+                continue
+            if machine.machine_type_id not in machine_type_to_can_use:
+                machine_type_to_can_use[machine.machine_type_id] = machine.can_user_use(
+                    self.user
+                )
+            if not machine_type_to_can_use[machine.machine_type_id]:
+                item.status = BulkReservationItem.Status.INVALID
+
+    @staticmethod
+    def set_conflict_statuses(items: list[BulkReservationItem], machine_pks: set[int]):
+        if not items:
+            return
+        existing_reservations = (
+            Reservation.objects.filter(machine__in=machine_pks)
+            .overlapping(
+                min(item.reservation.start_time for item in items),
+                max(item.reservation.end_time for item in items),
+            )
+            .order_by("start_time")
+            .values_list("machine", "start_time", "end_time", "pk")
+        )
+        machine_pk_to_periods = defaultdict(list)
+        for machine_pk, *period in existing_reservations:
+            machine_pk_to_periods[machine_pk].append(period)
+
+        machine_pk_to_items = defaultdict(list)
+        for item in items:
+            machine_pk_to_items[item.reservation.machine_id].append(item)
+        for machine_pk, machine_items in machine_pk_to_items.items():
+            existing_periods = machine_pk_to_periods[machine_pk]
+            existing_starts = [start_time for start_time, _end, _pk in existing_periods]
+            # The latest end time among the first `i + 1` periods; this is sorted -
+            # unlike the end times themselves, if some of the periods overlap
+            existing_max_ends = list(
+                itertools.accumulate(
+                    (end_time for _start, end_time, _pk in existing_periods), max
+                )
+            )
+            # Sweep through the new reservations sorted by start time; they're
+            # accepted in order, so that an accepted reservation can only overlap the
+            # next one if it's the last accepted one
+            last_accepted_end_time = None
+            for item in sorted(machine_items, key=lambda i: i.reservation.start_time):
+                start_time = item.reservation.start_time
+                end_time = item.reservation.end_time
+                # The existing periods before `first_index` end before `start_time`,
+                # and the ones from `last_index` start after `end_time`
+                first_index = bisect.bisect_right(existing_max_ends, start_time)
+                last_index = bisect.bisect_left(existing_starts, end_time)
+                item.conflicting_reservation_pks = [
+                    pk
+                    for _start, existing_end_time, pk in existing_periods[
+                        first_index:last_index
+                    ]
+                    if existing_end_time > start_time
+                ]
+                overlaps_accepted_reservation = (
+                    last_accepted_end_time is not None
+                    and last_accepted_end_time > start_time
+                )
+                if item.conflicting_reservation_pks or overlaps_accepted_reservation:
+                    item.status = BulkReservationItem.Status.CONFLICT
+                else:
+                    last_accepted_end_time = end_time
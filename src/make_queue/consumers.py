@@ -0,0 +1,112 @@
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import JsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from make_queue.models.machine import Machine
+from util.logging_utils import get_request_logger
+
+# Receives the updates of all machines
+ALL_MACHINES_GROUP_NAME = "make_queue.machines"
+
+
+def get_machine_group_name(machine_pk: int) -> str:
+    return f"make_queue.machine.{machine_pk}"
+
+
+def broadcast_machine_update(machine: Machine, event_type: str, **data):
+    """
+    Sends an update about ``machine`` to the websocket clients listening to it through
+    ``MachineUpdatesConsumer``.
+    The machine's current status is always included, as it might have been changed by
+    e.g. a reservation starting or being deleted.
+
+    :param event_type: One of ``reservation.created``, ``reservation.changed``,
+        ``reservation.deleted`` and ``machine.changed``
+    :param data: Extra data to include in the update sent to the clients
+    """
+    message = {
+        "type": "machine.update",
+        "machine_pk": machine.pk,
+        "data": {
+            "type": event_type,
+            "machine": machine.pk,
+            "status": machine.get_status(),
+            "reservations_version": machine.reservations_version,
+            **data,
+        },
+    }
+    channel_layer = get_channel_layer()
+    try:
+        for group_name in (get_machine_group_name(machine.pk), ALL_MACHINES_GROUP_NAME):
+            async_to_sync(channel_layer.group_send)(group_name, message)
+    # The clients can do without the updates if the channel layer is unavailable
+    except Exception as e:  # noqa: BLE001
+        get_request_logger().exception(
+            f"Failed broadcasting update about machine {machine.pk}:\n{message}",
+            exc_info=e,
+        )
+
+
+def broadcast_machine_update_on_commit(machine_pk: int, event_type: str, **data):
+    """
+    Calls ``broadcast_machine_update()`` when the current transaction is committed -
+    or right away, if not in a transaction.
+    """
+
+    def broadcast():
+        # (Fetching the machine, to get its status and `reservations_version` after
+        # the changes have been committed)
+        machine = Machine.objects.filter(pk=machine_pk).first()
+        if machine:
+            broadcast_machine_update(machine, event_type, **data)
+
+    # (`robust`, so that e.g. a failure to fetch the machine is only logged, instead of
+    # being raised from the code that committed the transaction)
+    transaction.on_commit(broadcast, robust=True)
+
+
+class MachineUpdatesConsumer(JsonWebsocketConsumer):
+    """
+    Pushes updates about the reservations and statuses of either a single machine -
+    if the URL contains the machine's pk - or all the machines visible to the user,
+    so that e.g. open calendars can update without polling.
+    The updates are sent by ``broadcast_machine_update()``; see that function for the
+    contents of the sent JSON objects.
+    """
+
+    group_name: str
+    # The pks of the machines whose updates are sent to the client
+    visible_machine_pks: set[int]
+
+    def connect(self):
+        user = self.scope["user"]
+        visible_machines = Machine.objects.visible_to(user)
+        machine_pk = self.scope["url_route"]["kwargs"].get("pk")
+        if machine_pk is None:
+            self.group_name = ALL_MACHINES_GROUP_NAME
+        else:
+            visible_machines = visible_machines.filter(pk=machine_pk)
+            self.group_name = get_machine_group_name(machine_pk)
+        self.visible_machine_pks = set(visible_machines.values_list("pk", flat=True))
+        if machine_pk is not None and not self.visible_machine_pks:
+            self.close()
+            return
+
+        async_to_sync(self.channel_layer.group_add)(self.group_name, self.channel_name)
+        self.accept()
+
+    def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            async_to_sync(self.channel_layer.group_discard)(
+                self.group_name, self.channel_name
+            )
+
+    def receive_json(self, content, **kwargs):
+        # The clients are only supposed to listen
+        pass
+
+    def machine_update(self, event: dict):
+        # Machines created after the client connected are not included
+        if event["machine_pk"] in self.visible_machine_pks:
+            self.send_json(event["data"])
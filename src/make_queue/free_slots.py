@@ -0,0 +1,166 @@
+import heapq
+import itertools
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from math import ceil
+
+from django.utils import timezone
+
+from make_queue.models.machine import Machine, MachineType
+from make_queue.models.reservation import QuotaEvaluator, Reservation, ReservationRule
+from users.models import User
+from util.locale_utils import timedelta_to_hours
+
+
+@dataclass(frozen=True)
+class FreeSlot:
+    machine: Machine
+    start_time: datetime
+    end_time: datetime
+
+    @property
+    def duration(self) -> int:
+        """The length of the slot in hours, rounded up."""
+        return ceil(timedelta_to_hours(self.end_time - self.start_time))
+
+
+class FreeSlotFinder:
+    """
+    Finds the periods in which ``user`` can reserve the machines of ``machine_type``,
+    by:
+
+    1. fetching the future reservations of all the machine type's machines in a single
+       query, and sweeping through them to find the gaps between them for each
+       machine;
+    2. intersecting the gaps with the periods covered by the machine type's
+       reservation rules - unless the user has a quota allowing them to ignore the
+       rules - and checking that a reservation of the required length is allowed by
+       the rules at the start of each gap;
+    3. merging the resulting slots of all the machines lazily, so that they're produced
+       sorted by start time, and so that only as many slots as requested are computed.
+
+    No slots are found if the user is not allowed to use the machine type, or if none
+    of the user's quotas allow creating more reservations.
+    """
+
+    DEFAULT_LIMIT = 100
+
+    def __init__(
+        self,
+        machine_type: MachineType,
+        user: User,
+        *,
+        quota_evaluator: QuotaEvaluator = None,
+        now: datetime = None,
+    ):
+        self.machine_type = machine_type
+        self.user = user
+        self.quota_evaluator = quota_evaluator or QuotaEvaluator(user, machine_type)
+        self.now = now or timezone.now()
+        self.end_of_allowed_period = self.now + Reservation.FUTURE_LIMIT
+
+    def get_machines(self) -> list[Machine]:
+        return list(
+            Machine.objects.filter(machine_type=self.machine_type)
+            .visible_to(self.user)
+            .exclude(
+                status__in=(Machine.Status.OUT_OF_ORDER, Machine.Status.MAINTENANCE)
+            )
+            .default_order_by()
+        )
+
+    def get_reserved_periods(
+        self, machines: Iterable[Machine]
+    ) -> dict[int, list[tuple[datetime, datetime]]]:
+        """
+        Returns the periods of the future reservations of ``machines``, grouped by the
+        machines' pks, and sorted by start time.
+        """
+        reserved_periods = defaultdict(list)
+        reservations = (
+            Reservation.objects.filter(machine__in=machines)
+            .overlapping(self.now, self.end_of_allowed_period)
+            .order_by("start_time")
+            .values_list("machine", "start_time", "end_time")
+        )
+        for machine_pk, start_time, end_time in reservations:
+            reserved_periods[machine_pk].append((start_time, end_time))
+        return reserved_periods
+
+    def get_gaps(
+        self, reserved_periods: list[tuple[datetime, datetime]]
+    ) -> Iterator[tuple[datetime, datetime]]:
+        """
+        Yields the periods between now and the end of the allowed period that are not
+        covered by any of ``reserved_periods``, which must be sorted by start time.
+        """
+        free_from = self.now
+        for start_time, end_time in reserved_periods:
+            if start_time > free_from:
+                yield free_from, start_time
+            free_from = max(free_from, end_time)
+        if free_from < self.end_of_allowed_period:
+            yield free_from, self.end_of_allowed_period
+
+    def get_machine_slots(
+        self,
+        machine: Machine,
+        reserved_periods: list[tuple[datetime, datetime]],
+        required_duration: timedelta,
+        rule_table: ReservationRule.WindowTable | None,
+    ) -> Iterator[FreeSlot]:
+        for gap_start, gap_end in self.get_gaps(reserved_periods):
+            if rule_table is None:
+                periods = [(gap_start, gap_end)]
+            else:
+                periods = rule_table.covered_periods(gap_start, gap_end)
+            for start_time, end_time in periods:
+                if end_time - start_time < required_duration:
+                    continue
+                if (
+                    rule_table is not None
+                    and required_duration
+                    and not rule_table.valid_time(
+                        start_time, start_time + required_duration
+                    )
+                ):
+                    continue
+                yield FreeSlot(machine, start_time, end_time)
+
+    def iter_slots(self, required_duration: timedelta) -> Iterator[FreeSlot]:
+        """
+        Yields the free slots that are at least ``required_duration`` long, sorted by
+        start time.
+        """
+        if not self.machine_type.can_user_use(self.user):
+            return
+        if not self.quota_evaluator.can_create_new_reservation():
+            return
+        rule_table = (
+            None
+            if self.quota_evaluator.can_ignore_rules()
+            else ReservationRule.WindowTable.for_machine_type(self.machine_type)
+        )
+
+        machines = self.get_machines()
+        reserved_periods = self.get_reserved_periods(machines)
+        machine_slot_iterators = [
+            self.get_machine_slots(
+                machine, reserved_periods[machine.pk], required_duration, rule_table
+            )
+            for machine in machines
+        ]
+        yield from heapq.merge(
+            *machine_slot_iterators, key=lambda slot: slot.start_time
+        )
+
+    def find_slots(
+        self, required_duration: timedelta, *, limit: int | None = DEFAULT_LIMIT
+    ) -> list[FreeSlot]:
+        """
+        Returns (at most ``limit`` of) the free slots that are at least
+        ``required_duration`` long, sorted by start time.
+        """
+        return list(itertools.islice(self.iter_slots(required_duration), limit))
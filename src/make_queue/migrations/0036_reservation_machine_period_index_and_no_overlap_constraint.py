@@ -0,0 +1,82 @@
+# Generated by Django 5.0.2 on 2026-10-18 01:43
+
+from django.db import migrations, models
+
+# (Should match `NO_OVERLAP_CONSTRAINT_NAME` in `make_queue/models/reservation.py`)
+NO_OVERLAP_CONSTRAINT_NAME = "reservation_machine_no_overlap"
+
+
+def get_overlapping_reservations(schema_editor) -> list[tuple]:
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT r1.machine_id, r1.id, r1.start_time, r1.end_time,"
+            " r2.id, r2.start_time, r2.end_time"
+            " FROM make_queue_reservation r1"
+            " JOIN make_queue_reservation r2"
+            " ON r1.machine_id = r2.machine_id AND r1.id < r2.id"
+            " AND r1.start_time < r2.end_time AND r2.start_time < r1.end_time"
+            " ORDER BY r1.machine_id, r1.start_time, r2.start_time;"
+        )
+        return cursor.fetchall()
+
+
+def add_no_overlap_constraint(apps, schema_editor):
+    # Range types and exclusion constraints are only supported by PostgreSQL; other
+    # database systems rely on the overlap check in `Reservation.validate()`
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Adding the constraint fails if any reservations overlap, which the previous
+    # validation didn't guarantee; these must be resolved manually, as it's not
+    # possible to know which of the reservations should be kept
+    if overlapping_reservations := get_overlapping_reservations(schema_editor):
+        overlap_lines = "\n".join(
+            f"- Machine {machine_pk}: reservation {pk1} ({start1} - {end1})"
+            f" overlaps reservation {pk2} ({start2} - {end2})"
+            for machine_pk, pk1, start1, end1, pk2, start2, end2 in (
+                overlapping_reservations
+            )
+        )
+        raise RuntimeError(
+            "Cannot add the constraint against overlapping reservations, as the"
+            " following reservations overlap; change or delete them, and run the"
+            f" migration again:\n{overlap_lines}"
+        )
+
+    # Required for using the `=` operator on `machine_id` in a GiST index
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist;")
+    schema_editor.execute(
+        f"ALTER TABLE make_queue_reservation ADD CONSTRAINT {NO_OVERLAP_CONSTRAINT_NAME}"
+        " EXCLUDE USING gist ("
+        " machine_id WITH =,"
+        " tstzrange(start_time, end_time, '[)') WITH &&"
+        " );"
+    )
+
+
+def remove_no_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE make_queue_reservation"
+        f" DROP CONSTRAINT IF EXISTS {NO_OVERLAP_CONSTRAINT_NAME};"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "make_queue",
+            "0035_coursepermission_printer3dcourse_course_permissions_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["machine", "start_time", "end_time"],
+                name="reservation_machine_period_idx",
+            ),
+        ),
+        migrations.RunPython(add_no_overlap_constraint, remove_no_overlap_constraint),
+    ]
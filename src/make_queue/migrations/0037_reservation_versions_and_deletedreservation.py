@@ -0,0 +1,66 @@
+# Generated by Django 5.0.2 on 2026-10-18 02:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "make_queue",
+            "0036_reservation_machine_period_index_and_no_overlap_constraint",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="machine",
+            name="reservations_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                fields=["machine", "version"], name="reservation_version_idx"
+            ),
+        ),
+        migrations.CreateModel(
+            name="DeletedReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("reservation_pk", models.PositiveBigIntegerField()),
+                ("start_time", models.DateTimeField()),
+                ("end_time", models.DateTimeField()),
+                ("version", models.PositiveBigIntegerField()),
+                (
+                    "machine",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deleted_reservations",
+                        to="make_queue.machine",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["machine", "version"],
+                        name="deletedreservation_version_idx",
+                    )
+                ],
+            },
+        ),
+    ]
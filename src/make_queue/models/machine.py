@@ -3,7 +3,16 @@ from datetime import datetime, timedelta
 
 from django.contrib.auth.models import AnonymousUser
 from django.db import models
-from django.db.models import F, Prefetch, Q
+from django.db.models import (
+    Case,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
 from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -130,6 +139,56 @@ class MachineQuerySet(models.QuerySet):
             Lower("name"),
         )
 
+    def annotate_status(self, now: datetime = None) -> "MachineQuerySet[Machine]":
+        """
+        Returns a ``QuerySet`` where the machines have been annotated with the
+        following attributes - which are computed as part of the same query, and which
+        are used by e.g. ``Machine.get_status()`` instead of querying the database once
+        per machine:
+
+        * ``annotated_status``: the status of the machine at ``now``, as it would be
+          returned by ``Machine.get_status()``
+        * ``annotated_reservation_in_progress_pk``: the pk of the reservation in
+          progress at ``now``, or ``None``
+        * ``annotated_next_reservation_start_time``: the start time of the first
+          reservation starting after ``now``, or ``None``
+
+        :param now: The time to compute the status at; defaults to the current time
+        """
+        from make_queue.models.reservation import Reservation
+
+        if now is None:
+            now = timezone.now()
+        machine_reservations = Reservation.objects.filter(machine=OuterRef("pk"))
+        # Uses the same period as `Machine.get_status()`
+        reservations_in_progress = machine_reservations.overlapping(
+            now, now + timedelta(seconds=1)
+        )
+        future_reservations = machine_reservations.filter(start_time__gt=now)
+        reservation_in_progress_pk = Subquery(reservations_in_progress.values("pk")[:1])
+        next_reservation_start_time = Subquery(
+            future_reservations.order_by("start_time").values("start_time")[:1]
+        )
+        return self.annotate(
+            annotated_reservation_in_progress_pk=reservation_in_progress_pk,
+            annotated_next_reservation_start_time=next_reservation_start_time,
+            annotated_status=Case(
+                When(
+                    status__in=(
+                        Machine.Status.OUT_OF_ORDER,
+                        Machine.Status.MAINTENANCE,
+                    ),
+                    then=F("status"),
+                ),
+                When(
+                    annotated_reservation_in_progress_pk__isnull=False,
+                    then=Value(Machine.Status.RESERVED),
+                ),
+                default=Value(Machine.Status.AVAILABLE),
+                output_field=models.CharField(),
+            ),
+        )
+
 
 class Machine(models.Model):
     class Status(models.TextChoices):
@@ -200,15 +259,43 @@ class Machine(models.Model):
         help_text=_("This is only for internal use and is not displayed anywhere."),
     )
     last_modified = models.DateTimeField(auto_now=True, verbose_name=_("last modified"))
+    # Incremented every time one of the machine's reservations is created, changed or
+    # deleted; see `increment_reservations_version()`
+    reservations_version = models.PositiveBigIntegerField(default=0, editable=False)
 
     objects = MachineQuerySet.as_manager()
     history = HistoricalRecords(
-        excluded_fields=["status", "info_message_date", "priority", "last_modified"]
+        excluded_fields=[
+            "status",
+            "info_message_date",
+            "priority",
+            "last_modified",
+            "reservations_version",
+        ]
     )
 
     def __str__(self):
         return f"{self.name} - {self.machine_model}"
 
+    def save(self, *args, **kwargs):
+        # `reservations_version` is only changed by `increment_reservations_version()`,
+        # as the instance's value might be outdated by the time it's saved
+        if not self._state.adding and self.pk is not None:
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                deferred_fields = self.get_deferred_fields()
+                update_fields = [
+                    field.name
+                    for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred_fields
+                ]
+            kwargs["update_fields"] = [
+                field_name
+                for field_name in update_fields
+                if field_name != "reservations_version"
+            ]
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         return reverse("machine_detail", args=[self.pk])
 
@@ -219,32 +306,46 @@ class Machine(models.Model):
             .first()
         )
 
+    def get_next_reservation_start_time(self) -> datetime | None:
+        # Set by `MachineQuerySet.annotate_status()`
+        if hasattr(self, "annotated_next_reservation_start_time"):
+            return self.annotated_next_reservation_start_time
+        next_reservation = self.get_next_reservation()
+        return next_reservation.start_time if next_reservation else None
+
+    def increment_reservations_version(self) -> int:
+        """
+        Increments ``reservations_version`` in the database, and returns the new
+        value. This should be called inside the same transaction as the change to the
+        machine's reservations, as the update locks the machine's row until the
+        transaction ends - which ensures that concurrent changes get different
+        versions.
+        """
+        Machine.objects.filter(pk=self.pk).update(
+            reservations_version=F("reservations_version") + 1
+        )
+        self.reservations_version = Machine.objects.values_list(
+            "reservations_version", flat=True
+        ).get(pk=self.pk)
+        return self.reservations_version
+
     @abstractmethod
     def can_user_use(self, user):
         return self.machine_type.can_user_use(user)
 
     def reservations_in_period(self, start_time: datetime, end_time: datetime):
-        return (
-            self.reservations.filter(
-                start_time__lte=start_time, end_time__gt=start_time
-            )
-            | self.reservations.filter(
-                start_time__gte=start_time, end_time__lte=end_time
-            )
-            | self.reservations.filter(
-                start_time__lt=end_time,
-                start_time__gt=start_time,
-                end_time__gte=end_time,
-            )
-        )
+        return self.reservations.overlapping(start_time, end_time)
 
     def get_status(self):
         if self.status in (self.Status.OUT_OF_ORDER, self.Status.MAINTENANCE):
             return self.status
+        # Set by `MachineQuerySet.annotate_status()`
+        if hasattr(self, "annotated_status"):
+            return self.annotated_status
 
         if self.reservations_in_period(
             timezone.now(), timezone.now() + timedelta(seconds=1)
-        ):
+        ).exists():
             return self.Status.RESERVED
         else:
             return self.Status.AVAILABLE
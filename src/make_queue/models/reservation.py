@@ -1,13 +1,19 @@
+import bisect
 import itertools
-from collections.abc import Collection
+import random
+from collections.abc import Collection, Iterator
+from dataclasses import dataclass
 from datetime import datetime, time, timedelta
-from typing import Optional
+from time import sleep
+from typing import Final
 
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Q
+from django.db import IntegrityError, OperationalError, models, transaction
+from django.db.models import Count, Max, Q
+from django.http import HttpRequest
 from django.utils import timezone
 from django.utils.formats import time_format
+from django.utils.functional import cached_property
 from django.utils.text import capfirst
 from django.utils.translation import gettext_lazy as _
 
@@ -22,6 +28,64 @@ from util.locale_utils import (
 from util.model_utils import ComparisonType, comparison_boilerplate
 from web.modelfields import MultiSelectField, UnlimitedCharField
 
+# The name of the PostgreSQL-only exclusion constraint preventing reservations for the
+# same machine from overlapping
+NO_OVERLAP_CONSTRAINT_NAME = "reservation_machine_no_overlap"
+# The errors caused by competing transactions, which can be retried
+RETRYABLE_POSTGRESQL_ERROR_CODES = {
+    "40001",  # serialization_failure
+    "40P01",  # deadlock_detected
+}
+RETRYABLE_SQLITE_ERROR_MESSAGES = ("database is locked", "database table is locked")
+
+
+def is_retryable_error(error: OperationalError) -> bool:
+    """
+    :return: Whether ``error`` was caused by the transaction competing with other
+        transactions - i.e. a lock timeout, a deadlock or a serialization failure - in
+        which case the transaction can be retried
+    """
+    vendor = transaction.get_connection().vendor
+    if vendor == "postgresql":
+        # (Django wraps the database driver's error; `sqlstate` is set by psycopg 3,
+        # and `pgcode` by psycopg2)
+        driver_error = error.__cause__
+        error_code = getattr(driver_error, "sqlstate", None) or getattr(
+            driver_error, "pgcode", None
+        )
+        return error_code in RETRYABLE_POSTGRESQL_ERROR_CODES
+    if vendor == "sqlite":
+        # (The message might be followed by the name of the locked table)
+        return str(error).startswith(RETRYABLE_SQLITE_ERROR_MESSAGES)
+    return False
+
+
+class QuotaQuerySet(models.QuerySet):
+    def for_user(self, user: User, machine_type: MachineType) -> "QuotaQuerySet[Quota]":
+        """Returns the quotas for ``machine_type`` that apply to ``user``."""
+        return self.filter(Q(user=user) | Q(all=True), machine_type=machine_type)
+
+    def annotate_num_unfinished_reservations(
+        self, user: User, now: datetime = None
+    ) -> "QuotaQuerySet[Quota]":
+        """
+        Returns a ``QuerySet`` where the quotas have been annotated with an
+        ``annotated_num_unfinished_reservations`` attribute, containing the same
+        number as ``Quota.get_unfinished_reservations(user).count()`` would.
+        """
+        if now is None:
+            now = timezone.now()
+        # Should match the logic of `Quota.get_unfinished_reservations()`
+        counted_reservations_query = Q(diminishing=True) | (
+            Q(reservations__end_time__gte=now)
+            & (Q(all=False) | Q(reservations__user=user))
+        )
+        return self.annotate(
+            annotated_num_unfinished_reservations=Count(
+                "reservations", filter=counted_reservations_query
+            )
+        )
+
 
 class Quota(models.Model):
     all = models.BooleanField(default=False, verbose_name=_("all users"))
@@ -45,6 +109,8 @@ class Quota(models.Model):
     diminishing = models.BooleanField(default=False, verbose_name=_("diminishing"))
     ignore_rules = models.BooleanField(default=False, verbose_name=_("ignores rules"))
 
+    objects = QuotaQuerySet.as_manager()
+
     class Meta:
         permissions = (
             ("can_create_event_reservation", "Can create event reservation"),
@@ -69,36 +135,90 @@ class Quota(models.Model):
         )
         return reservations.filter(end_time__gte=timezone.now())
 
-    def can_create_more_reservations(self, user: User):
-        return (
-            self.number_of_reservations
-            != self.get_unfinished_reservations(user).count()
-        )
+    @staticmethod
+    def can_create_new_reservation(user: User, machine_type: MachineType):
+        return QuotaEvaluator(user, machine_type).can_create_new_reservation()
 
-    def is_valid_in(self, reservation: "Reservation"):
-        reservation_exists_or_can_make_more = self.reservations.filter(
-            pk=reservation.pk
-        ).exists() or self.can_create_more_reservations(reservation.user)
-        ignore_rules_or_valid_time = self.ignore_rules or ReservationRule.valid_time(
-            reservation.start_time,
-            reservation.end_time,
-            reservation.machine.machine_type,
-        )
-        return reservation_exists_or_can_make_more and ignore_rules_or_valid_time
+
+class QuotaEvaluator:
+    """
+    Evaluates the quotas that apply to a user for a machine type.
+    All the quotas are fetched - together with their number of unfinished
+    reservations - in a single query the first time they're needed, after which all
+    evaluation is done in memory; this means that the number of database queries does
+    not depend on the number of quotas.
+
+    NOTE: The fetched quotas are not updated when reservations are created or changed,
+          so an evaluator should not outlive the request it was created for (see
+          ``for_request()``).
+    """
+
+    def __init__(self, user: User, machine_type: MachineType):
+        self.user = user
+        self.machine_type = machine_type
 
     @classmethod
-    def can_create_new_reservation(cls, user: User, machine_type: MachineType):
-        return any(
-            quota.can_create_more_reservations(user)
-            for quota in cls.get_user_quotas(user, machine_type)
+    def for_request(
+        cls, request: HttpRequest, user: User, machine_type: MachineType
+    ) -> "QuotaEvaluator":
+        """Returns an evaluator that is memoized for the duration of ``request``."""
+        if not hasattr(request, "_quota_evaluators"):
+            request._quota_evaluators = {}
+        key = (user.pk, machine_type.pk)
+        if key not in request._quota_evaluators:
+            request._quota_evaluators[key] = cls(user, machine_type)
+        return request._quota_evaluators[key]
+
+    @cached_property
+    def quotas(self) -> list[Quota]:
+        return list(
+            Quota.objects.for_user(self.user, self.machine_type)
+            .annotate_num_unfinished_reservations(self.user)
+            .order_by("pk")
         )
 
     @staticmethod
-    def get_user_quotas(user: User, machine_type: MachineType):
-        return machine_type.quotas.filter(Q(user=user) | Q(all=True))
+    def can_create_more_reservations(quota: Quota) -> bool:
+        return quota.number_of_reservations != (
+            quota.annotated_num_unfinished_reservations
+        )
 
-    @classmethod
-    def get_best_quota(cls, reservation: "Reservation") -> Optional["Quota"]:
+    def can_create_new_reservation(self) -> bool:
+        return any(self.can_create_more_reservations(quota) for quota in self.quotas)
+
+    def can_ignore_rules(self) -> bool:
+        return any(
+            quota.ignore_rules and self.can_create_more_reservations(quota)
+            for quota in self.quotas
+        )
+
+    def get_valid_quotas(self, reservation: "Reservation") -> list[Quota]:
+        """Returns the quotas that are valid in ``reservation``, i.e. that
+        ``reservation`` is already connected to or can create more reservations, and
+        that either ignore the rules or are used for a reservation following the
+        rules."""
+        valid_time = None
+        valid_quotas = []
+        for quota in self.quotas:
+            # (The reservation will only be connected to the quota if it has been
+            # saved)
+            reservation_exists_or_can_make_more = (
+                reservation.pk is not None and reservation.quota_id == quota.pk
+            ) or self.can_create_more_reservations(quota)
+            if not reservation_exists_or_can_make_more:
+                continue
+            if not quota.ignore_rules:
+                # Only check the rules once, as the result is the same for all quotas
+                if valid_time is None:
+                    valid_time = ReservationRule.valid_time(
+                        reservation.start_time, reservation.end_time, self.machine_type
+                    )
+                if not valid_time:
+                    continue
+            valid_quotas.append(quota)
+        return valid_quotas
+
+    def get_best_quota(self, reservation: "Reservation") -> Quota | None:
         """
         Selects the best quota for the given reservation,
         by preferring non-diminishing quotas that do not ignore the rules.
@@ -107,14 +227,7 @@ class Quota(models.Model):
         :return: The best quota that can handle the given reservation, or ``None`` if
             none can
         """
-        valid_quotas = [
-            quota
-            for quota in cls.get_user_quotas(
-                reservation.user, reservation.machine.machine_type
-            )
-            if quota.is_valid_in(reservation)
-        ]
-
+        valid_quotas = self.get_valid_quotas(reservation)
         if not valid_quotas:
             return None
 
@@ -130,9 +243,52 @@ class Quota(models.Model):
 
         return best_quota
 
-    @classmethod
-    def can_create_reservation(cls, reservation: "Reservation"):
-        return cls.get_best_quota(reservation) is not None
+
+@dataclass(kw_only=True)
+class ReservationValidationResult:
+    """
+    The result of ``Reservation.validate()``.
+    Is truthy if the reservation is valid; otherwise, ``code`` describes the first
+    check that failed, so that callers can present the reason without having to redo
+    any of the checks.
+    """
+
+    class Code(models.TextChoices):
+        CANNOT_USE_MACHINE = "cannot_use_machine"
+        OVERLAPPING = "overlapping"
+        INVALID_PERIOD = "invalid_period"
+        MISSING_PERMISSION = "missing_permission"
+        TOO_FAR_IN_THE_FUTURE = "too_far_in_the_future"
+        CANNOT_BE_CHANGED = "cannot_be_changed"
+        TIME_NOT_CHANGEABLE = "time_not_changeable"
+        STARTS_IN_THE_PAST = "starts_in_the_past"
+        MACHINE_OUT_OF_ORDER = "machine_out_of_order"
+        MACHINE_MAINTENANCE = "machine_maintenance"
+        OUTSIDE_RULES = "outside_rules"
+        QUOTA_EXCEEDED = "quota_exceeded"
+
+    code: Code | None = None
+    # The following are set if they were loaded while validating
+    machine_status: Machine.Status | None = None
+    best_quota: Quota | None = None
+
+    def __bool__(self):
+        return self.code is None
+
+
+class ReservationQuerySet(models.QuerySet):
+    def overlapping(
+        self, start_time: datetime, end_time: datetime
+    ) -> "ReservationQuerySet[Reservation]":
+        """
+        Returns the reservations overlapping the half-open period
+        ``[start_time, end_time)``; i.e. a reservation ending exactly when the period
+        starts (or starting exactly when it ends) is not included.
+
+        This is a single range predicate, so that it can be answered using the
+        ``(machine, start_time, end_time)`` index on ``Reservation``.
+        """
+        return self.filter(start_time__lt=end_time, end_time__gt=start_time)
 
 
 class Reservation(models.Model):
@@ -141,6 +297,9 @@ class Reservation(models.Model):
     FUTURE_LIMIT = timedelta(days=28)
     # It's allowed to set start/end times up to this amount of time in the past
     GRACE_PERIOD_FOR_SETTING_TIMES = timedelta(minutes=5)
+    # See `save()`
+    MAX_SAVE_ATTEMPTS = 5
+    SAVE_RETRY_BASE_DELAY = 0.02  # seconds
 
     user = models.ForeignKey(
         to=User,
@@ -171,11 +330,31 @@ class Reservation(models.Model):
         blank=True,
         related_name="reservations",
     )
+    # The machine's `reservations_version` when this reservation was last saved
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    objects = ReservationQuerySet.as_manager()
 
     class Meta:
         permissions = [
             ("can_view_reservation_user", "Can view reservation user"),
         ]
+        indexes = [
+            models.Index(
+                fields=["machine", "start_time", "end_time"],
+                name="reservation_machine_period_idx",
+            ),
+            models.Index(fields=["machine", "version"], name="reservation_version_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Used by `save()` to detect the reservation being moved to another machine
+        # (Not using `instance.machine_id`, as that would query the database if the
+        # field was deferred)
+        instance._loaded_machine_id = instance.__dict__.get("machine_id")
+        return instance
 
     def __str__(self):
         start_time = short_datetime_format(self.start_time)
@@ -201,20 +380,101 @@ class Reservation(models.Model):
 
     # TODO: move all validation out of the `save()` method and to a form
     def save(self, *args, **kwargs):
-        if not self.validate():
-            raise ValidationError("Not a valid reservation")
+        """
+        Validates and saves the reservation in a transaction that locks the
+        reservation's machine (on database systems supporting it), so that concurrent
+        reservations for the same machine are validated and saved one at a time,
+        instead of e.g. both passing the overlap check in ``validate()`` before either
+        is saved.
+
+        If the transaction fails due to lock contention - e.g. a deadlock, or SQLite's
+        "database is locked" error - it is retried up to ``MAX_SAVE_ATTEMPTS`` times
+        in total, unless this is called inside another transaction (which would then
+        have been broken by the failure).
+        """
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "version"}
+        can_retry = not transaction.get_connection().in_atomic_block
+        original_pk, originally_adding = self.pk, self._state.adding
+        for attempt in range(1, self.MAX_SAVE_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    self._lock_machines_and_save(*args, **kwargs)
+                break
+            except OperationalError as e:
+                # The pk might have been set by an insert that was rolled back
+                self.pk, self._state.adding = original_pk, originally_adding
+                if (
+                    not can_retry
+                    or attempt == self.MAX_SAVE_ATTEMPTS
+                    or not is_retryable_error(e)
+                ):
+                    raise
+            except IntegrityError as e:
+                # Raised by the exclusion constraint added on PostgreSQL (see the
+                # `0036_reservation_machine_period_index_and_no_overlap_constraint`
+                # migration), if another reservation was saved for an overlapping
+                # period anyway
+                if NO_OVERLAP_CONSTRAINT_NAME in str(e):
+                    raise ValidationError(
+                        "Not a valid reservation",
+                        code=ReservationValidationResult.Code.OVERLAPPING,
+                    ) from e
+                raise
+            # Wait a random (exponentially increasing) amount of time, so that the
+            # competing transactions are less likely to collide again
+            sleep(random.uniform(0, self.SAVE_RETRY_BASE_DELAY * 2**attempt))
+        self._loaded_machine_id = self.machine_id
+
+    def _lock_machines_and_save(self, *args, **kwargs):
+        loaded_machine_id = getattr(self, "_loaded_machine_id", None)
+        # Locked in a consistent order, to avoid deadlocks with transactions locking
+        # the same machines
+        list(
+            Machine.objects.select_for_update()
+            .filter(pk__in={self.machine_id, loaded_machine_id} - {None})
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        # Re-evaluate the quotas now that the machines are locked, as the memoized
+        # result (of e.g. a view calling `validate()` before saving) might be based on
+        # reservations that have been changed in the meantime
+        self._best_quota_memo = None
+
+        validation_result = self.validate()
+        if not validation_result:
+            raise ValidationError(
+                "Not a valid reservation", code=validation_result.code
+            )
 
         # Do not connect the reservation to a quota if it is not a personal reservation
         if not (self.event or self.special):
-            self.quota = Quota.get_best_quota(self)
+            self.quota = self.get_best_quota()
 
+        if loaded_machine_id not in {None, self.machine_id}:
+            DeletedReservation.record(self, machine_id=loaded_machine_id)
+        self.version = self.machine.increment_reservations_version()
         super().save(*args, **kwargs)
 
     # A reservation should not be able to be moved, only extended
-    def validate(self):
+    def validate(self) -> ReservationValidationResult:
+        """
+        Checks whether the reservation can be saved.
+
+        :return: A result that is falsy if the reservation is not valid, in which case
+            its ``code`` describes why
+        """
+        result = ReservationValidationResult()
+        Code = ReservationValidationResult.Code
+
+        def invalid(code: Code) -> ReservationValidationResult:
+            result.code = code
+            return result
+
         # User needs to be able to print, for it to be able to reserve the printers
         if not self.machine.can_user_use(self.user):
-            return False
+            return invalid(Code.CANNOT_USE_MACHINE)
 
         # Check if the printer is already reserved by another reservation for the given
         # duration
@@ -223,45 +483,53 @@ class Reservation(models.Model):
             .exclude(pk=self.pk)
             .exists()
         ):
-            return False
+            return invalid(Code.OVERLAPPING)
 
         # A reservation must have a valid time period
         if self.check_start_time_after_end_time():
-            return False
+            return invalid(Code.INVALID_PERIOD)
 
         # Event reservations are always valid, if the time is not already reserved
         if self.event or self.special:
-            return self.user.has_perm("make_queue.can_create_event_reservation")
+            if not self.user.has_perm("make_queue.can_create_event_reservation"):
+                return invalid(Code.MISSING_PERMISSION)
+            return result
 
         # Limit the amount of time forward in time a reservation can be made
         if not self.is_within_allowed_period():
-            return False
-
-        machine_out_of_order_or_maintenance = (
-            self.check_machine_out_of_order() or self.check_machine_maintenance()
+            return invalid(Code.TOO_FAR_IN_THE_FUTURE)
+
+        result.machine_status = self.machine.get_status()
+        machine_out_of_order_or_maintenance = result.machine_status in {
+            Machine.Status.OUT_OF_ORDER,
+            Machine.Status.MAINTENANCE,
+        }
+        machine_status_code = (
+            Code.MACHINE_OUT_OF_ORDER
+            if result.machine_status == Machine.Status.OUT_OF_ORDER
+            else Code.MACHINE_MAINTENANCE
         )
         earliest_allowed_time_to_set = self.get_earliest_allowed_time_to_set()
         # If this reservation object already exists and is being changed:
         if self.pk:
             # Check if the user can change the reservation
             if not self.can_be_changed_by(self.user):
-                return False
+                return invalid(Code.CANNOT_BE_CHANGED)
 
             old_reservation = Reservation.objects.get(pk=self.pk)
             # If the start time has been changed:
             if self.start_time != old_reservation.start_time:
-                if (
-                    not old_reservation.can_change_start_time()
-                    or self.start_time < earliest_allowed_time_to_set
-                ):
-                    return False
+                if not old_reservation.can_change_start_time():
+                    return invalid(Code.TIME_NOT_CHANGEABLE)
+                if self.start_time < earliest_allowed_time_to_set:
+                    return invalid(Code.STARTS_IN_THE_PAST)
                 # If the machine is out of order or on maintenance, only allow
                 # the change if the reserved period is made smaller
                 if (
                     machine_out_of_order_or_maintenance
                     and self.start_time < old_reservation.start_time
                 ):
-                    return False
+                    return invalid(machine_status_code)
 
             # If the end time has been changed:
             if self.end_time != old_reservation.end_time:
@@ -269,26 +537,37 @@ class Reservation(models.Model):
                     not old_reservation.can_change_end_time()
                     or self.end_time < earliest_allowed_time_to_set
                 ):
-                    return False
+                    return invalid(Code.TIME_NOT_CHANGEABLE)
                 # If the machine is out of order or on maintenance, only allow
                 # the change if the reserved period is made smaller
                 if (
                     machine_out_of_order_or_maintenance
                     and self.end_time > old_reservation.end_time
                 ):
-                    return False
+                    return invalid(machine_status_code)
         # If this reservation object is being created:
         else:
             if machine_out_of_order_or_maintenance:
-                return False
+                return invalid(machine_status_code)
 
             # Don't need to check `end_time`, as it's already been checked to be equal
             # to or after `start_time`
             if self.start_time < earliest_allowed_time_to_set:
-                return False
+                return invalid(Code.STARTS_IN_THE_PAST)
 
         # Check if the user can make the given reservation/edit
-        return self.quota_can_create_reservation()
+        evaluator, result.best_quota = self._evaluate_quotas()
+        if result.best_quota is None:
+            # If no usable quota ignores the rules, and the rules don't allow the
+            # period, it's the rules that prevented the reservation - no matter whether
+            # any quota has room for it (the quotas have already been fetched, and the
+            # rules compiled, at this point)
+            if not evaluator.can_ignore_rules() and not ReservationRule.valid_time(
+                self.start_time, self.end_time, self.machine.machine_type
+            ):
+                return invalid(Code.OUTSIDE_RULES)
+            return invalid(Code.QUOTA_EXCEEDED)
+        return result
 
     def starts_before_now(self):
         """Check if the start time is before current time."""
@@ -300,7 +579,37 @@ class Reservation(models.Model):
 
     def quota_can_create_reservation(self):
         """Check if the user can make the given reservation/edit."""
-        return Quota.can_create_reservation(self)
+        return self.get_best_quota() is not None
+
+    def get_best_quota(self) -> Quota | None:
+        """
+        Returns the best quota for this reservation (see
+        ``QuotaEvaluator.get_best_quota()``).
+        The result is memoized until one of the fields it depends on is changed, so
+        that e.g. ``validate()`` and the quota assignment in ``save()`` don't both have
+        to evaluate the quotas (``save()`` discards the memoized result from before the
+        machines were locked, though).
+        """
+        _evaluator, best_quota = self._evaluate_quotas()
+        return best_quota
+
+    def _evaluate_quotas(self) -> tuple[QuotaEvaluator, Quota | None]:
+        """Returns the (memoized) evaluator used for finding the best quota, together
+        with the best quota."""
+        memo_key = (
+            self.pk,
+            self.user_id,
+            self.machine_id,
+            self.start_time,
+            self.end_time,
+            self.quota_id,
+        )
+        memo = getattr(self, "_best_quota_memo", None)
+        if memo is None or memo[0] != memo_key:
+            evaluator = QuotaEvaluator(self.user, self.machine.machine_type)
+            memo = (memo_key, evaluator, evaluator.get_best_quota(self))
+            self._best_quota_memo = memo
+        return memo[1], memo[2]
 
     def is_within_allowed_period(self):
         """Check if the reservation is made within the reservation_future_limit."""
@@ -337,6 +646,67 @@ class Reservation(models.Model):
         return timezone.now() < self.end_time
 
 
+class DeletedReservation(models.Model):
+    """
+    Records that a reservation was removed from a machine - either by being deleted,
+    or by being moved to another machine - so that clients that have fetched the
+    machine's reservations can find out which ones to remove, by only requesting the
+    changes made after a specific version of the machine's reservations (see
+    ``Machine.reservations_version``).
+    """
+
+    # The number of versions that the objects are kept for; changes since older
+    # versions can't be requested
+    MAX_VERSION_AGE: Final = 1000
+
+    machine = models.ForeignKey(
+        to=Machine,
+        on_delete=models.CASCADE,
+        related_name="deleted_reservations",
+    )
+    reservation_pk = models.PositiveBigIntegerField()
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    # The machine's `reservations_version` when the reservation was removed
+    version = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["machine", "version"],
+                name="deletedreservation_version_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Reservation {self.reservation_pk} (version {self.version})"
+
+    @classmethod
+    def record(
+        cls, reservation: Reservation, *, machine_id: int = None
+    ) -> "DeletedReservation":
+        """
+        Records that ``reservation`` has been removed from the machine with the pk
+        ``machine_id`` - which defaults to the reservation's current machine - and
+        increments the machine's ``reservations_version``.
+        The machine's objects that are older than ``MAX_VERSION_AGE`` are deleted.
+        """
+        if machine_id is None:
+            machine_id = reservation.machine_id
+        machine = Machine(pk=machine_id)
+        version = machine.increment_reservations_version()
+        cls.objects.filter(
+            machine=machine, version__lte=version - cls.MAX_VERSION_AGE
+        ).delete()
+        return cls.objects.create(
+            machine=machine,
+            reservation_pk=reservation.pk,
+            start_time=reservation.start_time,
+            end_time=reservation.end_time,
+            version=version,
+        )
+
+
 class ReservationRule(models.Model):
     class Day(models.IntegerChoices):
         # Values match the ones returned by `datetime.isoweekday()`
@@ -429,30 +799,12 @@ class ReservationRule(models.Model):
         :param machine_type: The type of machine for the reservation
         :return: A boolean indicating if the reservation follows the rules
         """
-        duration = timedelta_to_hours(end_time - start_time)
         # Normal reservations (i.e. that do not ignore rules) will not be longer than
         # 1 week
-        if duration > (7 * 24):
-            return False
-
-        rules = cls.covered_rules(start_time, end_time, machine_type)
-        # Only allow reservations when covered by at least one rule
-        if not rules:
+        if timedelta_to_hours(end_time - start_time) > (7 * 24):
             return False
-
-        # If the reservation is longer than allowed for all covered rules, then it
-        # cannot be allowed
-        if duration > max(rule.max_hours for rule in rules):
-            return False
-        # If the reservation is shorter than allowed inside each of the covered rules,
-        # then it is always allowed
-        if duration <= min(rule.max_hours for rule in rules):
-            return True
-
-        # Check if the reservation adheres to the inter-rule maxima
-        return all(
-            rule.valid_time_in_rule(start_time, end_time, len(rules) > 1)
-            for rule in rules
+        return cls.WindowTable.for_machine_type(machine_type).valid_time(
+            start_time, end_time
         )
 
     def valid_time_in_rule(
@@ -466,14 +818,14 @@ class ReservationRule(models.Model):
         return timedelta_to_hours(end_time - start_time) <= self.max_hours
 
     def hours_inside(self, start_time: datetime, end_time: datetime) -> float:
-        return sum(
-            period.hours_inside(start_time, end_time) for period in self.time_periods
-        )
+        # (A table of only this rule, as the machine type's cached table might not
+        # contain this instance's current field values)
+        return self.WindowTable([self]).minutes_inside(0, start_time, end_time) / 60
 
-    @staticmethod
+    @classmethod
     def covered_rules(
-        start_time: datetime, end_time: datetime, machine_type: MachineType
-    ):
+        cls, start_time: datetime, end_time: datetime, machine_type: MachineType
+    ) -> list["ReservationRule"]:
         """
         Finds the rules for the given machine type that are covered by the indicated
         period.
@@ -483,28 +835,13 @@ class ReservationRule(models.Model):
         :param machine_type: The type of machine
         :return: The rules for the machine type that are covered by the period
         """
-        # If the reservation is longer than a week, it covers all rules
-        if timedelta_to_hours(end_time - start_time) > 7 * 24:
-            return machine_type.reservation_rules.all()
-
-        return [
-            rule
-            for rule in machine_type.reservation_rules.all()
-            if rule.hours_inside(start_time, end_time)
-        ]
+        return cls.WindowTable.for_machine_type(machine_type).covered_rules(
+            start_time, end_time
+        )
 
-    @staticmethod
-    def rule_set_has_gaps(machine_type: MachineType):
-        rules = machine_type.reservation_rules.all()
-        if not rules:
-            return True
-        time_periods = itertools.chain(*(rule.time_periods for rule in rules))
-        time_periods = sorted(time_periods, key=lambda p: p.exact_start_weekday)
-        for i, period in enumerate(time_periods):
-            next_period = time_periods[(i + 1) % len(time_periods)]
-            if next_period - period > 0:
-                return True
-        return False
+    @classmethod
+    def rule_set_has_gaps(cls, machine_type: MachineType):
+        return cls.WindowTable.for_machine_type(machine_type).has_gaps()
 
     class Period:
         def __init__(
@@ -614,3 +951,271 @@ class ReservationRule(models.Model):
                 (other.exact_start_weekday, other.exact_end_weekday),
             )
             return hours_overlap > 0
+
+    class WindowTable:
+        """
+        The reservation rules of a machine type, compiled into a sorted list of weekly
+        windows; each window is represented by its start and end, given as the number
+        of minutes since the start of the week (Monday at 00:00).
+        Together with the prefix sums of the windows' lengths for each rule, this makes
+        it possible to find the number of minutes that a period has inside a rule using
+        binary search, instead of iterating over all the rules' periods.
+
+        Use ``for_machine_type()`` to get an instance, which is cached until one of
+        the machine type's rules is created, changed or deleted. (As the rules can be
+        changed by other processes, this is checked using a single aggregate query
+        each time.)
+        """
+
+        MINUTES_PER_DAY = 24 * 60
+        MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+        # Maps machine type pks to the version of the machine type's rules (see
+        # `_get_rules_version()`) and the table compiled from those rules
+        _cache: dict[int, tuple[tuple, "ReservationRule.WindowTable"]] = {}
+
+        def __init__(self, rules: Collection["ReservationRule"]):
+            self.rules = list(rules)
+            # Sorted lists of `(start, end)` tuples, with one list per rule.
+            # Windows crossing the end of the week are split in two.
+            self._rule_windows: list[list[tuple[float, float]]] = []
+            for rule in self.rules:
+                windows = []
+                for start_day_index in rule.get_start_day_indices(iso=False):
+                    start = start_day_index * self.MINUTES_PER_DAY + self.to_minutes(
+                        rule.start_time
+                    )
+                    end = (
+                        start_day_index + rule.days_changed
+                    ) * self.MINUTES_PER_DAY + self.to_minutes(rule.end_time)
+                    windows.extend(self._split_at_end_of_week(start, end))
+                windows.sort()
+                self._rule_windows.append(windows)
+
+            # All the windows of all the rules, sorted by start
+            self.windows: list[tuple[float, float, ReservationRule]] = sorted(
+                (
+                    (start, end, rule)
+                    for rule, windows in zip(
+                        self.rules, self._rule_windows, strict=True
+                    )
+                    for start, end in windows
+                ),
+                key=lambda window: window[:2],
+            )
+            # The union of all the rules' windows, with overlapping and adjacent
+            # windows merged
+            self.merged_windows: list[tuple[float, float]] = []
+            for start, end, _rule in self.windows:
+                if self.merged_windows and start <= self.merged_windows[-1][1]:
+                    last_start, last_end = self.merged_windows[-1]
+                    self.merged_windows[-1] = (last_start, max(last_end, end))
+                else:
+                    self.merged_windows.append((start, end))
+            self._rule_window_starts = [
+                [start for start, _end in windows] for windows in self._rule_windows
+            ]
+            # `_rule_prefix_sums[i][j]` is the total length of the first `j` windows of
+            # the `i`-th rule
+            self._rule_prefix_sums = [
+                list(
+                    itertools.accumulate(
+                        (end - start for start, end in windows), initial=0
+                    )
+                )
+                for windows in self._rule_windows
+            ]
+
+        @classmethod
+        def for_machine_type(
+            cls, machine_type: MachineType
+        ) -> "ReservationRule.WindowTable":
+            version = cls._get_rules_version(machine_type)
+            cached_version, table = cls._cache.get(machine_type.pk, (None, None))
+            if table is None or cached_version != version:
+                table = cls(machine_type.reservation_rules.all())
+                cls._cache[machine_type.pk] = (version, table)
+            return table
+
+        @staticmethod
+        def _get_rules_version(machine_type: MachineType) -> tuple:
+            # Counting the rules detects deletions, while `last_modified` detects both
+            # creations and changes
+            aggregates = machine_type.reservation_rules.aggregate(
+                count=Count("pk"), last_modified=Max("last_modified")
+            )
+            return aggregates["count"], aggregates["last_modified"]
+
+        @classmethod
+        def _split_at_end_of_week(cls, start: float, end: float):
+            length = end - start
+            # Handle periods ending earlier in the week than they start
+            if not 0 <= length <= cls.MINUTES_PER_WEEK:
+                length %= cls.MINUTES_PER_WEEK
+            start %= cls.MINUTES_PER_WEEK
+            end = start + length
+            if end <= cls.MINUTES_PER_WEEK:
+                return [(start, end)]
+            return [(start, cls.MINUTES_PER_WEEK), (0, end - cls.MINUTES_PER_WEEK)]
+
+        @staticmethod
+        def to_minutes(time_: time) -> float:
+            return (
+                time_.hour * 60
+                + time_.minute
+                + time_.second / 60
+                + time_.microsecond / (60 * 10**6)
+            )
+
+        @classmethod
+        def to_week_offset(cls, datetime_: datetime) -> float:
+            """Returns the number of minutes between the start of the week and
+            ``datetime_``, in the current timezone."""
+            if timezone.is_aware(datetime_):
+                datetime_ = timezone.localtime(datetime_)
+            return (datetime_.isoweekday() - 1) * cls.MINUTES_PER_DAY + cls.to_minutes(
+                datetime_.time()
+            )
+
+        def _minutes_inside_from_start_of_week(
+            self, rule_index: int, week_offset: float
+        ) -> float:
+            """Returns the number of minutes of the rule's windows that are between the
+            start of the week and ``week_offset``."""
+            window_starts = self._rule_window_starts[rule_index]
+            num_started_windows = bisect.bisect_right(window_starts, week_offset)
+            if num_started_windows == 0:
+                return 0
+            # The rule's windows don't overlap (see `ReservationRuleForm`), so all the
+            # started windows except for the last one have ended
+            last_start, last_end = self._rule_windows[rule_index][
+                num_started_windows - 1
+            ]
+            return self._rule_prefix_sums[rule_index][num_started_windows - 1] + (
+                min(week_offset, last_end) - last_start
+            )
+
+        def minutes_inside(
+            self, rule_index: int, start_time: datetime, end_time: datetime
+        ) -> float:
+            duration = (end_time - start_time).total_seconds() / 60
+            if duration <= 0:
+                return 0
+            num_whole_weeks, remaining_duration = divmod(
+                duration, self.MINUTES_PER_WEEK
+            )
+            minutes_per_week = self._rule_prefix_sums[rule_index][-1]
+            start = self.to_week_offset(start_time)
+            end = start + remaining_duration
+
+            def minutes_before(week_offset: float) -> float:
+                return self._minutes_inside_from_start_of_week(rule_index, week_offset)
+
+            if end <= self.MINUTES_PER_WEEK:
+                remaining_minutes = minutes_before(end) - minutes_before(start)
+            else:
+                remaining_minutes = (
+                    minutes_per_week
+                    - minutes_before(start)
+                    + minutes_before(end - self.MINUTES_PER_WEEK)
+                )
+            return num_whole_weeks * minutes_per_week + remaining_minutes
+
+        def hours_inside(
+            self, rule: "ReservationRule", start_time: datetime, end_time: datetime
+        ) -> float:
+            return (
+                self.minutes_inside(self.rules.index(rule), start_time, end_time) / 60
+            )
+
+        def covered_rules(
+            self, start_time: datetime, end_time: datetime
+        ) -> list["ReservationRule"]:
+            return [
+                rule
+                for rule_index, rule in enumerate(self.rules)
+                if self.minutes_inside(rule_index, start_time, end_time) > 0
+            ]
+
+        def valid_time(self, start_time: datetime, end_time: datetime) -> bool:
+            """
+            Checks if a reservation in the supplied period is allowed by the rules.
+            See ``ReservationRule.valid_time()``.
+            """
+            duration = timedelta_to_hours(end_time - start_time)
+            hours_inside_rules = {}
+            for rule_index, rule in enumerate(self.rules):
+                minutes_inside = self.minutes_inside(rule_index, start_time, end_time)
+                if minutes_inside > 0:
+                    hours_inside_rules[rule] = minutes_inside / 60
+            # Only allow reservations when covered by at least one rule
+            if not hours_inside_rules:
+                return False
+
+            # If the reservation is longer than allowed for all covered rules, then it
+            # cannot be allowed
+            if duration > max(rule.max_hours for rule in hours_inside_rules):
+                return False
+            # If the reservation is shorter than allowed inside each of the covered
+            # rules, then it is always allowed
+            if duration <= min(rule.max_hours for rule in hours_inside_rules):
+                return True
+
+            # Check if the reservation adheres to the inter-rule maxima
+            if len(hours_inside_rules) == 1:
+                return all(duration <= rule.max_hours for rule in hours_inside_rules)
+            return all(
+                hours_inside <= rule.max_inside_border_crossed
+                for rule, hours_inside in hours_inside_rules.items()
+            )
+
+        def covered_periods(
+            self, start_time: datetime, end_time: datetime
+        ) -> Iterator[tuple[datetime, datetime]]:
+            """
+            Yields the periods between ``start_time`` and ``end_time`` that are
+            covered by at least one of the rules, sorted by start time.
+            Periods that are adjacent - e.g. across the end of the week - are
+            merged.
+            """
+            local_start_time = timezone.localtime(start_time)
+            week_start_date = local_start_time.date() - timedelta(
+                days=local_start_time.weekday()
+            )
+            current_period = None
+            while True:
+                week_start = datetime.combine(week_start_date, time())
+                if timezone.make_aware(week_start) >= end_time:
+                    break
+                for window_start, window_end in self.merged_windows:
+                    period_start = max(
+                        timezone.make_aware(
+                            week_start + timedelta(minutes=window_start)
+                        ),
+                        start_time,
+                    )
+                    period_end = min(
+                        timezone.make_aware(week_start + timedelta(minutes=window_end)),
+                        end_time,
+                    )
+                    if period_start >= period_end:
+                        continue
+                    if current_period and period_start <= current_period[1]:
+                        current_period = (current_period[0], period_end)
+                        continue
+                    if current_period:
+                        yield current_period
+                    current_period = (period_start, period_end)
+                week_start_date += timedelta(weeks=1)
+            if current_period:
+                yield current_period
+
+        def has_gaps(self) -> bool:
+            """Returns whether there are any times during the week that are not covered
+            by any of the rules."""
+            covered_until = 0
+            for start, end, _rule in self.windows:
+                if start > covered_until:
+                    return True
+                covered_until = max(covered_until, end)
+            return covered_until < self.MINUTES_PER_WEEK
@@ -0,0 +1,52 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+
+from make_queue.consumers import broadcast_machine_update_on_commit
+from make_queue.models.machine import Machine
+from make_queue.models.reservation import DeletedReservation, Reservation
+
+
+def is_deleting_machine(origin) -> bool:
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(origin_model, Machine)
+
+
+def record_deleted_reservation(instance: Reservation, origin, **kwargs):
+    # The deleted reservations of a machine that is itself being deleted, are not
+    # relevant to anyone (and the machine might have been deleted by the time the
+    # `DeletedReservation` object would have been created)
+    if is_deleting_machine(origin):
+        return
+    DeletedReservation.record(instance)
+
+
+def broadcast_saved_reservation(instance: Reservation, created, **kwargs):
+    loaded_machine_id = getattr(instance, "_loaded_machine_id", None)
+    if loaded_machine_id not in {None, instance.machine_id}:
+        broadcast_machine_update_on_commit(
+            loaded_machine_id, "reservation.deleted", reservation=instance.pk
+        )
+    broadcast_machine_update_on_commit(
+        instance.machine_id,
+        "reservation.created" if created else "reservation.changed",
+        reservation=instance.pk,
+    )
+
+
+def broadcast_deleted_reservation(instance: Reservation, origin, **kwargs):
+    if is_deleting_machine(origin):
+        return
+    broadcast_machine_update_on_commit(
+        instance.machine_id, "reservation.deleted", reservation=instance.pk
+    )
+
+
+def broadcast_saved_machine(instance: Machine, **kwargs):
+    broadcast_machine_update_on_commit(instance.pk, "machine.changed")
+
+
+def connect():
+    post_delete.connect(record_deleted_reservation, sender=Reservation)
+    post_save.connect(broadcast_saved_reservation, sender=Reservation)
+    post_delete.connect(broadcast_deleted_reservation, sender=Reservation)
+    post_save.connect(broadcast_saved_machine, sender=Machine)
@@ -59,6 +59,8 @@ ReservationCalendar.prototype.init = function () {
     const calendar = this;
     setInterval(() => calendar.updateCurrentTimeIndication(), 60 * 1000);
 
+    this.connectToUpdates();
+
     if (this.selection) {
         this.setUpSelection();
     }
@@ -364,6 +366,9 @@ ReservationCalendar.prototype.changeMachine = function (machine) {
      */
     this.machine = machine;
     this.update();
+    // Only listen for updates about the shown machine
+    this.updatesConnection.close();
+    this.connectToUpdates();
 };
 
 ReservationCalendar.prototype.updateCanIgnoreRules = function (canIgnoreRules) {
@@ -384,17 +389,38 @@ ReservationCalendar.prototype.showDate = function (date) {
 ReservationCalendar.prototype.update = function () {
     this.updateInformationHeaders();
     const calendar = this;
-
-    $.get(`${window.location.origin}/api/reservation/machines/${this.machine}/reservations/`, {
-        start_date: this.date.djangoFormat(),
-        end_date: this.date.nextWeek().djangoFormat(),
-    }, (data) => calendar.updateReservations.apply(calendar, [data]), "json");
+    const machine = this.machine;
+    const date = this.date;
+
+    const queryParams = {
+        start_date: date.djangoFormat(),
+        end_date: date.nextWeek().djangoFormat(),
+    };
+    // Only request the changes if the same week has already been loaded
+    if (this.isShowingLoaded(machine, date)) {
+        queryParams.since = this.reservationsVersion;
+    }
+    $.get(
+        `${window.location.origin}/api/reservation/machines/${machine}/reservations/calendar/`, queryParams,
+        (data) => calendar.updateReservations.apply(calendar, [data, machine, date]), "json",
+    );
 
     $.get(`${window.location.origin}/api/reservation/machinetypes/${this.machineType}/reservationrules/`, {}, (data) => {
         calendar.reservationRules = data.rules;
     });
 };
 
+ReservationCalendar.prototype.connectToUpdates = function () {
+    /**
+     * Updates the calendar whenever the server pushes an update about the machine's reservations or status - and
+     * after having reconnected to the server, in case some updates were missed
+     */
+    const calendar = this;
+    this.updatesConnection = connectToWebSocket(
+        `/ws/reservation/machines/${this.machine}/`, () => calendar.update(), () => calendar.update(),
+    );
+};
+
 ReservationCalendar.prototype.updateCurrentTimeIndication = function () {
     /**
      * Moves the time indicator from its current position to the position of the current time
@@ -498,11 +524,44 @@ ReservationCalendar.prototype.createPopup = function ($reservationElement, reser
     });
 };
 
-ReservationCalendar.prototype.updateReservations = function (data) {
+ReservationCalendar.prototype.isShowingLoaded = function (machine, date) {
+    /**
+     * Returns whether the reservations of the given machine and week are the ones that have been loaded.
+     */
+    return this.loadedDate !== undefined && this.loadedMachine === machine
+        && this.loadedDate.getTime() === date.getTime();
+};
+
+ReservationCalendar.prototype.updateReservations = function (data, machine, date) {
     /**
-     * A callback function used after performing an AJAX request to the backend for reservations. This would for example
-     * be called when changing weeks.
+     * A callback function used after performing an AJAX request to the backend for reservations of the given machine
+     * and week. This would for example be called when changing weeks.
      */
+    // Ignore the response if another machine or week is shown now
+    if (machine !== this.machine || date.getTime() !== this.date.getTime()) {
+        return;
+    }
+
+    const isShowingLoaded = this.isShowingLoaded(machine, date);
+    // Ignore the response if a more recent response has already been received
+    if (isShowingLoaded && data.version < this.reservationsVersion) {
+        return;
+    }
+
+    let reservations = data.reservations;
+    if (data.since !== null) {
+        if (!isShowingLoaded) {
+            return;
+        }
+        // Only the changes since the loaded version were sent
+        const changedPks = data.reservations.map((reservation) => reservation.pk).concat(data.deleted);
+        reservations = this.reservations
+            .filter((reservation) => !changedPks.includes(reservation.pk))
+            .concat(data.reservations);
+    }
+    this.loadedMachine = machine;
+    this.loadedDate = date;
+    this.reservationsVersion = data.version;
 
     // Reset the calendar
     this.days.forEach(day => $(day).empty());
@@ -510,9 +569,9 @@ ReservationCalendar.prototype.updateReservations = function (data) {
 
     // Add all new reservations
     const calendar = this;
-    data.reservations.forEach((reservation) => calendar.addReservation.apply(calendar, [reservation]));
+    reservations.forEach((reservation) => calendar.addReservation.apply(calendar, [reservation]));
 
-    this.reservations = data.reservations;
+    this.reservations = reservations;
     this.resetSelection();
 };
 
@@ -0,0 +1,33 @@
+/* This script requires the JSON object with the ID `machine-status-displays` to be defined */
+
+const machineStatusDisplays = JSON.parse($("#machine-status-displays").text());
+const machineStatusColors = Object.values(machineStatusDisplays).map((display) => display.color);
+
+function updateMachineStatus(machinePK, status) {
+    const statusDisplay = machineStatusDisplays[status];
+    const $statusElements = $(`.machine.card[data-machine-pk="${machinePK}"] .machine-status`);
+    $statusElements.removeClass(machineStatusColors.join(" ")).addClass(statusDisplay.color);
+    $statusElements.filter(".header").text(statusDisplay.text);
+}
+
+function refreshMachineStatuses() {
+    // Fetches the current statuses by loading the page again, as some updates might have been missed
+    $.get(window.location.href, (html) => {
+        $("<div>").html(html).find(".machine.card").each((_index, card) => {
+            const machinePK = $(card).attr("data-machine-pk");
+            const $newStatusElements = $(card).find(".machine-status");
+            $(`.machine.card[data-machine-pk="${machinePK}"] .machine-status`).each((index, statusElement) => {
+                $(statusElement).replaceWith($newStatusElements.eq(index).clone());
+            });
+        });
+    });
+}
+
+function connectToMachineUpdates() {
+    connectToWebSocket("/ws/reservation/machines/", (event) => {
+        const update = JSON.parse(event.data);
+        updateMachineStatus(update.machine, update.status);
+    }, refreshMachineStatuses);
+}
+
+$(connectToMachineUpdates);
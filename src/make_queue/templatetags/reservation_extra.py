@@ -44,16 +44,18 @@ def numeric_range(start, end, step=1):
     return list(range(start, end, step))
 
 
+MACHINE_STATUS_CARD_COLORS = {
+    Machine.Status.RESERVED: "blue",
+    Machine.Status.AVAILABLE: "green",
+    Machine.Status.IN_USE: "orange",
+    Machine.Status.OUT_OF_ORDER: "red",
+    Machine.Status.MAINTENANCE: "brown",
+}
+
+
 @register.simple_tag
 def card_color_from_machine_status(machine: Machine):
-    colors = {
-        Machine.Status.RESERVED: "blue",
-        Machine.Status.AVAILABLE: "green",
-        Machine.Status.IN_USE: "orange",
-        Machine.Status.OUT_OF_ORDER: "red",
-        Machine.Status.MAINTENANCE: "brown",
-    }
-    return colors[machine.get_status()]
+    return MACHINE_STATUS_CARD_COLORS[machine.get_status()]
 
 
 @register.simple_tag
@@ -63,21 +65,25 @@ def shorthand_days():
 
 @register.simple_tag
 def card_text_from_machine_status(machine: Machine):
-    status = machine.get_status_display()
-    next_reservation = machine.get_next_reservation()
+    # (Avoids querying the database if `machine` has been annotated by
+    # `MachineQuerySet.annotate_status()`)
+    status = machine.get_status()
+    status_display = Machine.STATUS_CHOICES_DICT[status]
+    if status != Machine.Status.AVAILABLE:
+        return status_display
 
     # If the machine is free for less than a day, provide the number of hours/minutes
     # until the next reservation.
+    next_reservation_start_time = machine.get_next_reservation_start_time()
     if (
-        machine.get_status() == Machine.Status.AVAILABLE
-        and next_reservation is not None
-        and (next_reservation.start_time - timezone.localtime()).days < 1
+        next_reservation_start_time is not None
+        and (next_reservation_start_time - timezone.localtime()).days < 1
     ):
-        status = _("{machine_status} for {duration}").format(
-            machine_status=status,
-            duration=timeuntil(next_reservation.start_time, time_strings=TIME_STRINGS),
+        status_display = _("{machine_status} for {duration}").format(
+            machine_status=status_display,
+            duration=timeuntil(next_reservation_start_time, time_strings=TIME_STRINGS),
         )
-    return status
+    return status_display
 
 
 @register.simple_tag
@@ -1,4 +1,5 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.contrib.auth.models import AnonymousUser
 from django.test import TestCase
@@ -108,3 +109,124 @@ class TestCanUse3DPrinter(TestCase):
     def test_unregistered_user_use_3d_printer(self):
         user = User.objects.create_user("test")
         self.assertFalse(MachineType.can_use_3d_printer(user))
+
+
+class TestReservationsInPeriod(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("test")
+        self.machine = Machine.objects.create(
+            name="C1",
+            location="Printer room",
+            machine_model="Generic machine",
+            machine_type=MachineType.objects.get(pk=1),
+        )
+        self.now = timezone.localtime()
+        self.reservation = self.create_reservation(
+            self.now + timedelta(hours=1), self.now + timedelta(hours=2)
+        )
+
+    def create_reservation(self, start_time, end_time):
+        # Bypass the validation in `Reservation.save()`, as it's irrelevant here
+        reservation = Reservation(
+            machine=self.machine,
+            user=self.user,
+            start_time=start_time,
+            end_time=end_time,
+        )
+        super(Reservation, reservation).save()
+        return reservation
+
+    def test_reservations_in_period_uses_half_open_periods(self):
+        hour = timedelta(hours=1)
+        minute = timedelta(minutes=1)
+        for start_time, end_time, expected_overlap in [
+            # Touching at either end is not an overlap
+            (self.now, self.now + hour, False),
+            (self.now + 2 * hour, self.now + 3 * hour, False),
+            # Start before, end inside
+            (self.now, self.now + hour + minute, True),
+            # Start inside, end after
+            (self.now + 2 * hour - minute, self.now + 3 * hour, True),
+            # Start inside, end inside
+            (self.now + hour + minute, self.now + 2 * hour - minute, True),
+            # Start before, end after
+            (self.now, self.now + 3 * hour, True),
+            # The exact same period
+            (self.now + hour, self.now + 2 * hour, True),
+        ]:
+            with self.subTest(start_time=start_time, end_time=end_time):
+                self.assertEqual(
+                    list(self.machine.reservations_in_period(start_time, end_time)),
+                    [self.reservation] if expected_overlap else [],
+                )
+
+    def test_annotate_status_matches_get_status(self):
+        hour = timedelta(hours=1)
+        # The reservation created in `setUp()` starts in 1 hour and ends in 2 hours
+        for now, expected_status, expected_next_start_time in [
+            (self.now, Machine.Status.AVAILABLE, self.reservation.start_time),
+            (self.now + 1.5 * hour, Machine.Status.RESERVED, None),
+            (self.now + 3 * hour, Machine.Status.AVAILABLE, None),
+        ]:
+            with self.subTest(now=now), patch("django.utils.timezone.now") as now_mock:
+                now_mock.return_value = now
+                machine = Machine.objects.annotate_status().get(pk=self.machine.pk)
+                self.assertEqual(machine.annotated_status, expected_status)
+                self.assertEqual(
+                    machine.annotated_reservation_in_progress_pk,
+                    self.reservation.pk
+                    if expected_status == Machine.Status.RESERVED
+                    else None,
+                )
+                self.assertEqual(
+                    machine.get_next_reservation_start_time(),
+                    expected_next_start_time,
+                )
+                with self.assertNumQueries(0):
+                    self.assertEqual(machine.get_status(), expected_status)
+                self.assertEqual(self.machine.get_status(), expected_status)
+
+        self.machine.status = Machine.Status.OUT_OF_ORDER
+        self.machine.save()
+        machine = Machine.objects.annotate_status(self.now + 1.5 * hour).get(
+            pk=self.machine.pk
+        )
+        self.assertEqual(machine.annotated_status, Machine.Status.OUT_OF_ORDER)
+
+
+class TestReservationsVersion(TestCase):
+    def setUp(self):
+        usage_requirement = CoursePermission.objects.get(
+            short_name=CoursePermission.DefaultPerms.IS_AUTHENTICATED
+        )
+        machine_type = MachineType.objects.create(
+            name="Machine type", usage_requirement=usage_requirement, priority=1
+        )
+        self.machine = Machine.objects.create(name="Machine", machine_type=machine_type)
+        self.user = User.objects.create_user("user")
+        Quota.objects.create(
+            user=self.user,
+            machine_type=machine_type,
+            number_of_reservations=1,
+            ignore_rules=True,
+        )
+
+    def test_saving_outdated_machine_does_not_decrease_reservations_version(self):
+        loaded_machine = Machine.objects.get(pk=self.machine.pk)
+        start_time = timezone.localtime() + timedelta(hours=1)
+        Reservation.objects.create(
+            machine=self.machine,
+            user=self.user,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+        self.machine.refresh_from_db()
+        version = self.machine.reservations_version
+        self.assertGreater(version, loaded_machine.reservations_version)
+
+        # E.g. done when changing the machine's status
+        loaded_machine.status = Machine.Status.OUT_OF_ORDER
+        loaded_machine.save()
+        self.machine.refresh_from_db()
+        self.assertEqual(self.machine.status, Machine.Status.OUT_OF_ORDER)
+        self.assertEqual(self.machine.reservations_version, version)
@@ -1,16 +1,25 @@
+import itertools
+import threading
 from abc import ABC
 from collections.abc import Callable
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.dateparse import parse_time
 
 from make_queue.models.course import CoursePermission, Printer3DCourse
 from make_queue.models.machine import Machine, MachineType
-from make_queue.models.reservation import Quota, Reservation, ReservationRule
+from make_queue.models.reservation import (
+    Quota,
+    Reservation,
+    ReservationRule,
+    ReservationValidationResult,
+)
 from make_queue.templatetags.reservation_extra import can_change_reservation
 from news.models import Event, TimePlace
 from users.models import User
@@ -192,6 +201,41 @@ class TestReservation(ReservationTestBase):
             )
         )
 
+    def test_number_of_queries_when_saving_does_not_depend_on_number_of_quotas(self):
+        def get_num_queries_when_saving(relative_start_time: timedelta):
+            reservation = self.create_reservation(
+                relative_start_time, relative_start_time + timedelta(hours=1)
+            )
+            with CaptureQueriesContext(connection) as context:
+                reservation.save()
+            self.assertEqual(reservation.quota, self.user_quota)
+            return len(context.captured_queries)
+
+        self.user_quota.number_of_reservations = 3
+        self.user_quota.save()
+        # Make sure that things like the reservation rule table are cached before
+        # counting
+        get_num_queries_when_saving(timedelta(hours=1))
+        num_queries_with_one_quota = get_num_queries_when_saving(timedelta(hours=2))
+
+        for _i in range(5):
+            # Quotas that have already been used up
+            Quota.objects.create(
+                user=self.user_with_course_and_quota,
+                number_of_reservations=0,
+                machine_type=self.machine_type,
+            )
+            # Quotas for all users, which should be less preferred than the user quota
+            Quota.objects.create(
+                all=True,
+                number_of_reservations=1,
+                diminishing=True,
+                machine_type=self.machine_type,
+            )
+        self.assertEqual(
+            get_num_queries_when_saving(timedelta(hours=3)), num_queries_with_one_quota
+        )
+
     def test_make_more_than_allowed_number_of_reservations(self):
         self.user_quota.number_of_reservations = 5
         self.user_quota.save()
@@ -212,6 +256,53 @@ class TestReservation(ReservationTestBase):
             "User should not be able to make more reservations than allowed",
         )
 
+    def test_validation_result_describes_why_reservation_is_invalid(self):
+        Code = ReservationValidationResult.Code
+        self.user_quota.number_of_reservations = 1
+        self.user_quota.save()
+
+        def validate(relative_start_time: timedelta, relative_end_time: timedelta):
+            return self.create_reservation(
+                relative_start_time, relative_end_time
+            ).validate()
+
+        result = validate(timedelta(hours=1), timedelta(hours=2))
+        self.assertTrue(result)
+        self.assertIsNone(result.code)
+        self.assertEqual(result.best_quota, self.user_quota)
+        self.assertEqual(result.machine_status, Machine.Status.AVAILABLE)
+
+        self.assertEqual(
+            validate(timedelta(hours=2), timedelta(hours=1)).code, Code.INVALID_PERIOD
+        )
+        self.assertEqual(
+            validate(timedelta(hours=-1), timedelta(hours=1)).code,
+            Code.STARTS_IN_THE_PAST,
+        )
+        self.assertEqual(
+            validate(
+                timedelta(hours=1), timedelta(hours=self.max_time_reservation + 1.1)
+            ).code,
+            Code.OUTSIDE_RULES,
+        )
+        self.create_reservation(timedelta(hours=1), timedelta(hours=2)).save()
+        self.assertEqual(
+            validate(timedelta(hours=1.5), timedelta(hours=3)).code, Code.OVERLAPPING
+        )
+        self.assertEqual(
+            validate(timedelta(hours=3), timedelta(hours=4)).code, Code.QUOTA_EXCEEDED
+        )
+
+        self.machine.status = Machine.Status.MAINTENANCE
+        self.machine.save()
+        result = validate(timedelta(hours=3), timedelta(hours=4))
+        self.assertFalse(result)
+        self.assertEqual(result.code, Code.MACHINE_MAINTENANCE)
+        self.assertEqual(result.machine_status, Machine.Status.MAINTENANCE)
+        with self.assertRaises(ValidationError) as context:
+            self.create_reservation(timedelta(hours=3), timedelta(hours=4)).save()
+        self.assertEqual(context.exception.code, Code.MACHINE_MAINTENANCE)
+
     @patch("django.utils.timezone.now")
     def test_disallow_overlapping_reservations(self, now_mock):
         now_mock.return_value = parse_datetime_localized("2018-03-12 12:00")
@@ -693,3 +784,178 @@ class TestReservationOfAdvancedPrinters(ReservationTestBase):
                 user=self.user_with_course_and_quota,
             )
         )
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Uses a separate database connection for each thread, which means that the
+    changes must be committed to be visible to the other threads."""
+
+    NUM_THREADS = 8
+
+    def setUp(self):
+        # (Not using the objects created by the migrations, as `TransactionTestCase`
+        # empties the database after each test)
+        usage_requirement, _created = CoursePermission.objects.get_or_create(
+            short_name=CoursePermission.DefaultPerms.IS_AUTHENTICATED
+        )
+        machine_type = MachineType.objects.create(
+            name="Machine type", usage_requirement=usage_requirement, priority=1
+        )
+        self.machine = Machine.objects.create(name="Machine", machine_type=machine_type)
+        self.users = [
+            User.objects.create_user(f"user{i}") for i in range(self.NUM_THREADS)
+        ]
+        Quota.objects.create(
+            all=True,
+            machine_type=self.machine.machine_type,
+            number_of_reservations=self.NUM_THREADS,
+            ignore_rules=True,
+        )
+
+    def create_reservations_concurrently(
+        self, periods: list[tuple[datetime, datetime]], *, users: list[User] = None
+    ) -> list[Exception | None]:
+        """Tries to create a reservation for each of ``periods`` at the same time,
+        each in a separate thread (and database connection), and returns the
+        exception raised by each attempt, or ``None`` if it succeeded.
+        Like the views, each reservation is validated before it's saved."""
+        if users is None:
+            users = self.users
+        barrier = threading.Barrier(len(periods))
+        results = [None] * len(periods)
+
+        def create_reservation(index: int):
+            start_time, end_time = periods[index]
+            try:
+                reservation = Reservation(
+                    machine=self.machine,
+                    user=users[index],
+                    start_time=start_time,
+                    end_time=end_time,
+                )
+                reservation.validate()
+                barrier.wait()
+                reservation.save()
+            except Exception as e:  # noqa: BLE001
+                results[index] = e
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=create_reservation, args=(i,))
+            for i in range(len(periods))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def assert_no_overlapping_reservations(self):
+        reservations = list(self.machine.reservations.order_by("start_time"))
+        for reservation, next_reservation in itertools.pairwise(reservations):
+            self.assertLessEqual(reservation.end_time, next_reservation.start_time)
+
+    def assert_failed_attempts_are_expected(self, results: list[Exception | None]):
+        for result in results:
+            if result is not None:
+                # Either rejected by the validation, or gave up after having been
+                # blocked by the other transactions too many times
+                self.assertIsInstance(result, ValidationError | OperationalError)
+
+    def test_only_one_of_concurrent_reservations_for_same_period_is_created(self):
+        start_time = timezone.localtime() + timedelta(hours=1)
+        results = self.create_reservations_concurrently(
+            [(start_time, start_time + timedelta(hours=1))] * self.NUM_THREADS
+        )
+        self.assert_failed_attempts_are_expected(results)
+        self.assertEqual(results.count(None), 1)
+        self.assertEqual(self.machine.reservations.count(), 1)
+
+    def test_concurrent_partly_overlapping_reservations_do_not_overlap(self):
+        start_time = timezone.localtime() + timedelta(hours=1)
+        # Each period overlaps the previous and the next period
+        results = self.create_reservations_concurrently(
+            [
+                (
+                    start_time + timedelta(minutes=30 * i),
+                    start_time + timedelta(minutes=30 * i + 45),
+                )
+                for i in range(self.NUM_THREADS)
+            ]
+        )
+        self.assert_failed_attempts_are_expected(results)
+        self.assertGreater(results.count(None), 0)
+        self.assert_no_overlapping_reservations()
+        self.assertEqual(self.machine.reservations.count(), results.count(None))
+
+    def test_concurrent_reservations_by_same_user_do_not_exceed_quota(self):
+        Quota.objects.all().delete()
+        user = self.users[0]
+        Quota.objects.create(
+            user=user,
+            machine_type=self.machine.machine_type,
+            number_of_reservations=1,
+            ignore_rules=True,
+        )
+        start_time = timezone.localtime() + timedelta(hours=1)
+        results = self.create_reservations_concurrently(
+            [
+                (start_time, start_time + timedelta(hours=1)),
+                (start_time + timedelta(hours=2), start_time + timedelta(hours=3)),
+            ],
+            users=[user, user],
+        )
+        self.assert_failed_attempts_are_expected(results)
+        self.assertEqual(results.count(None), 1)
+        self.assertEqual(self.machine.reservations.count(), 1)
+
+    def test_save_is_retried_when_blocked_by_other_transactions(self):
+        start_time = timezone.localtime() + timedelta(hours=1)
+        reservation = Reservation(
+            machine=self.machine,
+            user=self.users[0],
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+        lock_and_save = reservation._lock_machines_and_save
+        num_attempts = 0
+
+        def fail_until_last_attempt(*args, **kwargs):
+            nonlocal num_attempts
+            num_attempts += 1
+            if num_attempts < Reservation.MAX_SAVE_ATTEMPTS:
+                raise OperationalError("database table is locked")
+            return lock_and_save(*args, **kwargs)
+
+        with patch.object(
+            reservation, "_lock_machines_and_save", fail_until_last_attempt
+        ):
+            reservation.save()
+        self.assertEqual(num_attempts, Reservation.MAX_SAVE_ATTEMPTS)
+        self.assertTrue(Reservation.objects.filter(pk=reservation.pk).exists())
+
+        num_attempts = 0
+        reservation.end_time += timedelta(hours=1)
+        with (
+            patch.object(
+                reservation,
+                "_lock_machines_and_save",
+                side_effect=OperationalError("database table is locked"),
+            ) as lock_and_save_mock,
+            self.assertRaises(OperationalError),
+        ):
+            reservation.save()
+        self.assertEqual(lock_and_save_mock.call_count, Reservation.MAX_SAVE_ATTEMPTS)
+
+        # Other errors should not be retried
+        with (
+            patch.object(
+                reservation,
+                "_lock_machines_and_save",
+                side_effect=OperationalError("no such table: make_queue_reservation"),
+            ) as lock_and_save_mock,
+            self.assertRaises(OperationalError),
+        ):
+            reservation.save()
+        self.assertEqual(lock_and_save_mock.call_count, 1)
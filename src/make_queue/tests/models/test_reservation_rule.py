@@ -552,3 +552,68 @@ class TestReservationRule(TestCase):
             "A period should not be valid if it is empty, i.e., not coverd by any"
             " rules.",
         )
+
+    def test_window_table_hours_inside_matches_periods(self):
+        rule = ReservationRule.objects.create(
+            machine_type=self.machine_type,
+            start_time=parse_time("22:00"),
+            days_changed=1,
+            end_time=parse_time("6:00"),
+            start_days=[Day.MONDAY, Day.SUNDAY],
+            max_hours=10,
+            max_inside_border_crossed=5,
+        )
+        table = ReservationRule.WindowTable.for_machine_type(self.machine_type)
+        for start_time_str, end_time_str in [
+            ("2018-11-05 12:00", "2018-11-05 23:00"),
+            ("2018-11-05 23:00", "2018-11-06 12:00"),
+            ("2018-11-06 12:00", "2018-11-07 12:00"),
+            # Crossing the end of the week
+            ("2018-11-11 20:00", "2018-11-12 23:00"),
+        ]:
+            start_time = parse_datetime(start_time_str)
+            end_time = parse_datetime(end_time_str)
+            with self.subTest(start_time=start_time, end_time=end_time):
+                hours_inside_periods = sum(
+                    period.hours_inside(start_time, end_time)
+                    for period in rule.time_periods
+                )
+                self.assertAlmostEqual(
+                    table.hours_inside(rule, start_time, end_time),
+                    hours_inside_periods,
+                )
+                self.assertAlmostEqual(
+                    rule.hours_inside(start_time, end_time), hours_inside_periods
+                )
+
+    def test_window_table_is_cached_until_rules_are_changed(self):
+        rule = ReservationRule.objects.create(
+            machine_type=self.machine_type,
+            start_time=parse_time("10:00"),
+            days_changed=0,
+            end_time=parse_time("18:00"),
+            start_days=Day.values,
+            max_hours=10,
+            max_inside_border_crossed=5,
+        )
+        table = ReservationRule.WindowTable.for_machine_type(self.machine_type)
+        self.assertTrue(table.has_gaps())
+        # Only the rules' version should be queried
+        with self.assertNumQueries(1):
+            self.assertIs(
+                ReservationRule.WindowTable.for_machine_type(self.machine_type), table
+            )
+
+        rule.start_time = parse_time("00:00")
+        rule.days_changed = 1
+        rule.end_time = parse_time("00:00")
+        rule.save()
+        changed_table = ReservationRule.WindowTable.for_machine_type(self.machine_type)
+        self.assertIsNot(changed_table, table)
+        self.assertFalse(changed_table.has_gaps())
+
+        rule.delete()
+        deleted_table = ReservationRule.WindowTable.for_machine_type(self.machine_type)
+        self.assertIsNot(deleted_table, changed_table)
+        self.assertEqual(deleted_table.rules, [])
+        self.assertTrue(deleted_table.has_gaps())
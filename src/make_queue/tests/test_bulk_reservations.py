@@ -0,0 +1,207 @@
+from datetime import timedelta
+
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from make_queue.bulk_reservations import BulkReservationCreator, BulkReservationItem
+from make_queue.models.machine import Machine, MachineType
+from make_queue.models.reservation import Reservation
+from news.models import Event, TimePlace
+from users.models import User
+from util.locale_utils import parse_datetime_localized
+
+Status = BulkReservationItem.Status
+
+
+class BulkReservationCreatorTests(TestCase):
+    def setUp(self):
+        self.start = parse_datetime_localized("2030-01-07 10:00")
+        self.user = User.objects.create_user("user")
+        self.user.add_perms("make_queue.can_create_event_reservation")
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        self.machine_type = MachineType.objects.get(pk=2)
+        self.machine1 = Machine.objects.create(
+            name="Machine 1", machine_type=self.machine_type
+        )
+        self.machine2 = Machine.objects.create(
+            name="Machine 2", machine_type=self.machine_type
+        )
+        # (Created using `bulk_create()` to skip the validation in `save()`)
+        [self.existing_reservation] = Reservation.objects.bulk_create(
+            [
+                Reservation(
+                    user=self.user,
+                    machine=self.machine2,
+                    start_time=self.start + timedelta(weeks=1, hours=1),
+                    end_time=self.start + timedelta(weeks=1, hours=3),
+                ),
+            ]
+        )
+
+    def get_weekly_periods(self, count: int):
+        return BulkReservationCreator.get_recurring_periods(
+            self.start,
+            self.start + timedelta(hours=2),
+            interval=timedelta(weeks=1),
+            count=count,
+        )
+
+    def create_for_periods(self, periods, machines=None, **kwargs):
+        if machines is None:
+            machines = [self.machine1, self.machine2]
+        return BulkReservationCreator(self.user, machines).create_for_periods(
+            periods, special_text="Course", **kwargs
+        )
+
+    def test_get_recurring_periods(self):
+        self.assertListEqual(
+            self.get_weekly_periods(3),
+            [
+                (
+                    self.start + timedelta(weeks=week),
+                    self.start + timedelta(weeks=week, hours=2),
+                )
+                for week in range(3)
+            ],
+        )
+
+    def test_creates_reservations_except_for_those_conflicting(self):
+        items = self.create_for_periods(self.get_weekly_periods(3))
+        self.assertEqual(len(items), 6)
+        conflicting_items = [item for item in items if item.status == Status.CONFLICT]
+        self.assertEqual(len(conflicting_items), 1)
+        conflicting_item = conflicting_items[0]
+        self.assertEqual(conflicting_item.reservation.machine, self.machine2)
+        self.assertEqual(
+            conflicting_item.conflicting_reservation_pks,
+            [self.existing_reservation.pk],
+        )
+        self.assertIsNone(conflicting_item.reservation.pk)
+
+        created_items = [item for item in items if item.status == Status.CREATED]
+        self.assertEqual(len(created_items), 5)
+        created_reservations = Reservation.objects.filter(special=True)
+        self.assertSetEqual(
+            set(created_reservations),
+            {item.reservation for item in created_items},
+        )
+        for reservation in created_reservations:
+            self.assertEqual(reservation.special_text, "Course")
+            self.assertEqual(reservation.user, self.user)
+
+        # The machines' versions should have been incremented once each, and the
+        # reservations should have gotten the new versions
+        for machine in (self.machine1, self.machine2):
+            machine.refresh_from_db()
+            self.assertSetEqual(
+                {r.version for r in created_reservations if r.machine == machine},
+                {machine.reservations_version},
+            )
+        self.assertEqual(self.machine1.reservations_version, 1)
+
+    def test_reservations_conflicting_with_each_other_are_not_created(self):
+        periods = [
+            (self.start, self.start + timedelta(hours=2)),
+            (self.start + timedelta(hours=1), self.start + timedelta(hours=3)),
+            # Starts when the first one ends
+            (self.start + timedelta(hours=2), self.start + timedelta(hours=4)),
+        ]
+        items = self.create_for_periods(periods, machines=[self.machine1])
+        self.assertListEqual(
+            [item.status for item in items],
+            [Status.CREATED, Status.CONFLICT, Status.CREATED],
+        )
+        # Only the existing reservations are listed
+        self.assertListEqual(items[1].conflicting_reservation_pks, [])
+
+    def test_nothing_is_created_if_there_are_conflicts_and_not_skipping_conflicts(
+        self,
+    ):
+        items = self.create_for_periods(
+            self.get_weekly_periods(3), skip_conflicts=False
+        )
+        self.assertEqual(
+            [item.status for item in items].count(Status.CONFLICT),
+            1,
+        )
+        self.assertTrue(all(item.status != Status.CREATED for item in items))
+        self.assertFalse(Reservation.objects.filter(special=True).exists())
+        self.machine1.refresh_from_db()
+        self.assertEqual(self.machine1.reservations_version, 0)
+
+    def test_invalid_reservations_are_not_created(self):
+        other_machine = Machine.objects.create(
+            name="Other machine", machine_type=self.machine_type
+        )
+        creator = BulkReservationCreator(self.user, [self.machine1])
+        items = creator.create(
+            [
+                Reservation(
+                    user=self.user,
+                    machine=self.machine1,
+                    start_time=self.start,
+                    end_time=self.start,
+                    special=True,
+                ),
+                # Not one of the creator's machines
+                Reservation(
+                    user=self.user,
+                    machine=other_machine,
+                    start_time=self.start,
+                    end_time=self.start + timedelta(hours=1),
+                    special=True,
+                ),
+            ]
+        )
+        self.assertListEqual(
+            [item.status for item in items], [Status.INVALID, Status.INVALID]
+        )
+        self.assertFalse(Reservation.objects.filter(special=True).exists())
+
+    def test_creates_event_reservations_during_time_places(self):
+        event = Event.objects.create(title="Course")
+        time_places = [
+            TimePlace.objects.create(
+                event=event,
+                start_time=start_time,
+                end_time=end_time,
+            )
+            for start_time, end_time in self.get_weekly_periods(2)
+        ]
+        items = BulkReservationCreator(
+            self.user, [self.machine1]
+        ).create_for_time_places(time_places)
+        self.assertListEqual(
+            [item.status for item in items], [Status.CREATED, Status.CREATED]
+        )
+        self.assertListEqual(
+            [
+                (r.event, r.start_time, r.end_time, r.special)
+                for r in Reservation.objects.filter(machine=self.machine1).order_by(
+                    "start_time"
+                )
+            ],
+            [(tp, tp.start_time, tp.end_time, False) for tp in time_places],
+        )
+
+    def test_user_without_permission_cannot_create_reservations(self):
+        user = User.objects.create_user("user2")
+        creator = BulkReservationCreator(user, [self.machine1])
+        with self.assertRaises(PermissionDenied):
+            creator.create_for_periods(self.get_weekly_periods(1), special_text="")
+        self.assertFalse(Reservation.objects.filter(special=True).exists())
+
+    def test_number_of_queries_does_not_depend_on_number_of_reservations(self):
+        def get_num_queries(weeks: int) -> int:
+            Reservation.objects.filter(special=True).delete()
+            with CaptureQueriesContext(connection) as context:
+                items = self.create_for_periods(self.get_weekly_periods(weeks))
+            self.assertEqual(len(items), 2 * weeks)
+            return len(context.captured_queries)
+
+        # Make sure that things like the user's permissions are cached before counting
+        get_num_queries(1)
+        self.assertEqual(get_num_queries(10), get_num_queries(3))
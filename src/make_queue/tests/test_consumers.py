@@ -0,0 +1,110 @@
+from collections.abc import Callable
+from datetime import timedelta
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase
+from django.utils import timezone
+
+from make_queue.models.machine import Machine, MachineType
+from make_queue.models.reservation import Quota, Reservation
+from make_queue.urls import websocket_urlpatterns
+from users.models import User
+
+
+class MachineUpdatesConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        self.machine_type = MachineType.objects.get(pk=2)
+        self.machine = Machine.objects.create(
+            name="Machine 1", machine_type=self.machine_type
+        )
+        self.internal_machine = Machine.objects.create(
+            name="Internal machine", machine_type=self.machine_type, internal=True
+        )
+        Quota.objects.create(
+            user=self.user,
+            machine_type=self.machine_type,
+            number_of_reservations=10,
+            ignore_rules=True,
+        )
+
+    async def connect(self, path: str) -> tuple[WebsocketCommunicator, bool]:
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), path)
+        communicator.scope["user"] = self.user
+        connected, _subprotocol = await communicator.connect()
+        return communicator, connected
+
+    async def change_and_commit(self, change_func: Callable[[], Any]) -> Any:
+        """Calls ``change_func``, and executes the callbacks that would have been
+        called when the test's transaction was committed - like broadcasting the
+        updates."""
+
+        def change_and_execute_callbacks():
+            with self.captureOnCommitCallbacks(execute=True):
+                return change_func()
+
+        return await sync_to_async(change_and_execute_callbacks)()
+
+    def create_reservation(self) -> Reservation:
+        now = timezone.localtime()
+        return Reservation.objects.create(
+            machine=self.machine,
+            user=self.user,
+            start_time=now + timedelta(hours=1),
+            end_time=now + timedelta(hours=2),
+        )
+
+    def set_status(self, machine: Machine, status: Machine.Status):
+        machine.status = status
+        machine.save()
+
+    async def test_receives_updates_about_reservations_of_machine(self):
+        communicator, connected = await self.connect(
+            f"/ws/reservation/machines/{self.machine.pk}/"
+        )
+        self.assertTrue(connected)
+
+        reservation = await self.change_and_commit(self.create_reservation)
+        update = await communicator.receive_json_from()
+        self.assertEqual(update["type"], "reservation.created")
+        self.assertEqual(update["machine"], self.machine.pk)
+        self.assertEqual(update["reservation"], reservation.pk)
+        self.assertEqual(update["status"], Machine.Status.AVAILABLE)
+        version = update["reservations_version"]
+
+        reservation_pk = reservation.pk
+        await self.change_and_commit(reservation.delete)
+        update = await communicator.receive_json_from()
+        self.assertEqual(update["type"], "reservation.deleted")
+        self.assertEqual(update["reservation"], reservation_pk)
+        self.assertGreater(update["reservations_version"], version)
+        await communicator.disconnect()
+
+    async def test_only_receives_updates_about_visible_machines(self):
+        communicator, connected = await self.connect("/ws/reservation/machines/")
+        self.assertTrue(connected)
+
+        await self.change_and_commit(
+            lambda: self.set_status(self.internal_machine, Machine.Status.OUT_OF_ORDER)
+        )
+        self.assertTrue(await communicator.receive_nothing())
+
+        await self.change_and_commit(
+            lambda: self.set_status(self.machine, Machine.Status.MAINTENANCE)
+        )
+        update = await communicator.receive_json_from()
+        self.assertEqual(update["type"], "machine.changed")
+        self.assertEqual(update["machine"], self.machine.pk)
+        self.assertEqual(update["status"], Machine.Status.MAINTENANCE)
+        await communicator.disconnect()
+
+    async def test_cannot_connect_to_machine_that_is_not_visible(self):
+        _communicator, connected = await self.connect(
+            f"/ws/reservation/machines/{self.internal_machine.pk}/"
+        )
+        self.assertFalse(connected)
@@ -0,0 +1,146 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_time
+
+from make_queue.free_slots import FreeSlotFinder
+from make_queue.models.machine import Machine, MachineType
+from make_queue.models.reservation import Quota, Reservation, ReservationRule
+from users.models import User
+from util.locale_utils import parse_datetime_localized
+
+Day = ReservationRule.Day
+
+
+class FreeSlotFinderTests(TestCase):
+    def setUp(self):
+        # A Monday
+        self.now = parse_datetime_localized("2030-01-07 08:00")
+        self.user = User.objects.create_user("user")
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        self.machine_type = MachineType.objects.get(pk=2)
+        self.machine1 = Machine.objects.create(
+            name="Machine 1", machine_type=self.machine_type
+        )
+        self.machine2 = Machine.objects.create(
+            name="Machine 2", machine_type=self.machine_type
+        )
+        ReservationRule.objects.create(
+            machine_type=self.machine_type,
+            start_time=parse_time("10:00"),
+            days_changed=0,
+            end_time=parse_time("18:00"),
+            start_days=[
+                Day.MONDAY,
+                Day.TUESDAY,
+                Day.WEDNESDAY,
+                Day.THURSDAY,
+                Day.FRIDAY,
+            ],
+            max_hours=4,
+            max_inside_border_crossed=4,
+        )
+        self.quota = Quota.objects.create(
+            user=self.user, machine_type=self.machine_type, number_of_reservations=5
+        )
+        # (Created using `bulk_create()` to skip the validation in `save()`)
+        Reservation.objects.bulk_create(
+            [
+                Reservation(
+                    user=self.user,
+                    machine=self.machine1,
+                    start_time=self.now + timedelta(hours=4),
+                    end_time=self.now + timedelta(hours=6),
+                ),
+            ]
+        )
+
+    def find_slots(self, required_duration: timedelta, **kwargs):
+        finder = FreeSlotFinder(self.machine_type, self.user, now=self.now)
+        return [
+            (slot.machine, slot.start_time, slot.end_time)
+            for slot in finder.find_slots(required_duration, **kwargs)
+        ]
+
+    def test_slots_are_inside_rules_and_sorted_by_start_time(self):
+        def at(hours: float):
+            return self.now + timedelta(hours=hours)
+
+        self.assertListEqual(
+            self.find_slots(timedelta(hours=2), limit=5),
+            [
+                (self.machine1, at(2), at(4)),
+                (self.machine2, at(2), at(10)),
+                (self.machine1, at(6), at(10)),
+                (self.machine1, at(24 + 2), at(24 + 10)),
+                (self.machine2, at(24 + 2), at(24 + 10)),
+            ],
+        )
+        # The gap before the reservation is too short
+        self.assertListEqual(
+            self.find_slots(timedelta(hours=3), limit=2),
+            [
+                (self.machine2, at(2), at(10)),
+                (self.machine1, at(6), at(10)),
+            ],
+        )
+        # Longer than allowed by the rule
+        self.assertListEqual(self.find_slots(timedelta(hours=5)), [])
+
+    def test_slots_are_not_limited_by_rules_when_quota_ignores_rules(self):
+        self.quota.ignore_rules = True
+        self.quota.save()
+        self.assertListEqual(
+            self.find_slots(timedelta(hours=1), limit=3),
+            [
+                (self.machine1, self.now, self.now + timedelta(hours=4)),
+                (self.machine2, self.now, self.now + Reservation.FUTURE_LIMIT),
+                (
+                    self.machine1,
+                    self.now + timedelta(hours=6),
+                    self.now + Reservation.FUTURE_LIMIT,
+                ),
+            ],
+        )
+
+    def test_no_slots_are_found_without_available_quotas(self):
+        self.quota.number_of_reservations = 0
+        self.quota.save()
+        self.assertListEqual(self.find_slots(timedelta(hours=1)), [])
+
+    def test_machines_out_of_order_or_on_maintenance_are_excluded(self):
+        self.machine2.status = Machine.Status.OUT_OF_ORDER
+        self.machine2.save()
+        slots = self.find_slots(timedelta(hours=1))
+        self.assertTrue(slots)
+        self.assertSetEqual({machine for machine, *_times in slots}, {self.machine1})
+
+    def test_number_of_queries_does_not_depend_on_number_of_machines(self):
+        def get_num_queries() -> int:
+            with CaptureQueriesContext(connection) as context:
+                self.find_slots(timedelta(hours=1), limit=None)
+            return len(context.captured_queries)
+
+        # Make sure that things like the reservation rule table are cached before
+        # counting
+        get_num_queries()
+        num_queries_with_two_machines = get_num_queries()
+        for i in range(3, 6):
+            machine = Machine.objects.create(
+                name=f"Machine {i}", machine_type=self.machine_type
+            )
+            Reservation.objects.bulk_create(
+                [
+                    Reservation(
+                        user=self.user,
+                        machine=machine,
+                        start_time=self.now + timedelta(days=day, hours=3),
+                        end_time=self.now + timedelta(days=day, hours=5),
+                    )
+                    for day in range(3)
+                ]
+            )
+        self.assertEqual(get_num_queries(), num_queries_with_two_machines)
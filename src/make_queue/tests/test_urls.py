@@ -268,6 +268,10 @@ class UrlTests(MakeQueueTestBase, TestCase):
                 ),
                 public=True,
             ),
+            Get(
+                reverse("api_free_slot_list", args=[self.printer_machine_type.pk]),
+                public=False,
+            ),
             # specific_machine_apipatterns
             *[
                 Get(reverse("api_machine_data", args=[machine.pk]), public=False)
@@ -289,6 +293,14 @@ class UrlTests(MakeQueueTestBase, TestCase):
                 )
                 for machine in self.machines
             ],
+            *[
+                Get(
+                    f"{reverse('api_reservation_calendar', args=[machine.pk])}"
+                    f"?{api_reservation_list_params}&since=0",
+                    public=True,
+                )
+                for machine in self.machines
+            ],
             # specific_reservation_rule_adminpatterns
             *[
                 Get(
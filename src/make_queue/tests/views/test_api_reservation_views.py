@@ -6,13 +6,18 @@ from unittest.mock import patch
 from django.contrib.auth.models import AnonymousUser
 from django.test import Client, TestCase
 from django.utils import timezone
-from django.utils.dateparse import parse_time
+from django.utils.dateparse import parse_datetime, parse_time
 from django_hosts import reverse
 
 from make_queue.api.views import APIReservationListView
 from make_queue.models.course import Printer3DCourse
 from make_queue.models.machine import Machine, MachineType
-from make_queue.models.reservation import Quota, Reservation, ReservationRule
+from make_queue.models.reservation import (
+    DeletedReservation,
+    Quota,
+    Reservation,
+    ReservationRule,
+)
 from make_queue.templatetags.reservation_extra import can_change_reservation
 from news.models import Event, TimePlace
 from users.models import User
@@ -299,6 +304,139 @@ class APIReservationListViewTests(TestCase):
         )
 
 
+class APIReservationCalendarViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.client.force_login(self.user)
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        self.machine_type = MachineType.objects.get(pk=2)
+        self.machine = Machine.objects.create(
+            name="Machine 1", machine_type=self.machine_type
+        )
+        Quota.objects.create(
+            user=self.user,
+            machine_type=self.machine_type,
+            number_of_reservations=10,
+            ignore_rules=True,
+        )
+        self.now = timezone.localtime()
+        self.reservation1 = self.create_reservation(hours_from_now=1)
+        self.reservation2 = self.create_reservation(hours_from_now=3)
+
+        self.url = reverse("api_reservation_calendar", args=[self.machine.pk])
+        self.query_params = {
+            "start_date": self.now,
+            "end_date": self.now + timedelta(days=1),
+        }
+
+    def create_reservation(self, *, hours_from_now: float):
+        return Reservation.objects.create(
+            machine=self.machine,
+            user=self.user,
+            start_time=self.now + timedelta(hours=hours_from_now),
+            end_time=self.now + timedelta(hours=hours_from_now + 1),
+        )
+
+    def get_json(self, **extra_query_params):
+        response = self.client.get(
+            self.url, {**self.query_params, **extra_query_params}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()
+
+    def test_responds_with_not_modified_until_reservations_are_changed(self):
+        response = self.client.get(self.url, self.query_params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        etag = response.headers["ETag"]
+
+        response = self.client.get(
+            self.url, self.query_params, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        self.reservation2.end_time += timedelta(minutes=30)
+        self.reservation2.save()
+        response = self.client.get(
+            self.url, self.query_params, headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_version_increases_when_reservations_are_created_changed_or_deleted(self):
+        version = self.get_json()["version"]
+        for change_reservations in (
+            lambda: self.create_reservation(hours_from_now=5),
+            self.reservation1.save,
+            self.reservation2.delete,
+        ):
+            change_reservations()
+            new_version = self.get_json()["version"]
+            self.assertGreater(new_version, version)
+            version = new_version
+
+    def test_since_param_only_returns_changes(self):
+        response_json = self.get_json()
+        self.assertListEqual(
+            [reservation["pk"] for reservation in response_json["reservations"]],
+            [self.reservation1.pk, self.reservation2.pk],
+        )
+        self.assertListEqual(response_json["deleted"], [])
+        version = response_json["version"]
+
+        response_json = self.get_json(since=version)
+        self.assertListEqual(response_json["reservations"], [])
+        self.assertListEqual(response_json["deleted"], [])
+
+        self.reservation1.end_time += timedelta(minutes=30)
+        self.reservation1.save()
+        reservation2_pk = self.reservation2.pk
+        self.reservation2.delete()
+        reservation3 = self.create_reservation(hours_from_now=5)
+        # Outside the requested period
+        reservation4 = self.create_reservation(hours_from_now=48)
+
+        response_json = self.get_json(since=version)
+        self.assertSetEqual(
+            {reservation["pk"] for reservation in response_json["reservations"]},
+            {self.reservation1.pk, reservation3.pk},
+        )
+        self.assertSetEqual(
+            set(response_json["deleted"]), {reservation2_pk, reservation4.pk}
+        )
+        self.assertGreater(response_json["version"], version)
+        self.assertEqual(response_json["since"], version)
+
+    def test_old_deleted_reservations_are_pruned(self):
+        version = self.get_json()["version"]
+        reservation1_pk = self.reservation1.pk
+        self.reservation1.delete()
+        self.assertEqual(self.machine.deleted_reservations.count(), 1)
+
+        with patch.object(DeletedReservation, "MAX_VERSION_AGE", 1):
+            self.assertSetEqual(
+                set(self.get_json(since=version)["deleted"]), {reservation1_pk}
+            )
+            # Deleting this reservation should prune the previous deleted reservation
+            self.reservation2.delete()
+            self.assertEqual(self.machine.deleted_reservations.count(), 1)
+            # All the reservations should be included when requesting the changes
+            # since a version whose deleted reservations might have been pruned
+            reservation3 = self.create_reservation(hours_from_now=5)
+            response_json = self.get_json(since=version)
+        self.assertIsNone(response_json["since"])
+        self.assertListEqual(
+            [reservation["pk"] for reservation in response_json["reservations"]],
+            [reservation3.pk],
+        )
+        self.assertListEqual(response_json["deleted"], [])
+
+    def test_deleting_machine_with_reservations_succeeds(self):
+        self.machine.delete()
+        self.assertFalse(Reservation.objects.exists())
+
+
 class TestAPIReservationMarkFinishedView(TestCase):
     def setUp(self):
         self.user = User.objects.create_user("test")
@@ -557,3 +695,123 @@ class TestAPIReservationDeleteView(TestCase):
         )
         self.assertEqual(response.status_code, HTTPStatus.OK)
         self.assertFalse(Reservation.objects.filter(pk=self.reservation.pk).exists())
+
+
+class APIFreeSlotListViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("user")
+        self.client.force_login(self.user)
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        self.machine_type = MachineType.objects.get(pk=2)
+        self.machine = Machine.objects.create(
+            name="Machine 1", machine_type=self.machine_type
+        )
+        Quota.objects.create(
+            user=self.user,
+            machine_type=self.machine_type,
+            number_of_reservations=1,
+            ignore_rules=True,
+        )
+        self.url = reverse("api_free_slot_list", args=[self.machine_type.pk])
+
+    def test_responds_with_expected_json(self):
+        response = self.client.get(self.url, {"hours": 2, "limit": 1})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        free_slots = response.json()["free_slots"]
+        self.assertEqual(len(free_slots), 1)
+        self.assertDictEqual(
+            free_slots[0]["machine"], {"pk": self.machine.pk, "name": "Machine 1"}
+        )
+        # The quota ignores the rules, so the whole allowed period should be free
+        start_time = parse_datetime(free_slots[0]["start_time"])
+        end_time = parse_datetime(free_slots[0]["end_time"])
+        self.assertEqual(end_time - start_time, Reservation.FUTURE_LIMIT)
+
+    def test_responds_with_expected_query_parameter_errors(self):
+        response = self.client.get(self.url, {"minutes": 60, "limit": 0})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertSetEqual(set(response.json()["field_errors"]), {"minutes", "limit"})
+
+
+class APIBulkReservationCreateViewTests(TestCase):
+    def setUp(self):
+        self.start = parse_datetime_localized("2030-01-07 10:00")
+        self.user = User.objects.create_user("user")
+        self.user.add_perms("make_queue.can_create_event_reservation")
+        self.client.force_login(self.user)
+        # See the `0015_machinetype.py` migration for which MachineTypes are created by
+        # default
+        machine_type = MachineType.objects.get(pk=2)
+        self.machine1 = Machine.objects.create(
+            name="Machine 1", machine_type=machine_type
+        )
+        self.machine2 = Machine.objects.create(
+            name="Machine 2", machine_type=machine_type
+        )
+        self.url = reverse("api_reservation_bulk_create")
+
+    def test_creates_recurring_special_reservations(self):
+        response = self.client.post(
+            self.url,
+            {
+                "machines": [self.machine1.pk, self.machine2.pk],
+                "start_time": self.start,
+                "end_time": self.start + timedelta(hours=2),
+                "interval": "day",
+                "count": 3,
+                "special_text": "Course",
+                "skip_conflicts": True,
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        items = response.json()["items"]
+        self.assertEqual(len(items), 6)
+        self.assertTrue(all(item["status"] == "created" for item in items))
+        self.assertSetEqual(
+            {item["reservation"] for item in items},
+            set(Reservation.objects.values_list("pk", flat=True)),
+        )
+        last_reservation = Reservation.objects.latest("start_time")
+        self.assertEqual(last_reservation.start_time, self.start + timedelta(days=2))
+        self.assertEqual(last_reservation.special_text, "Course")
+
+    def test_creates_event_reservations(self):
+        event = Event.objects.create(title="Course")
+        time_place = TimePlace.objects.create(
+            event=event, start_time=self.start, end_time=self.start + timedelta(hours=2)
+        )
+        response = self.client.post(
+            self.url, {"machines": [self.machine1.pk], "time_places": [time_place.pk]}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        [item] = response.json()["items"]
+        self.assertEqual(item["event"], time_place.pk)
+        self.assertEqual(Reservation.objects.get().event, time_place)
+
+    def test_responds_with_expected_form_errors(self):
+        response = self.client.post(
+            self.url, {"machines": [self.machine1.pk], "count": 1000}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertSetEqual(
+            set(response.json()), {"count", "start_time", "end_time", "special_text"}
+        )
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_get_request_and_users_without_permission_are_rejected(self):
+        self.assertEqual(
+            self.client.get(self.url).status_code, HTTPStatus.METHOD_NOT_ALLOWED
+        )
+        self.client.force_login(User.objects.create_user("user2"))
+        response = self.client.post(
+            self.url,
+            {
+                "machines": [self.machine1.pk],
+                "start_time": self.start,
+                "end_time": self.start + timedelta(hours=2),
+                "special_text": "Course",
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        self.assertFalse(Reservation.objects.exists())
@@ -1,8 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from http import HTTPStatus
 
+from django.db import connection
 from django.templatetags.static import static
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 from django_hosts import reverse
@@ -10,6 +12,7 @@ from django_hosts import reverse
 from make_queue.forms.machine import AddMachineForm, ChangeMachineForm
 from make_queue.models.course import CoursePermission, Printer3DCourse
 from make_queue.models.machine import Machine, MachineType
+from make_queue.models.reservation import Reservation
 from users.models import User
 
 
@@ -296,6 +299,38 @@ class TestMachineListView(TestCase):
 
         assert_response_contains_num_of_each_img_path(1)
 
+    def test_number_of_queries_does_not_depend_on_number_of_machines(self):
+        user = User.objects.create_user("user1")
+        now = timezone.localtime()
+
+        def create_machine_with_reservations(name_prefix: str):
+            machine = self.create_machine(
+                name_prefix=name_prefix, machine_type=self.printer_machine_type
+            )
+            for start_time in (now, now + timedelta(hours=2)):
+                reservation = Reservation(
+                    user=user,
+                    machine=machine,
+                    start_time=start_time,
+                    end_time=start_time + timedelta(hours=1),
+                )
+                # Bypass the validation in `Reservation.save()`
+                super(Reservation, reservation).save()
+
+        def get_num_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.get_machine_list_response()
+            return len(context.captured_queries)
+
+        create_machine_with_reservations("first")
+        # Make sure that things like constance settings are cached before counting
+        self.get_machine_list_response()
+        num_queries_for_one_machine = get_num_queries()
+
+        for i in range(5):
+            create_machine_with_reservations(f"other {i}")
+        self.assertEqual(get_num_queries(), num_queries_for_one_machine)
+
     @staticmethod
     def create_machine(
         name_prefix: str, machine_type: MachineType, **kwargs
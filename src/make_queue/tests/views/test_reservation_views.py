@@ -91,6 +91,10 @@ class ReservationCreateOrUpdateViewTestBase(TestCase, ABC):
 
 class TestReservationCreateOrUpdateView(ReservationCreateOrUpdateViewTestBase):
     def test_get_error_message_non_event(self):
+        # The error message is based on which validation check failed, and as there are
+        # no rules for the machine type, the rule check only fails if the user's quota
+        # doesn't ignore the rules (which the one created in `setUp()` does)
+        Quota.objects.filter(user=self.user).update(ignore_rules=False)
         form = self.create_form(
             start_time_delta=timedelta(hours=1), end_time_delta=timedelta(hours=2)
         )
@@ -546,6 +550,37 @@ class TestReservationUpdateView(ReservationCreateOrUpdateViewTestBase):
             timezone.localtime() + timedelta(hours=3),
         )
 
+    @patch("django.utils.timezone.now")
+    def test_form_valid_with_full_quota_and_edit_outside_rules_shows_rules_error(
+        self, now_mock
+    ):
+        now_mock.return_value = parse_datetime_localized("2018-08-12 12:00")
+        Quota.objects.filter(user=self.user).update(number_of_reservations=1)
+        reservation = self.create_reservation(
+            self.create_form(
+                start_time_delta=timedelta(hours=1), end_time_delta=timedelta(hours=2)
+            )
+        )
+        # The reservation's quota is now full, and - as there are no rules for the
+        # machine type - every period is outside the rules
+        Quota.objects.filter(user=self.user).update(ignore_rules=False)
+
+        form = self.create_form(
+            start_time_delta=timedelta(hours=1), end_time_delta=timedelta(hours=3)
+        )
+        self.assertTrue(form.is_valid())
+        view = self.get_view(pk=reservation.pk)
+        response = view.form_valid(form)
+        self.assertContains(
+            response,
+            "Det er ikke mulig å reservere maskinen på dette tidspunktet. Sjekk reglene"
+            " for hvilke perioder det er mulig å reservere maskinen i",
+        )
+        self.assertEqual(
+            Reservation.objects.get().end_time,
+            timezone.localtime() + timedelta(hours=2),
+        )
+
     @patch("django.utils.timezone.now")
     def test_form_valid_changed_machine(self, now_mock):
         now_mock.return_value = parse_datetime_localized("2018-08-12 12:00")
@@ -2,6 +2,7 @@ from decorator_include import decorator_include
 from django.contrib.auth.decorators import login_required
 from django.urls import include, path
 
+from make_queue import consumers
 from make_queue.api import views as api_views
 from make_queue.views import (
     course as course_views,
@@ -68,6 +69,11 @@ specific_machinetype_apipatterns = [
         api_views.APIReservationRuleListView.as_view(),
         name="api_reservation_rule_list",
     ),
+    path(
+        "free-slots/",
+        api_views.APIFreeSlotListView.as_view(),
+        name="api_free_slot_list",
+    ),
 ]
 
 specific_machine_apipatterns = [
@@ -77,6 +83,11 @@ specific_machine_apipatterns = [
         api_views.APIReservationListView.as_view(),
         name="api_reservation_list",
     ),
+    path(
+        "reservations/calendar/",
+        api_views.APIReservationCalendarView.as_view(),
+        name="api_reservation_calendar",
+    ),
 ]
 
 specific_reservation_apipatterns = [
@@ -95,12 +106,32 @@ specific_reservation_apipatterns = [
 apipatterns = [
     path("machinetypes/<int:pk>/", include(specific_machinetype_apipatterns)),
     path("machines/<int:pk>/", include(specific_machine_apipatterns)),
+    path(
+        "reservations/bulk/",
+        api_views.APIBulkReservationCreateView.as_view(),
+        name="api_reservation_bulk_create",
+    ),
     path(
         "reservations/<int:pk>/",
         decorator_include(login_required, specific_reservation_apipatterns),
     ),
 ]
 
+# --- WebSocket URL patterns (imported in `web/asgi.py`) ---
+
+websocket_urlpatterns = [
+    path(
+        "ws/reservation/machines/",
+        consumers.MachineUpdatesConsumer.as_asgi(),
+        name="ws_machine_updates",
+    ),
+    path(
+        "ws/reservation/machines/<int:pk>/",
+        consumers.MachineUpdatesConsumer.as_asgi(),
+        name="ws_machine_updates",
+    ),
+]
+
 # --- Admin URL patterns (imported in `web/urls.py`) ---
 
 specific_reservation_rule_adminpatterns = [
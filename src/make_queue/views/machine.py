@@ -19,8 +19,11 @@ from make_queue.forms.machine import (
 )
 from make_queue.forms.reservation import ReservationListQueryForm
 from make_queue.models.machine import Machine, MachineType, MachineUsageRule
-from make_queue.models.reservation import Quota
-from make_queue.templatetags.reservation_extra import reservation_denied_message
+from make_queue.models.reservation import QuotaEvaluator
+from make_queue.templatetags.reservation_extra import (
+    MACHINE_STATUS_CARD_COLORS,
+    reservation_denied_message,
+)
 from util.locale_utils import get_current_year_and_week, year_and_week_to_monday
 from util.view_utils import (
     CustomFieldsetFormMixin,
@@ -124,14 +127,31 @@ class MachineListView(ListView):
     }
 
     def get_queryset(self):
-        machine_queryset = Machine.objects.visible_to(
-            self.request.user
-        ).default_order_by()
+        machine_queryset = (
+            Machine.objects.visible_to(self.request.user)
+            .default_order_by()
+            .annotate_status()
+        )
         return MachineType.objects.default_order_by().prefetch_machines(
             machine_queryset=machine_queryset,
             machines_attr_name="shown_machines",
         )
 
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(
+            **{
+                # Used by `machine_list.js` when the machines' statuses are updated
+                "machine_status_displays": {
+                    status: {
+                        "text": str(label),
+                        "color": MACHINE_STATUS_CARD_COLORS[status],
+                    }
+                    for status, label in Machine.Status.choices
+                },
+                **kwargs,
+            }
+        )
+
 
 class MachineDetailView(QueryParameterFormMixin, DetailView):
     """Main view for showing the reservation calendar for a machine."""
@@ -145,7 +165,7 @@ class MachineDetailView(QueryParameterFormMixin, DetailView):
     }
 
     def get_queryset(self):
-        return Machine.objects.visible_to(self.request.user)
+        return Machine.objects.visible_to(self.request.user).annotate_status()
 
     def get_context_data(self, **kwargs):
         """
@@ -181,12 +201,9 @@ class MachineDetailView(QueryParameterFormMixin, DetailView):
         }
 
         if self.request.user.is_authenticated:
-            context["can_ignore_rules"] = any(
-                quota.can_create_more_reservations(self.request.user)
-                for quota in Quota.get_user_quotas(
-                    self.request.user, machine.machine_type
-                ).filter(ignore_rules=True)
-            )
+            context["can_ignore_rules"] = QuotaEvaluator.for_request(
+                self.request, self.request.user, machine.machine_type
+            ).can_ignore_rules()
 
         return context
 
@@ -1,5 +1,5 @@
 from abc import ABC
-from math import ceil
+from datetime import timedelta
 
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.db.models import Q
@@ -16,15 +16,19 @@ from make_queue.forms.reservation import (
     ReservationForm,
     ReservationListQueryForm,
 )
+from make_queue.free_slots import FreeSlotFinder
 from make_queue.models.machine import Machine, MachineType
-from make_queue.models.reservation import Reservation, ReservationRule
+from make_queue.models.reservation import (
+    QuotaEvaluator,
+    Reservation,
+    ReservationValidationResult,
+)
 from make_queue.templatetags.reservation_extra import (
     calendar_url_reservation,
     can_change_reservation,
 )
 from make_queue.views.machine import MachineRelatedViewMixin
 from news.models import TimePlace
-from util.locale_utils import timedelta_to_hours
 from util.logging_utils import log_request_exception
 from util.view_utils import QueryParameterFormMixin
 
@@ -40,17 +44,26 @@ class ReservationCreateOrUpdateView(TemplateView, ABC):
     new_reservation: bool
     reservation: Reservation = None
 
-    def get_error_message(self, form, reservation):
+    def get_error_message(
+        self,
+        form,
+        reservation: Reservation,
+        validation_result: ReservationValidationResult = None,
+    ):
         """
         Generates the correct error message for the given form.
 
         :param reservation: The reservation to generate an error message for
         :param form: The form to generate an error message for
+        :param validation_result: The result of validating ``reservation``; if not
+            provided, the reservation is validated
         :return: The error message
         """
-        if not reservation.is_within_allowed_period() and not (
-            reservation.special or reservation.event
-        ):
+        if validation_result is None:
+            validation_result = reservation.validate()
+        code = validation_result.code
+        Code = ReservationValidationResult.Code
+        if code == Code.TOO_FAR_IN_THE_FUTURE:
             num_days = reservation.FUTURE_LIMIT.days
             return ngettext(
                 "Reservations can only be made {num_days} day ahead of time",
@@ -62,28 +75,30 @@ class ReservationCreateOrUpdateView(TemplateView, ABC):
             and form.cleaned_data["event"]
         ):
             return _("The time slot or event is no longer available")
-        if reservation.check_machine_out_of_order():
-            return _("The machine is out of order")
-        if reservation.check_machine_maintenance():
-            return _("The machine is under maintenance")
-        if reservation.start_time == reservation.end_time:
-            return _("The reservation cannot start and end at the same time")
-        if not ReservationRule.covered_rules(
-            reservation.start_time,
-            reservation.end_time,
-            reservation.machine.machine_type,
-        ):
-            return _(
-                "It is not possible to reserve the machine during these hours."
-                " Check the rules for when the machine is reservable"
-            )
-        if not reservation.quota_can_create_reservation():
-            return _("The reservation exceeds your quota")
-        if reservation.check_start_time_after_end_time():
+        if code == Code.INVALID_PERIOD:
+            if reservation.start_time == reservation.end_time:
+                return _("The reservation cannot start and end at the same time")
             return _("The start time can't be after the end time")
-        if reservation.starts_before_now():
-            return _("The reservation can't start in the past")
-        return _("The time slot is not available")
+        return self.error_code_to_message.get(code, _("The time slot is not available"))
+
+    error_code_to_message = {
+        ReservationValidationResult.Code.MACHINE_OUT_OF_ORDER: _(
+            "The machine is out of order"
+        ),
+        ReservationValidationResult.Code.MACHINE_MAINTENANCE: _(
+            "The machine is under maintenance"
+        ),
+        ReservationValidationResult.Code.OUTSIDE_RULES: _(
+            "It is not possible to reserve the machine during these hours."
+            " Check the rules for when the machine is reservable"
+        ),
+        ReservationValidationResult.Code.QUOTA_EXCEEDED: _(
+            "The reservation exceeds your quota"
+        ),
+        ReservationValidationResult.Code.STARTS_IN_THE_PAST: _(
+            "The reservation can't start in the past"
+        ),
+    }
 
     def validate_and_save(self, reservation, form):
         """
@@ -94,11 +109,14 @@ class ReservationCreateOrUpdateView(TemplateView, ABC):
         :return: Either a redirect to the new/changed reservation in the calendar or
             an error message indicating why the reservation cannot be validated
         """
-        if not reservation.validate():
+        validation_result = reservation.validate()
+        if not validation_result:
             # Hack to "simulate" `ReservationUpdateView`
             self.reservation = reservation
             context_data = self.get_context_data()
-            context_data["error"] = self.get_error_message(form, reservation)
+            context_data["error"] = self.get_error_message(
+                form, reservation, validation_result
+            )
             return render(self.request, self.template_name, context_data)
 
         reservation.save()
@@ -358,64 +376,6 @@ class ReservationFindFreeSlotsView(LoginRequiredMixin, FormView):
     def get_initial(self):
         return {"machine_type": MachineType.objects.first()}
 
-    @staticmethod
-    def format_period(machine, start_time, end_time):
-        """
-        Formats a time period for the context.
-        """
-        return {
-            "machine": machine,
-            "start_time": start_time,
-            "end_time": end_time,
-            "duration": ceil(timedelta_to_hours(end_time - start_time)),
-        }
-
-    def get_periods(self, machine: Machine, required_time):
-        """
-        Finds all future periods for the given machine with a minimum length.
-
-        :param machine: The machine to get periods for
-        :param required_time: The minimum required time for the period
-        :return: A list of periods
-        """
-        periods = []
-        reservations = list(
-            machine.reservations.filter(end_time__gte=timezone.now()).order_by(
-                "start_time"
-            )
-        )
-
-        # Find all periods between reservations
-        for period_start, period_end in zip(
-            reservations, reservations[1:], strict=False
-        ):
-            duration = timedelta_to_hours(period_end.start_time - period_start.end_time)
-            if duration >= required_time:
-                periods.append(
-                    self.format_period(
-                        machine, period_start.end_time, period_end.start_time
-                    )
-                )
-
-        # Add remaining time after last reservation
-        if reservations:
-            periods.append(
-                self.format_period(
-                    machine,
-                    reservations[-1].end_time,
-                    timezone.now() + Reservation.FUTURE_LIMIT,
-                )
-            )
-        # If the machine is not reserved anytime in the future, we include the
-        # whole allowed period
-        else:
-            periods.append(
-                self.format_period(
-                    machine, timezone.now(), timezone.now() + Reservation.FUTURE_LIMIT
-                )
-            )
-        return periods
-
     def form_valid(self, form):
         """
         Renders the page with free slots in respect to the valid form.
@@ -423,24 +383,20 @@ class ReservationFindFreeSlotsView(LoginRequiredMixin, FormView):
         :param form: A valid ``ReservationFindFreeSlotsForm`` form
         :return: A HTTP response rendering the page with the found free slots
         """
-        # Time should be expressed in hours
-        required_time = form.cleaned_data["hours"] + form.cleaned_data["minutes"] / 60
-
-        periods = []
-        for machine in form.cleaned_data["machine_type"].machines.all():
-            if machine.get_status() in (
-                Machine.Status.OUT_OF_ORDER,
-                Machine.Status.MAINTENANCE,
-            ):
-                continue
-            periods.extend(self.get_periods(machine, required_time))
-
-        # Periods in the near future is more interesting than in the distant
-        # future
-        periods.sort(key=lambda period: period["start_time"])
+        required_duration = timedelta(
+            hours=form.cleaned_data["hours"], minutes=form.cleaned_data["minutes"]
+        )
+        machine_type = form.cleaned_data["machine_type"]
+        free_slots = FreeSlotFinder(
+            machine_type,
+            self.request.user,
+            quota_evaluator=QuotaEvaluator.for_request(
+                self.request, self.request.user, machine_type
+            ),
+        ).find_slots(required_duration)
 
         context = {
             **self.get_context_data(),
-            "free_slots": periods,
+            "free_slots": free_slots,
         }
         return self.render_to_response(context)
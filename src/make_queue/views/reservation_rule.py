@@ -39,7 +39,7 @@ class ReservationRuleListView(MachineTypeRelatedViewMixin, ListView):
         )
         user: User = self.request.user
         if user.is_authenticated:
-            context_data["quotas"] = Quota.get_user_quotas(user, self.machine_type)
+            context_data["quotas"] = Quota.objects.for_user(user, self.machine_type)
             if user.has_any_permissions_for(ReservationRule):
                 context_data["rule_set_has_gaps"] = ReservationRule.rule_set_has_gaps(
                     self.machine_type
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.db.models import Count, Max, Prefetch, Q, QuerySet
+from django.db.models import Count, Max, Prefetch, QuerySet
 from django.db.models.functions import Concat
 from django.template.loader import get_template
 from django.utils import timezone
@@ -9,7 +9,14 @@ from django.utils.translation import gettext_lazy as _
 from simple_history.admin import SimpleHistoryAdmin
 
 from news.forms import ArticleForm, EventForm, NewsBaseForm
-from news.models import Article, Event, EventTicket, NewsBase, TimePlace
+from news.models import (
+    Article,
+    Event,
+    EventTicket,
+    EventWaitlistEntry,
+    NewsBase,
+    TimePlace,
+)
 from util import html_utils
 from util.admin_utils import (
     DefaultAdminWidgetsMixin,
@@ -106,15 +113,11 @@ class TimePlaceInline(DefaultAdminWidgetsMixin, admin.TabularInline):
 
     @admin.display(description=_("number of reserved tickets"))
     def get_num_reserved_tickets(self, time_place: TimePlace):
-        return time_place.ticket_count
+        return time_place.active_ticket_count
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        qs = qs.select_related("event")
-        return qs.annotate(
-            # Facilitates querying `ticket_count`
-            ticket_count=Count("tickets", filter=Q(tickets__active=True)),
-        )
+        return qs.select_related("event")
 
 
 class EventAdmin(NewsBaseAdmin):
@@ -198,11 +201,11 @@ class EventAdmin(NewsBaseAdmin):
     @admin.display(description=_("number of reserved tickets"))
     def get_number_of_tickets(self, event: Event):
         if event.standalone:
-            return f"{event.ticket_count}/{event.number_of_tickets}"
+            return f"{event.active_ticket_count}/{event.number_of_tickets}"
         else:
             time_place_ticket_strings = [
                 mark_safe(
-                    f"{time_place.ticket_count}/{time_place.number_of_tickets}&emsp;"
+                    f"{time_place.active_ticket_count}/{time_place.number_of_tickets}&emsp;"
                     + link_to_admin_change_form(
                         time_place,
                         text=f"({short_datetime_format(time_place.start_time)})",
@@ -233,23 +236,16 @@ class EventAdmin(NewsBaseAdmin):
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        # Passing `distinct=True` to make multiple aggregations work
-        # (see https://docs.djangoproject.com/en/stable/topics/db/aggregation/#combining-multiple-aggregations)
         qs = qs.annotate(
-            # Facilitates querying `num_time_places`;
+            # Facilitates querying `num_time_places`
+            # (passing `distinct=True`, in case the queryset is combined with other
+            # aggregations)
             num_time_places=Count("timeplaces", distinct=True),
-            # Facilitates querying `ticket_count`
-            ticket_count=Count(
-                "tickets", filter=Q(tickets__active=True), distinct=True
-            ),
         )
         qs = qs.prefetch_related(
             Prefetch(
                 "timeplaces",
-                # Facilitates querying `ticket_count` for each `existing_time_places`
-                queryset=TimePlace.objects.annotate(
-                    ticket_count=Count("tickets", filter=Q(tickets__active=True)),
-                ).order_by("-start_time"),
+                queryset=TimePlace.objects.order_by("-start_time"),
                 to_attr="existing_time_places",
             ),
             Prefetch(
@@ -342,7 +338,7 @@ class TimePlaceAdmin(DefaultAdminWidgetsMixin, admin.ModelAdmin):
         return anchor_tag(time_place.place_url, time_place.place)
 
     @admin.display(
-        ordering="ticket_count",
+        ordering="active_ticket_count",
         description=_("number of reserved tickets"),
     )
     def get_num_reserved_tickets(self, time_place: TimePlace):
@@ -350,7 +346,7 @@ class TimePlaceAdmin(DefaultAdminWidgetsMixin, admin.ModelAdmin):
             standalone_notice = _("event is standalone")
             return mark_safe(f"- <i>({standalone_notice})</i>")
         else:
-            return time_place.ticket_count
+            return time_place.active_ticket_count
 
     @admin.display(description=_("is published"))
     def is_published(self, time_place: TimePlace):
@@ -377,13 +373,6 @@ class TimePlaceAdmin(DefaultAdminWidgetsMixin, admin.ModelAdmin):
     def get_search_results(self, request, queryset, search_term):
         return search_escaped_and_unescaped(super(), request, queryset, search_term)
 
-    def get_queryset(self, request):
-        qs = super().get_queryset(request)
-        return qs.annotate(
-            # Facilitates querying `ticket_count`
-            ticket_count=Count("tickets", filter=Q(tickets__active=True)),
-        )
-
 
 class EventTicketAdmin(UserSearchFieldsMixin, admin.ModelAdmin):
     list_display = (
@@ -454,7 +443,36 @@ class EventTicketAdmin(UserSearchFieldsMixin, admin.ModelAdmin):
         return search_escaped_and_unescaped(super(), request, queryset, search_term)
 
 
+class EventWaitlistEntryAdmin(UserSearchFieldsMixin, admin.ModelAdmin):
+    list_display = ("user", "timeplace", "event", "language", "creation_date")
+    list_filter = (
+        "language",
+        ("timeplace", admin.EmptyFieldListFilter),
+        ("event", admin.EmptyFieldListFilter),
+    )
+    search_fields = (
+        "comment",
+        "timeplace__event__title",
+        "event__title",
+        # The user search fields are appended in `UserSearchFieldsMixin`
+    )
+    user_lookup, name_for_full_name_lookup = "user__", "user_full_name"
+    ordering = ("-creation_date",)
+
+    readonly_fields = ("creation_date",)
+    autocomplete_fields = ("user",)
+    raw_id_fields = ("timeplace", "event")
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        return qs.select_related("user").prefetch_related("timeplace__event", "event")
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_escaped_and_unescaped(super(), request, queryset, search_term)
+
+
 admin.site.register(Article, ArticleAdmin)
 admin.site.register(Event, EventAdmin)
 admin.site.register(TimePlace, TimePlaceAdmin)
 admin.site.register(EventTicket, EventTicketAdmin)
+admin.site.register(EventWaitlistEntry, EventWaitlistEntryAdmin)
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class NewsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "news"
+
+    def ready(self):
+        # Importing models (which is done in the `signals` module) should not be done in
+        # the global scope, as it would have caused an `AppRegistryNotReady` error
+        from news import signals
+
+        # Register / connect to the signals here when the app starts
+        signals.connect()
@@ -0,0 +1,76 @@
+import uuid
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+
+from mail import email
+from mail.outbox import enqueue_email
+from news.models import EventTicket
+
+# Placeholders for the ticket-specific values in the ticket email skeletons.
+# (A UUID is used for the ticket's pk, as it's also part of the URLs in the email.)
+TICKET_UUID_PLACEHOLDER = uuid.UUID(int=0)
+TICKET_COMMENT_PLACEHOLDER = "[[ticket.comment]]"
+
+
+def render_ticket_email(request, ticket: EventTicket) -> dict[str, str]:
+    """
+    Renders the ticket email for ``ticket``. The parts of the email that are shared
+    by all the tickets for the same event and with the same preferred language are
+    only rendered once (per language and host); see ``mail.email.render_skeleton()``.
+
+    :return: A dictionary with the ``subject``, ``text`` and ``html_render`` of the
+        email
+    """
+    event = ticket.registered_event
+    placeholder_ticket = EventTicket(
+        uuid=TICKET_UUID_PLACEHOLDER,
+        timeplace=ticket.timeplace,
+        event=ticket.event,
+        language=ticket.language,
+        comment=TICKET_COMMENT_PLACEHOLDER,
+    )
+    context = {"ticket": placeholder_ticket}
+    cache_key_parts = ("news.ticket", event.pk, event.last_modified, ticket.language)
+    placeholder_values = {
+        str(TICKET_UUID_PLACEHOLDER): str(ticket.uuid),
+        TICKET_COMMENT_PLACEHOLDER: ticket.comment,
+    }
+    return {
+        "html_render": email.fill_skeleton(
+            email.render_skeleton(
+                request,
+                context,
+                template_name="email/ticket.html",
+                cache_key_parts=cache_key_parts,
+            ),
+            placeholder_values,
+        ),
+        "text": email.fill_skeleton(
+            email.render_skeleton(
+                request,
+                context,
+                template_name="email/ticket.txt",
+                cache_key_parts=cache_key_parts,
+                strip=True,
+            ),
+            placeholder_values,
+        ),
+        # Pass a pure string, instead of the proxy object from `gettext_lazy`
+        "subject": str(_("Your ticket for “{title}”!").format(title=event.title)),
+    }
+
+
+def send_ticket_email(request, ticket: EventTicket):
+    email_message_dict = {
+        **render_ticket_email(request, ticket),
+        "from": settings.EVENT_TICKET_EMAIL,
+        "to": ticket.email,
+    }
+    # (The ticket can be reactivated, in which case a new email should be sent)
+    enqueue_email(
+        email_message_dict,
+        idempotency_key=(
+            f"news.ticket.{ticket.pk}.{ticket.active_last_modified.isoformat()}"
+        ),
+    )
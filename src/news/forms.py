@@ -108,6 +108,23 @@ class EventParticipantsSearchQueryForm(forms.Form):
         label=_("Search for users"),
         help_text=_("You can search for users' name, username and email."),
     )
+    page = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+
+
+class EventParticipantsEmailForm(forms.Form):
+    subject = forms.CharField(max_length=200, label=_("subject"))
+    message = forms.CharField(
+        widget=forms.Textarea(attrs={"rows": "10"}),
+        label=_("message"),
+        help_text=_(
+            "The message is sent to everyone with an active ticket, along with a link"
+            " to the event."
+        ),
+    )
+
+
+class EventFeedQueryForm(forms.Form):
+    past_days = forms.IntegerField(required=False, min_value=0)
 
 
 class EventTicketForm(forms.ModelForm):
@@ -1,27 +1,159 @@
+import hashlib
+from datetime import timedelta
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.translation import get_language
 from django_ical.views import ICalFeed
 
+from news.forms import EventFeedQueryForm
 from news.models import TimePlace
 
 
 class EventFeed(ICalFeed):
-    """An iCal feed of all the events available to the user."""
+    """
+    An iCal feed of all the events available to the user.
+
+    Only published occurrences are included, unless the user can change events.
+
+    As calendar clients tend to poll the feed regularly, each generated feed is
+    cached, and the responses contain an ``ETag`` header, which is derived from the
+    ``last_modified`` fields of the included time places and their events (and the
+    number of time places, to catch deletions); requests with a matching
+    ``If-None-Match`` header are responded to with ``304 Not Modified``.
+    (``Last-Modified`` is not sent, as the latest ``last_modified`` of the included
+    time places doesn't change when one of them is deleted.)
+    A single aggregation query is made to find out whether the cached feed is
+    outdated.
+
+    Supports the ``past_days`` query parameter, for only including the occurrences
+    that ended at most that many days ago - e.g. ``0`` for only including upcoming
+    occurrences.
+    """
 
     file_name = "events.ics"
     timezone = settings.TIME_ZONE
 
+    # The cached feeds are replaced when they're outdated, so this is mainly to
+    # prevent unused feeds from filling up the cache
+    CACHE_TIMEOUT = timedelta(days=1).total_seconds()
+
+    def __call__(self, request, *args, **kwargs):
+        try:
+            attrs = self.get_object(request, *args, **kwargs)
+        except ValidationError as e:
+            return HttpResponseBadRequest("\n".join(e.messages))
+
+        version_hash = self.get_version(attrs)
+        etag = quote_etag(version_hash)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = self.get_cached_response(
+                request, f"news.ical.{version_hash}", *args, **kwargs
+            )
+        response.headers["ETag"] = etag
+        # Make clients revalidate the feed every time it's requested, and prevent
+        # shared caches from serving the private or unpublished events to other users
+        if attrs["user_can_view_private"] or attrs["user_can_view_unpublished"]:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_version(self, attrs) -> str:
+        """
+        :return: A hash identifying the contents of the feed
+        """
+        stats = self.items(attrs).aggregate(
+            count=Count("pk"),
+            time_places_last_modified=Max("last_modified"),
+            events_last_modified=Max("event__last_modified"),
+        )
+        last_modified_datetimes = [
+            dt
+            for dt in (
+                stats["time_places_last_modified"],
+                stats["events_last_modified"],
+            )
+            if dt is not None
+        ]
+        last_modified = (
+            max(last_modified_datetimes) if last_modified_datetimes else None
+        )
+        # The visibility, filters and language must be included, as they change the
+        # feed's contents
+        version = repr(
+            (
+                type(self).__name__,
+                get_language(),
+                attrs["user_can_view_private"],
+                attrs["user_can_view_unpublished"],
+                sorted(attrs["query_kwargs"].items()),
+                attrs["min_end_date"],
+                stats["count"],
+                last_modified,
+            )
+        )
+        return hashlib.md5(version.encode()).hexdigest()
+
+    def get_cached_response(self, request, cache_key: str, *args, **kwargs):
+        cached_response_dict = cache.get(cache_key)
+        if cached_response_dict is not None:
+            response = HttpResponse(
+                cached_response_dict["content"],
+                content_type=cached_response_dict["content_type"],
+            )
+            if content_disposition := cached_response_dict["content_disposition"]:
+                response.headers["Content-Disposition"] = content_disposition
+            return response
+
+        response = super().__call__(request, *args, **kwargs)
+        cache.set(
+            cache_key,
+            {
+                "content": response.content,
+                "content_type": response.headers["Content-Type"],
+                "content_disposition": response.headers.get("Content-Disposition"),
+            },
+            self.CACHE_TIMEOUT,
+        )
+        return response
+
     def get_object(self, request, *args, **kwargs):
+        query_form = EventFeedQueryForm(request.GET)
+        if not query_form.is_valid():
+            raise ValidationError(query_form.errors)
+        past_days = query_form.cleaned_data["past_days"]
         return {
             "user_can_view_private": request.user.has_perm("news.can_view_private"),
+            "user_can_view_unpublished": request.user.has_perm("news.change_event"),
             "query_kwargs": {},
+            "min_end_date": (
+                None
+                if past_days is None
+                else timezone.localdate() - timedelta(days=past_days)
+            ),
         }
 
     def items(self, attrs):
-        items = TimePlace.objects.all()
+        if attrs["user_can_view_unpublished"]:
+            items = TimePlace.objects.all()
+        else:
+            items = TimePlace.objects.published()
+        items = items.select_related("event")
 
         if attrs["query_kwargs"]:
             items = items.filter(**attrs["query_kwargs"])
 
+        if attrs["min_end_date"] is not None:
+            items = items.filter(end_time__date__gte=attrs["min_end_date"])
+
         if not attrs["user_can_view_private"]:
             items = items.filter(event__private=False)
 
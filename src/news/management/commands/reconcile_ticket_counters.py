@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from news.models import Event, TimePlace
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts the active and inactive tickets of all events and time places whose"
+        " ticket counters differ from the actual number of tickets - e.g. after"
+        " tickets have been created or changed without using `EventTicket.save()`."
+    )
+
+    def handle(self, *args, **options):
+        for model in (Event, TimePlace):
+            num_corrected = model.objects.reconcile_ticket_counters()
+            self.stdout.write(
+                f"Corrected the ticket counters of {num_corrected}"
+                f" {model._meta.verbose_name_plural}."
+            )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from news.reminders import send_event_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends reminder emails to the ticket holders of the event occurrences that"
+        " start soon (see `settings.EVENT_REMINDER_LEAD_TIMES`). Should be run"
+        " periodically - e.g. every 15 minutes; reminders that have already been sent"
+        " are not sent again."
+    )
+
+    def handle(self, *args, **options):
+        num_enqueued = send_event_reminders()
+        self.stdout.write(f"Enqueued {num_enqueued} reminders.")
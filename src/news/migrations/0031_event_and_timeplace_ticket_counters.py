@@ -0,0 +1,69 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tickets_subquery(EventTicket, ticket_fk_name: str, *, active: bool):
+    return Coalesce(
+        Subquery(
+            EventTicket.objects.filter(
+                **{ticket_fk_name: OuterRef("pk")}, active=active
+            )
+            .order_by()
+            .values(ticket_fk_name)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def count_tickets(apps, schema_editor):
+    EventTicket = apps.get_model("news", "EventTicket")
+    for model_name, ticket_fk_name in (("Event", "event"), ("TimePlace", "timeplace")):
+        apps.get_model("news", model_name).objects.update(
+            active_ticket_count=count_tickets_subquery(
+                EventTicket, ticket_fk_name, active=True
+            ),
+            inactive_ticket_count=count_tickets_subquery(
+                EventTicket, ticket_fk_name, active=False
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0030_eventticket_creation_date_and_active_last_modified"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="active_ticket_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="number of active tickets"
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="inactive_ticket_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="number of inactive tickets"
+            ),
+        ),
+        migrations.AddField(
+            model_name="timeplace",
+            name="active_ticket_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="number of active tickets"
+            ),
+        ),
+        migrations.AddField(
+            model_name="timeplace",
+            name="inactive_ticket_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="number of inactive tickets"
+            ),
+        ),
+        migrations.RunPython(count_tickets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0031_event_and_timeplace_ticket_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventWaitlistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "creation_date",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="joined the waitlist"
+                    ),
+                ),
+                (
+                    "language",
+                    models.CharField(
+                        choices=[("en", "English"), ("nb", "Norwegian")],
+                        default="en",
+                        max_length=2,
+                        verbose_name="preferred language",
+                    ),
+                ),
+                (
+                    "comment",
+                    models.TextField(
+                        blank=True, max_length=1000, verbose_name="comment"
+                    ),
+                ),
+                (
+                    "event",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to="news.event",
+                        verbose_name="event",
+                    ),
+                ),
+                (
+                    "timeplace",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to="news.timeplace",
+                        verbose_name="timeplace",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_waitlist_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="user",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "waitlist entry",
+                "verbose_name_plural": "waitlist entries",
+                "indexes": [
+                    models.Index(
+                        fields=["timeplace", "creation_date"],
+                        name="waitlist_timeplace_order_idx",
+                    ),
+                    models.Index(
+                        fields=["event", "creation_date"],
+                        name="waitlist_event_order_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="eventwaitlistentry",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    models.Q(("event__isnull", True), ("timeplace__isnull", False)),
+                    models.Q(("event__isnull", False), ("timeplace__isnull", True)),
+                    _connector="OR",
+                ),
+                name="eventwaitlistentry_either_timeplace_or_event_is_set",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventwaitlistentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "timeplace"),
+                name="eventwaitlistentry_unique_user_per_timeplace",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="eventwaitlistentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "event"),
+                name="eventwaitlistentry_unique_user_per_event",
+            ),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.0.2 on 2026-10-18 03:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0032_eventwaitlistentry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="timeplace",
+            index=models.Index(fields=["start_time"], name="timeplace_start_time_idx"),
+        ),
+    ]
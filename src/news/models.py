@@ -1,7 +1,19 @@
 import uuid
 
-from django.db import models
-from django.db.models import Q
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_hosts import reverse
@@ -83,6 +95,117 @@ class NewsBase(models.Model):
         return str(self.title)
 
 
+class TicketCountersQuerySetMixin:
+    """Queryset methods for the models inheriting from ``TicketCountersBase``."""
+
+    def change_ticket_counters(
+        self: models.QuerySet, *, active=0, inactive=0, enforce_limit=False
+    ) -> int:
+        """
+        Adds ``active`` and ``inactive`` to the ticket counters of the objects in this
+        queryset, using a single ``UPDATE`` query - which makes it safe to call
+        concurrently.
+
+        :param enforce_limit: Whether to only update the counters of the objects that
+            still have available tickets, i.e. whose number of active tickets is less
+            than ``number_of_tickets``; this is checked by the same query, so that
+            concurrent registrations cannot overbook the objects
+        :return: The number of objects whose counters were updated
+        """
+        queryset = self
+        if enforce_limit:
+            queryset = queryset.filter(active_ticket_count__lt=F("number_of_tickets"))
+        # (Clamped at 0, in case the counters have drifted from the actual number of
+        # tickets - see the `reconcile_ticket_counters` management command)
+        return queryset.update(
+            active_ticket_count=Greatest(F("active_ticket_count") + active, 0),
+            inactive_ticket_count=Greatest(F("inactive_ticket_count") + inactive, 0),
+        )
+
+    def reconcile_ticket_counters(self: models.QuerySet) -> int:
+        """
+        Recounts the tickets of the objects in this queryset whose ticket counters
+        differ from the actual number of tickets.
+
+        :return: The number of objects whose counters were corrected
+        """
+        tickets_field = self.model._meta.get_field("tickets")
+        ticket_fk_name = tickets_field.field.name
+
+        def count_tickets(*, active: bool):
+            return Coalesce(
+                Subquery(
+                    tickets_field.related_model.objects.filter(
+                        **{ticket_fk_name: OuterRef("pk")}, active=active
+                    )
+                    .order_by()
+                    .values(ticket_fk_name)
+                    .annotate(count=Count("pk"))
+                    .values("count")
+                ),
+                0,
+            )
+
+        with transaction.atomic():
+            drifted_pks = list(
+                self.annotate(
+                    actual_active_ticket_count=count_tickets(active=True),
+                    actual_inactive_ticket_count=count_tickets(active=False),
+                )
+                .exclude(
+                    active_ticket_count=F("actual_active_ticket_count"),
+                    inactive_ticket_count=F("actual_inactive_ticket_count"),
+                )
+                .values_list("pk", flat=True)
+            )
+            self.model._base_manager.filter(pk__in=drifted_pks).update(
+                active_ticket_count=count_tickets(active=True),
+                inactive_ticket_count=count_tickets(active=False),
+            )
+        return len(drifted_pks)
+
+
+class TicketCountersBase(models.Model):
+    """
+    The abstract class of the models that tickets can be registered for; contains
+    the number of active and inactive tickets, so that they don't have to be counted
+    each time they're displayed.
+
+    The counters are only changed by ``EventTicket`` through
+    ``TicketCountersQuerySetMixin.change_ticket_counters()``, and are never written
+    by ``save()``, as the instance's values might be outdated by the time it's saved.
+    """
+
+    TICKET_COUNTER_FIELDS = ("active_ticket_count", "inactive_ticket_count")
+
+    active_ticket_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("number of active tickets")
+    )
+    inactive_ticket_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name=_("number of inactive tickets")
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or self.pk is None:
+            # A new object - or one being duplicated - has no tickets
+            self.active_ticket_count = self.inactive_ticket_count = 0
+        elif kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.TICKET_COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def number_of_active_tickets(self):
+        return self.active_ticket_count
+
+
 class ArticleQuerySet(NewsBaseQuerySet):
     def published(self) -> "ArticleQuerySet[Article]":
         return self.filter(hidden=False, publication_time__lte=timezone.localtime())
@@ -110,36 +233,103 @@ class Article(NewsBase):
         return reverse("article_detail", args=[self.pk])
 
 
-class EventQuerySet(NewsBaseQuerySet):
+class EventQuerySet(TicketCountersQuerySetMixin, NewsBaseQuerySet):
     def future(self) -> "EventQuerySet[Event]":
-        return (
-            self.filter(timeplaces__end_time__gt=timezone.localtime())
-            # Remove duplicates that can appear when filtering on values across tables
-            .distinct()
+        # (Using `Exists` instead of filtering across the relation, which would
+        # require removing the duplicates using `distinct()`)
+        return self.filter(
+            Exists(
+                TimePlace.objects.filter(
+                    event=OuterRef("pk"), end_time__gt=timezone.localtime()
+                )
+            )
         )
 
     def past(self) -> "EventQuerySet[Event]":
         now = timezone.localtime()
+        timeplaces = TimePlace.objects.filter(event=OuterRef("pk"))
         return (
-            self.filter(
-                # Any repeating event with at least one timeplace that's already
-                # ended...
-                Q(event_type=Event.Type.REPEATING, timeplaces__end_time__lte=now)
-                # ...or any standalone event with timeplaces [this predicate is
-                # completed by the `exclude()` call below]...
-                | Q(event_type=Event.Type.STANDALONE, timeplaces__isnull=False)
-            )
+            # Any event with at least one timeplace that's already ended...
+            self.filter(Exists(timeplaces.filter(end_time__lte=now)))
+            # ...but exclude standalone events with at least one timeplace that has
+            # not ended
             .exclude(
-                # ...but exclude standalone events with at least one timeplace that has
-                # not ended
-                Q(event_type=Event.Type.STANDALONE, timeplaces__end_time__gt=now)
+                Exists(timeplaces.filter(end_time__gt=now)),
+                event_type=Event.Type.STANDALONE,
             )
-            # Remove duplicates that can appear when filtering on values across tables
-            .distinct()
+        )
+
+    def future_listing_occurrences(
+        self, *, one_per_event: bool
+    ) -> "TimePlaceQuerySet[TimePlace]":
+        """
+        Returns the occurrences to show when listing the future events among this
+        queryset, ordered by start time - with their ``event`` selected, and annotated
+        with the ``number_of_occurrences`` to show for them. This is done in a single
+        query, and can be sliced to only fetch the first occurrences.
+
+        Only the first published future occurrence is returned for standalone events.
+        For repeating events, all the published future occurrences are returned,
+        unless ``one_per_event`` is ``True``.
+
+        The ``number_of_occurrences`` is the total number of occurrences for
+        standalone events, and either the number of published future occurrences or
+        ``1`` for repeating events, depending on ``one_per_event``.
+        """
+        occurrences = TimePlace.objects.published().future().filter(event__in=self)
+        first_occurrence_query = Q(pk=occurrences.first_of_each_event_subquery())
+        if one_per_event:
+            shown_occurrence_query = first_occurrence_query
+            repeating_number_of_occurrences = occurrences.count_per_event_subquery()
+        else:
+            shown_occurrence_query = (
+                Q(event__event_type=Event.Type.REPEATING) | first_occurrence_query
+            )
+            repeating_number_of_occurrences = Value(1)
+        return (
+            occurrences.filter(shown_occurrence_query)
+            .select_related("event")
+            .annotate(
+                number_of_occurrences=Case(
+                    When(
+                        event__event_type=Event.Type.STANDALONE,
+                        then=TimePlace.objects.count_per_event_subquery(),
+                    ),
+                    default=repeating_number_of_occurrences,
+                )
+            )
+            .order_by("start_time", "pk")
+        )
+
+    def past_listing_occurrences(self) -> "TimePlaceQuerySet[TimePlace]":
+        """
+        Returns the latest published past occurrence of each of the past events among
+        this queryset, with their ``event`` selected, and annotated with the
+        ``number_of_occurrences`` (i.e. the number of published past occurrences of
+        the event). The occurrences are ordered by the latest start time among all the
+        occurrences of their event, in descending order.
+        This is done in a single query, and can be sliced.
+        """
+        occurrences = TimePlace.objects.published().past().filter(event__in=self.past())
+        latest_start_time = (
+            TimePlace.objects.filter(event=OuterRef("event"))
+            .order_by("-start_time")
+            .values("start_time")[:1]
+        )
+        return (
+            occurrences.filter(
+                pk=occurrences.first_of_each_event_subquery(order_by=("-start_time",))
+            )
+            .select_related("event")
+            .annotate(
+                number_of_occurrences=occurrences.count_per_event_subquery(),
+                latest_event_start_time=Subquery(latest_start_time),
+            )
+            .order_by("-latest_event_start_time", "-start_time", "pk")
         )
 
 
-class Event(NewsBase):
+class Event(TicketCountersBase, NewsBase):
     class Type(models.TextChoices):
         # TODO: remove the "repeating" and "standalone" parentheses and rename
         #       the choice variables to `STANDARD` and `MULTIPART`, after a grace period
@@ -163,6 +353,7 @@ class Event(NewsBase):
     history = HistoricalRecords(
         excluded_fields=[
             "number_of_tickets",
+            *TicketCountersBase.TICKET_COUNTER_FIELDS,
             *NewsBase.BASE_FIELDS_EXCLUDED_FROM_HISTORY,
         ]
     )
@@ -181,10 +372,6 @@ class Event(NewsBase):
     def get_past_occurrences(self) -> "TimePlaceQuerySet":
         return self.timeplaces.published().past().order_by("-start_time")
 
-    @property
-    def number_of_active_tickets(self):
-        return self.tickets.filter(active=True).count()
-
     @property
     def repeating(self):
         return self.event_type == self.Type.REPEATING
@@ -193,7 +380,13 @@ class Event(NewsBase):
     def standalone(self):
         return self.event_type == self.Type.STANDALONE
 
-    def can_register(self, user: User, *, fail_if_not_standalone):
+    def can_register(
+        self, user: User, *, fail_if_not_standalone, ignore_ticket_limit=False
+    ):
+        """
+        :param ignore_ticket_limit: Whether to disregard the number of available
+            tickets - e.g. for checking whether the user can join the waitlist
+        """
         # Registering for an event with no time places should never be allowed - no
         # matter the `event_type`
         if not self.timeplaces.exists():
@@ -216,12 +409,43 @@ class Event(NewsBase):
         # If the event is standalone, the ability to register is dependent on if there
         # are any more available tickets
         if self.standalone:
-            return self.number_of_active_tickets < self.number_of_tickets
+            return (
+                ignore_ticket_limit
+                or self.number_of_active_tickets < self.number_of_tickets
+            )
         else:
             return not fail_if_not_standalone
 
 
-class TimePlaceQuerySet(models.QuerySet):
+class TimePlaceQuerySet(TicketCountersQuerySetMixin, models.QuerySet):
+    def first_of_each_event_subquery(
+        self, *, order_by: tuple[str, ...] = ("start_time",)
+    ) -> Subquery:
+        """
+        Returns a subquery for the pk of the first occurrence - according to
+        ``order_by`` - among this queryset with the same event as the outer query's
+        (time place) row.
+        """
+        return Subquery(
+            self.filter(event=OuterRef("event"))
+            .order_by(*order_by, "pk")
+            .values("pk")[:1]
+        )
+
+    def count_per_event_subquery(self) -> Coalesce:
+        """Returns a subquery for the number of occurrences among this queryset with
+        the same event as the outer query's (time place) row."""
+        return Coalesce(
+            Subquery(
+                self.filter(event=OuterRef("event"))
+                .order_by()
+                .values("event")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            0,
+        )
+
     def published(self) -> "TimePlaceQuerySet[TimePlace]":
         return self.filter(
             hidden=False, event__hidden=False, publication_time__lte=timezone.now()
@@ -241,7 +465,7 @@ class TimePlaceQuerySet(models.QuerySet):
         return self.filter(end_time__lte=timezone.now())
 
 
-class TimePlace(models.Model):
+class TimePlace(TicketCountersBase):
     event = models.ForeignKey(
         to=Event,
         on_delete=models.CASCADE,
@@ -277,18 +501,22 @@ class TimePlace(models.Model):
 
     class Meta:
         ordering = ("start_time",)
+        indexes = [
+            # For finding the occurrences starting soon (see `news.reminders`)
+            models.Index(fields=["start_time"], name="timeplace_start_time_idx"),
+        ]
 
     def __str__(self):
         return f"{self.event.title} - {short_date_format(self.start_time)}"
 
-    @property
-    def number_of_active_tickets(self):
-        return self.tickets.filter(active=True).count()
-
     def is_in_the_past(self):
         return self.end_time < timezone.localtime()
 
-    def can_register(self, user: User):
+    def can_register(self, user: User, *, ignore_ticket_limit=False):
+        """
+        :param ignore_ticket_limit: Whether to disregard the number of available
+            tickets - e.g. for checking whether the user can join the waitlist
+        """
         # Admins should always be allowed
         if user.has_perm("news.cancel_ticket"):
             return True
@@ -301,7 +529,10 @@ class TimePlace(models.Model):
         ):
             return False
 
-        return self.number_of_active_tickets < self.number_of_tickets
+        return (
+            ignore_ticket_limit
+            or self.number_of_active_tickets < self.number_of_tickets
+        )
 
 
 class EventTicket(models.Model):
@@ -369,19 +600,104 @@ class EventTicket(models.Model):
             ("cancel_ticket", "Can cancel and reactivate all event tickets"),
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Used by `save()` to detect the ticket being canceled, reactivated or moved
+        # to another event or time place
+        instance._loaded_state = instance._get_counter_state()
+        return instance
+
     def __str__(self):
         return f"{self.name} - {self.event or self.timeplace}"
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, enforce_ticket_limit=False, **kwargs):
+        """
+        Also updates the ticket counters of the ticket's event or time place - and of
+        the one it was previously registered to, if it has been moved - in the same
+        transaction.
+
+        :param enforce_ticket_limit: Whether to raise a ``ValidationError`` - and not
+            save the ticket - if the ticket is being created, reactivated or moved
+            while there are no available tickets left
+        """
         adding = self._state.adding
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            self._update_ticket_counters(
+                adding=adding, enforce_ticket_limit=enforce_ticket_limit
+            )
+            super().save(*args, **kwargs)
 
+            if adding:
+                # When creating the ticket object, make these timestamps equal (for
+                # comparison in templates and views) - this has to be done after the
+                # object is created above, so that the `creation_date` is set
+                self.active_last_modified = self.creation_date
+                super().save(update_fields=["active_last_modified"])
+        self._loaded_state = self._get_counter_state()
+
+    def _get_counter_state(self) -> tuple[bool, int | None, int | None] | None:
+        """
+        :return: The values of the fields that determine which ticket counter the
+            ticket is counted in - or ``None`` if any of them are deferred
+        """
+        field_names = ("active", "timeplace_id", "event_id")
+        if any(field_name not in self.__dict__ for field_name in field_names):
+            return None
+        return tuple(self.__dict__[field_name] for field_name in field_names)
+
+    def _update_ticket_counters(self, *, adding: bool, enforce_ticket_limit: bool):
         if adding:
-            # When creating the ticket object, make these timestamps equal (for
-            # comparison in templates and views) - this has to be done after the object
-            # is created above, so that the `creation_date` is set
-            self.active_last_modified = self.creation_date
-            super().save(update_fields=["active_last_modified"])
+            previous_state = None
+        else:
+            previous_state = getattr(self, "_loaded_state", None)
+            if previous_state is None:
+                previous_state = (
+                    EventTicket.objects.filter(pk=self.pk)
+                    .values_list("active", "timeplace_id", "event_id")
+                    .first()
+                )
+        if previous_state == self._get_counter_state():
+            return
+
+        counter_changes = {"active": 0, "inactive": 0}
+        enforce_limit = self.active and enforce_ticket_limit
+        if previous_state is not None:
+            previously_active, previous_timeplace_id, previous_event_id = previous_state
+            previous_counter = "active" if previously_active else "inactive"
+            if (previous_timeplace_id, previous_event_id) == (
+                self.timeplace_id,
+                self.event_id,
+            ):
+                counter_changes[previous_counter] = -1
+            else:
+                self._get_queryset_registered_to(
+                    timeplace_id=previous_timeplace_id, event_id=previous_event_id
+                ).change_ticket_counters(**{previous_counter: -1})
+        counter_changes["active" if self.active else "inactive"] += 1
+
+        num_updated = self.get_registered_queryset().change_ticket_counters(
+            **counter_changes, enforce_limit=enforce_limit
+        )
+        if enforce_limit and num_updated == 0:
+            raise ValidationError(
+                _("There are no more available tickets."), code="no_tickets_left"
+            )
+
+    def get_registered_queryset(self) -> TicketCountersQuerySetMixin:
+        """Returns a queryset containing only the event or time place that the ticket
+        is registered to - without querying the database."""
+        return self._get_queryset_registered_to(
+            timeplace_id=self.timeplace_id, event_id=self.event_id
+        )
+
+    @staticmethod
+    def _get_queryset_registered_to(
+        *, timeplace_id: int | None, event_id: int | None
+    ) -> TicketCountersQuerySetMixin:
+        if event_id is not None:
+            return Event.objects.filter(pk=event_id)
+        return TimePlace.objects.filter(pk=timeplace_id)
 
     def get_absolute_url(self):
         return reverse("event_ticket_detail", args=[self.pk])
@@ -403,3 +719,161 @@ class EventTicket(models.Model):
         :return: The email of the user whom the ticket is registered to.
         """
         return self.user.email
+
+
+class EventWaitlistEntryQuerySet(models.QuerySet):
+    def promote_next(self) -> EventTicket | None:
+        """
+        Registers a ticket for the user who has waited the longest among the entries
+        in this queryset - which should only contain the entries of a single event or
+        time place - and deletes their entry.
+        Should be called in the same transaction as the change that made a ticket
+        available, so that no one else can register for it in the meantime.
+
+        :return: The created or reactivated ticket, or ``None`` if no one is waiting
+            or there are no available tickets
+        """
+        with transaction.atomic():
+            while True:
+                # (Skipping the entries that are being promoted by concurrent calls,
+                # instead of waiting for them - and then possibly finding no entries,
+                # as the locked ones might have been deleted)
+                entry = (
+                    self.select_for_update(skip_locked=True)
+                    .order_by("creation_date", "pk")
+                    .first()
+                )
+                if entry is None:
+                    return None
+                try:
+                    with transaction.atomic():
+                        entry.delete()
+                        ticket = entry.activate_ticket()
+                except ValidationError:
+                    # There are no available tickets; the entry is kept, as its
+                    # deletion was rolled back
+                    return None
+                # If the user already had an active ticket, continue with the next
+                # entry
+                if ticket is not None:
+                    return ticket
+
+
+class EventWaitlistEntry(models.Model):
+    """
+    A user waiting for a ticket for an event or time place that has no available
+    tickets left; when a ticket is canceled, the user who has waited the longest is
+    registered - see ``EventWaitlistEntryQuerySet.promote_next()``.
+    """
+
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        related_name="event_waitlist_entries",
+        verbose_name=_("user"),
+    )
+    timeplace = models.ForeignKey(
+        to=TimePlace,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="waitlist_entries",
+        verbose_name=_("timeplace"),
+    )
+    event = models.ForeignKey(
+        to=Event,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="waitlist_entries",
+        verbose_name=_("event"),
+    )
+    creation_date = models.DateTimeField(
+        auto_now_add=True, verbose_name=_("joined the waitlist")
+    )
+    # Used when creating the user's ticket
+    language = models.CharField(
+        choices=EventTicket.Language.choices,
+        max_length=2,
+        default=EventTicket.Language.ENGLISH,
+        verbose_name=_("preferred language"),
+    )
+    comment = models.TextField(blank=True, max_length=1000, verbose_name=_("comment"))
+
+    objects = EventWaitlistEntryQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.CheckConstraint(
+                check=Q(timeplace__isnull=False, event__isnull=True)
+                | Q(timeplace__isnull=True, event__isnull=False),
+                name="%(class)s_either_timeplace_or_event_is_set",
+            ),
+            models.UniqueConstraint(
+                fields=("user", "timeplace"), name="%(class)s_unique_user_per_timeplace"
+            ),
+            models.UniqueConstraint(
+                fields=("user", "event"), name="%(class)s_unique_user_per_event"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("timeplace", "creation_date"),
+                name="waitlist_timeplace_order_idx",
+            ),
+            models.Index(
+                fields=("event", "creation_date"), name="waitlist_event_order_idx"
+            ),
+        )
+        verbose_name = _("waitlist entry")
+        verbose_name_plural = _("waitlist entries")
+
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.event or self.timeplace}"
+
+    @property
+    def registered_event(self) -> Event:
+        return self.event or self.timeplace.event
+
+    def get_position(self) -> int:
+        """
+        :return: The 1-indexed position of the entry in the waitlist
+        """
+        return (
+            EventWaitlistEntry.objects.filter(
+                event=self.event_id, timeplace=self.timeplace_id
+            )
+            .filter(
+                Q(creation_date__lt=self.creation_date)
+                | Q(creation_date=self.creation_date, pk__lt=self.pk)
+            )
+            .count()
+            + 1
+        )
+
+    def activate_ticket(self) -> EventTicket | None:
+        """
+        Creates - or reactivates - the user's ticket for the entry's event or time
+        place.
+
+        :return: The ticket, or ``None`` if the user already had an active ticket
+        :raises ValidationError: If there are no available tickets
+        """
+        ticket = EventTicket.objects.filter(
+            user=self.user_id, event=self.event_id, timeplace=self.timeplace_id
+        ).first()
+        if ticket is None:
+            ticket = EventTicket(
+                user_id=self.user_id,
+                event_id=self.event_id,
+                timeplace_id=self.timeplace_id,
+                language=self.language,
+                comment=self.comment,
+            )
+        elif ticket.active:
+            return None
+        else:
+            ticket.active = True
+            ticket.active_last_modified = timezone.localtime()
+        ticket.save(enforce_ticket_limit=True)
+        return ticket
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone, translation
+from django.utils.formats import date_format
+from django.utils.translation import gettext_lazy as _
+
+from mail import email
+from mail.outbox import enqueue_emails
+from news.emails import TICKET_UUID_PLACEHOLDER
+from news.models import EventTicket, TimePlace
+
+
+def send_event_reminders(*, now: datetime = None, request=None) -> int:
+    """
+    Enqueues reminder emails to the ticket holders of the event occurrences that start
+    within the longest of ``settings.EVENT_REMINDER_LEAD_TIMES``.
+    Each reminder's idempotency key contains the ticket, the occurrence and the lead
+    time, so that this can be called repeatedly (e.g. periodically) without sending
+    the same reminder twice.
+
+    :param request: The request used for rendering the emails; defaults to an
+        ``EmailRenderingRequest``
+    :return: The number of enqueued reminders
+    """
+    if not settings.EVENT_REMINDER_LEAD_TIMES:
+        return 0
+    if now is None:
+        now = timezone.now()
+    if request is None:
+        request = email.EmailRenderingRequest()
+
+    time_places = list(
+        TimePlace.objects.published()
+        .filter(
+            start_time__gt=now,
+            start_time__lte=now + max(settings.EVENT_REMINDER_LEAD_TIMES),
+        )
+        .select_related("event")
+    )
+    if not time_places:
+        return 0
+    # The tickets of standalone events are registered to the events instead of their
+    # occurrences
+    standalone_event_to_time_places = defaultdict(list)
+    for time_place in time_places:
+        if time_place.event.standalone:
+            standalone_event_to_time_places[time_place.event_id].append(time_place)
+    tickets = EventTicket.objects.filter(
+        Q(timeplace__in=time_places) | Q(event__in=standalone_event_to_time_places),
+        active=True,
+    ).select_related("user")
+    time_place_to_tickets = defaultdict(list)
+    time_place_pk_to_time_place = {
+        time_place.pk: time_place for time_place in time_places
+    }
+    for ticket in tickets:
+        if ticket.timeplace_id:
+            ticket_time_places = [time_place_pk_to_time_place[ticket.timeplace_id]]
+        else:
+            ticket_time_places = standalone_event_to_time_places[ticket.event_id]
+        for time_place in ticket_time_places:
+            time_place_to_tickets[time_place].append(ticket)
+
+    messages = {}
+    for time_place, time_place_tickets in time_place_to_tickets.items():
+        lead_time = get_reminder_lead_time(time_place, now)
+        language_to_tickets = defaultdict(list)
+        for ticket in time_place_tickets:
+            language_to_tickets[ticket.language].append(ticket)
+        for language, language_tickets in language_to_tickets.items():
+            with translation.override(language):
+                messages |= render_reminders(
+                    request, time_place, language_tickets, lead_time
+                )
+    return enqueue_emails(messages)
+
+
+def get_reminder_lead_time(time_place: TimePlace, now: datetime) -> timedelta:
+    """
+    :return: The shortest of the lead times that have passed - so that only one
+        reminder is sent if the occurrence was created (or the reminders were last sent)
+        after several of the lead times had passed
+    """
+    time_until_start = time_place.start_time - now
+    return min(
+        lead_time
+        for lead_time in settings.EVENT_REMINDER_LEAD_TIMES
+        if lead_time >= time_until_start
+    )
+
+
+def get_reminder_idempotency_key(
+    ticket: EventTicket, time_place: TimePlace, lead_time: timedelta
+) -> str:
+    return f"news.reminder.{ticket.pk}.{time_place.pk}.{int(lead_time.total_seconds())}"
+
+
+def render_reminders(
+    request,
+    time_place: TimePlace,
+    tickets: list[EventTicket],
+    lead_time: timedelta,
+) -> dict[str, dict]:
+    """
+    Renders the reminder emails for ``tickets`` in the current language, which should
+    be the tickets' preferred language. The templates are only rendered once; see
+    ``mail.email.render_skeleton()``.
+
+    :return: The emails' idempotency keys as keys, and their message dictionaries as
+        values
+    """
+    event = time_place.event
+    context = {
+        "time_place": time_place,
+        "event": event,
+        "ticket": EventTicket(
+            uuid=TICKET_UUID_PLACEHOLDER,
+            timeplace=None if event.standalone else time_place,
+            event=event if event.standalone else None,
+        ),
+    }
+    cache_key_parts = (
+        "news.reminder",
+        time_place.pk,
+        time_place.last_modified,
+        event.last_modified,
+    )
+    html_skeleton = email.render_skeleton(
+        request,
+        context,
+        template_name="email/event_reminder.html",
+        cache_key_parts=cache_key_parts,
+    )
+    text_skeleton = email.render_skeleton(
+        request,
+        context,
+        template_name="email/event_reminder.txt",
+        cache_key_parts=cache_key_parts,
+        strip=True,
+    )
+    # Pass a pure string, instead of the proxy object from `gettext_lazy`
+    subject = str(
+        _("Reminder: “{title}” starts {start_time}").format(
+            title=event.title,
+            start_time=date_format(
+                timezone.localtime(time_place.start_time), "DATETIME_FORMAT"
+            ),
+        )
+    )
+
+    messages = {}
+    for ticket in tickets:
+        placeholder_values = {str(TICKET_UUID_PLACEHOLDER): str(ticket.uuid)}
+        messages[get_reminder_idempotency_key(ticket, time_place, lead_time)] = {
+            "html_render": email.fill_skeleton(html_skeleton, placeholder_values),
+            "text": email.fill_skeleton(text_skeleton, placeholder_values),
+            "subject": subject,
+            "from": settings.EVENT_TICKET_EMAIL,
+            "to": ticket.email,
+        }
+    return messages
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete
+
+from news.models import EventTicket
+
+
+def update_ticket_counters_of_deleted_ticket(instance: EventTicket, **kwargs):
+    # (Does nothing if the ticket's event or time place is also being deleted)
+    instance.get_registered_queryset().change_ticket_counters(
+        **({"active": -1} if instance.active else {"inactive": -1})
+    )
+
+
+def connect():
+    post_delete.connect(update_ticket_counters_of_deleted_ticket, sender=EventTicket)
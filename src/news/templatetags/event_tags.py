@@ -1,6 +1,6 @@
 from django import template
 
-from news.models import Event, TimePlace
+from news.models import Event, EventWaitlistEntry, TimePlace
 from users.models import User
 
 register = template.Library()
@@ -15,3 +15,16 @@ def get_ticket(event_or_timeplace: Event | TimePlace, user: User):
         return tickets.filter(event=event_or_timeplace).first()
     else:
         return tickets.filter(timeplace=event_or_timeplace).first()
+
+
+@register.simple_tag
+def get_waitlist_entry(
+    event_or_timeplace: Event | TimePlace, user: User
+) -> EventWaitlistEntry | None:
+    if not user.is_authenticated:
+        return None
+    entries = user.event_waitlist_entries.all()
+    if isinstance(event_or_timeplace, Event):
+        return entries.filter(event=event_or_timeplace).first()
+    else:
+        return entries.filter(timeplace=event_or_timeplace).first()
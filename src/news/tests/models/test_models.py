@@ -1,8 +1,13 @@
+import threading
 from datetime import timedelta
+from io import StringIO
 from typing import TypeAlias
 from unittest import mock
 
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase
 from django.utils import timezone
 
 from news.models import Article, Event, EventTicket, TimePlace
@@ -261,6 +266,88 @@ class ArticleEventAndTimePlaceTests(TestCase):
         self.assertSetEqual(set(TimePlace.objects.published().future()), {event_future})
         self.assertSetEqual(set(TimePlace.objects.published().past()), {event_past})
 
+    def test_event_listing_occurrences(self):
+        def create_time_places(event: Event, *relative_start_times: int):
+            return [
+                self.create_time_place(
+                    event,
+                    relative_publication_time=-100,
+                    relative_start_time=relative_start_time,
+                )
+                for relative_start_time in relative_start_times
+            ]
+
+        def get_listing(occurrences):
+            return [
+                (occurrence.event, occurrence, occurrence.number_of_occurrences)
+                for occurrence in occurrences
+            ]
+
+        standalone = Event.objects.create(
+            title="Standalone", event_type=Event.Type.STANDALONE
+        )
+        standalone_past, standalone_future1, _standalone_future2 = create_time_places(
+            standalone, -10, 3, 4
+        )
+        # Not published, but should still be counted for standalone events
+        self.create_time_place(
+            standalone, relative_publication_time=1, relative_start_time=5
+        )
+        repeating = Event.objects.create(
+            title="Repeating", event_type=Event.Type.REPEATING
+        )
+        repeating_past1, repeating_past2, repeating_future1, repeating_future2 = (
+            create_time_places(repeating, -5, -2, 1, 6)
+        )
+        # Events with only unpublished time places should not be listed
+        unpublished = Event.objects.create(title="Unpublished")
+        self.create_time_place(
+            unpublished, relative_publication_time=1, relative_start_time=2
+        )
+
+        self.assertListEqual(
+            get_listing(Event.objects.future_listing_occurrences(one_per_event=False)),
+            [
+                (repeating, repeating_future1, 1),
+                (standalone, standalone_future1, 4),
+                (repeating, repeating_future2, 1),
+            ],
+        )
+        self.assertListEqual(
+            get_listing(Event.objects.future_listing_occurrences(one_per_event=True)),
+            [
+                (repeating, repeating_future1, 2),
+                (standalone, standalone_future1, 4),
+            ],
+        )
+        # The standalone event has occurrences that have not ended
+        self.assertListEqual(
+            get_listing(Event.objects.past_listing_occurrences()),
+            [(repeating, repeating_past2, 2)],
+        )
+
+        standalone_ended = Event.objects.create(
+            title="Standalone ended", event_type=Event.Type.STANDALONE
+        )
+        [standalone_ended_past] = create_time_places(standalone_ended, -1)
+        self.assertListEqual(
+            get_listing(Event.objects.past_listing_occurrences()),
+            # Ordered by the latest start time among all the events' occurrences
+            [
+                (repeating, repeating_past2, 2),
+                (standalone_ended, standalone_ended_past, 1),
+            ],
+        )
+        # Only the events in the queryset should be listed
+        self.assertListEqual(
+            get_listing(
+                Event.objects.filter(
+                    pk__in=[standalone.pk, repeating.pk]
+                ).past_listing_occurrences()
+            ),
+            [(repeating, repeating_past2, 2)],
+        )
+
 
 class EventTicketTests(TestCase):
     def setUp(self):
@@ -347,3 +434,187 @@ class EventTicketTests(TestCase):
         )
         self.assertEqual(ticket.creation_date, now)
         self.assertEqual(ticket.active_last_modified, ticket.creation_date)
+
+    def assert_ticket_counters(
+        self, obj: Event | TimePlace, active: int, inactive: int
+    ):
+        obj.refresh_from_db()
+        self.assertEqual(obj.active_ticket_count, active)
+        self.assertEqual(obj.inactive_ticket_count, inactive)
+
+    def test_ticket_counters_are_updated_when_tickets_are_changed(self):
+        user2 = User.objects.create_user("user2")
+        ticket1 = EventTicket.objects.create(
+            user=self.user, event=self.standalone_event
+        )
+        ticket2 = EventTicket.objects.create(user=user2, event=self.standalone_event)
+        self.assert_ticket_counters(self.standalone_event, 2, 0)
+        self.assertEqual(self.standalone_event.number_of_active_tickets, 2)
+
+        ticket1.active = False
+        ticket1.save()
+        self.assert_ticket_counters(self.standalone_event, 1, 1)
+        # Saving without changing `active` should not change the counters
+        ticket1.comment = "Comment"
+        ticket1.save()
+        EventTicket.objects.get(pk=ticket2.pk).save()
+        self.assert_ticket_counters(self.standalone_event, 1, 1)
+
+        ticket1.active = True
+        ticket1.save()
+        self.assert_ticket_counters(self.standalone_event, 2, 0)
+        ticket2.delete()
+        self.assert_ticket_counters(self.standalone_event, 1, 0)
+
+        # Saving an outdated instance of the event should not overwrite the counters
+        self.standalone_event.active_ticket_count = 10
+        self.standalone_event.save()
+        self.assert_ticket_counters(self.standalone_event, 1, 0)
+
+        EventTicket.objects.create(
+            user=self.user, timeplace=self.repeating_time_place, active=False
+        )
+        self.assert_ticket_counters(self.repeating_time_place, 0, 1)
+        self.assert_ticket_counters(self.standalone_event, 1, 0)
+
+        # Duplicated time places should have no tickets
+        self.repeating_time_place.pk = None
+        self.repeating_time_place.save()
+        self.assert_ticket_counters(self.repeating_time_place, 0, 0)
+
+    def test_enforced_ticket_limit_prevents_overbooking(self):
+        self.repeating_time_place.number_of_tickets = 1
+        self.repeating_time_place.save()
+        user2 = User.objects.create_user("user2")
+        ticket1 = EventTicket(user=self.user, timeplace=self.repeating_time_place)
+        ticket1.save(enforce_ticket_limit=True)
+
+        ticket2 = EventTicket(user=user2, timeplace=self.repeating_time_place)
+        with self.assertRaises(ValidationError):
+            ticket2.save(enforce_ticket_limit=True)
+        self.assertFalse(EventTicket.objects.filter(user=user2).exists())
+        self.assert_ticket_counters(self.repeating_time_place, 1, 0)
+
+        # Reactivating a ticket should also be prevented
+        ticket2.active = False
+        ticket2.save(enforce_ticket_limit=True)
+        ticket2.active = True
+        with self.assertRaises(ValidationError):
+            ticket2.save(enforce_ticket_limit=True)
+        ticket2.refresh_from_db()
+        self.assertFalse(ticket2.active)
+        self.assert_ticket_counters(self.repeating_time_place, 1, 1)
+
+        # ...unless the limit is not enforced, e.g. for admins
+        ticket2.active = True
+        ticket2.save()
+        self.assert_ticket_counters(self.repeating_time_place, 2, 0)
+
+    def test_ticket_counters_are_updated_when_tickets_are_moved(self):
+        other_time_place = TimePlace.objects.create(
+            event=self.repeating_event, number_of_tickets=1
+        )
+        ticket = EventTicket.objects.create(
+            user=self.user, timeplace=self.repeating_time_place
+        )
+        self.assert_ticket_counters(self.repeating_time_place, 1, 0)
+
+        # E.g. done by staff in the admin
+        ticket.timeplace = other_time_place
+        ticket.save()
+        self.assert_ticket_counters(self.repeating_time_place, 0, 0)
+        self.assert_ticket_counters(other_time_place, 1, 0)
+
+        # Moving and canceling the ticket at the same time
+        ticket = EventTicket.objects.get(pk=ticket.pk)
+        ticket.timeplace = None
+        ticket.event = self.standalone_event
+        ticket.active = False
+        ticket.save()
+        self.assert_ticket_counters(other_time_place, 0, 0)
+        self.assert_ticket_counters(self.standalone_event, 0, 1)
+
+        # Moving an active ticket to a time place with no available tickets should be
+        # prevented when the limit is enforced
+        EventTicket.objects.create(
+            user=User.objects.create_user("user2"), timeplace=other_time_place
+        )
+        ticket.active = True
+        ticket.event = None
+        ticket.timeplace = other_time_place
+        with self.assertRaises(ValidationError):
+            ticket.save(enforce_ticket_limit=True)
+        self.assert_ticket_counters(self.standalone_event, 0, 1)
+        self.assert_ticket_counters(other_time_place, 1, 0)
+
+    def test_reconcile_ticket_counters_command_corrects_drifted_counters(self):
+        EventTicket.objects.create(user=self.user, event=self.standalone_event)
+        EventTicket.objects.create(
+            user=self.user, timeplace=self.repeating_time_place, active=False
+        )
+        # Make the counters drift, by changing the tickets without `save()`
+        EventTicket.objects.update(active=True)
+        Event.objects.filter(pk=self.repeating_event.pk).update(active_ticket_count=3)
+
+        stdout = StringIO()
+        call_command("reconcile_ticket_counters", stdout=stdout)
+        self.assertIn("Corrected the ticket counters of 1 events.", stdout.getvalue())
+        self.assertIn(
+            "Corrected the ticket counters of 1 time places.", stdout.getvalue()
+        )
+        self.assert_ticket_counters(self.standalone_event, 1, 0)
+        self.assert_ticket_counters(self.repeating_event, 0, 0)
+        self.assert_ticket_counters(self.repeating_time_place, 1, 0)
+
+
+class ConcurrentTicketRegistrationTests(TransactionTestCase):
+    """Uses a separate database connection for each thread, which means that the
+    changes must be committed to be visible to the other threads."""
+
+    NUM_THREADS = 8
+    NUM_TICKETS = 3
+
+    def setUp(self):
+        event = Event.objects.create(title="Repeating event")
+        self.time_place = TimePlace.objects.create(
+            event=event, number_of_tickets=self.NUM_TICKETS
+        )
+        self.users = [
+            User.objects.create_user(f"user{i}") for i in range(self.NUM_THREADS)
+        ]
+
+    def test_concurrent_registrations_do_not_exceed_number_of_tickets(self):
+        barrier = threading.Barrier(self.NUM_THREADS)
+        results = [None] * self.NUM_THREADS
+
+        def register(index: int):
+            try:
+                barrier.wait()
+                EventTicket(user=self.users[index], timeplace=self.time_place).save(
+                    enforce_ticket_limit=True
+                )
+            except Exception as e:  # noqa: BLE001
+                results[index] = e
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=register, args=(i,))
+            for i in range(self.NUM_THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for result in results:
+            if result is not None:
+                # Either rejected because there were no tickets left, or blocked by
+                # the other transactions
+                self.assertIsInstance(result, ValidationError | OperationalError)
+        num_tickets = self.time_place.tickets.count()
+        self.assertEqual(num_tickets, results.count(None))
+        self.assertGreaterEqual(num_tickets, 1)
+        self.assertLessEqual(num_tickets, self.NUM_TICKETS)
+        self.time_place.refresh_from_db()
+        self.assertEqual(self.time_place.active_ticket_count, num_tickets)
@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from mail import email
+from news.emails import render_ticket_email
+from news.models import Event, EventTicket, TimePlace
+from users.models import User
+from util.test_utils import MOCK_JPG_FILE, CleanUpTempFilesTestMixin
+
+
+class TicketEmailTests(CleanUpTempFilesTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.event = Event.objects.create(
+            title="Event", image=MOCK_JPG_FILE, event_type=Event.Type.REPEATING
+        )
+        self.time_place = TimePlace.objects.create(event=self.event)
+        self.request = RequestFactory().get("/")
+
+    def create_ticket(self, username: str, comment: str) -> EventTicket:
+        user = User.objects.create_user(username, email=f"{username}@makentnu.no")
+        return EventTicket.objects.create(
+            user=user, timeplace=self.time_place, comment=comment
+        )
+
+    def render_fully(self, ticket: EventTicket) -> tuple[str, str]:
+        return (
+            email.render_html(
+                self.request, {"ticket": ticket}, template_name="email/ticket.html"
+            ),
+            email.render_text(
+                self.request, {"ticket": ticket}, template_name="email/ticket.txt"
+            ),
+        )
+
+    def test_rendered_email_is_identical_to_rendering_the_templates_fully(self):
+        tickets = [
+            self.create_ticket("user1", ""),
+            self.create_ticket("user2", "A <b>comment</b> & [[ticket.comment]]"),
+        ]
+        for ticket in tickets:
+            with self.subTest(ticket=ticket):
+                rendered_email = render_ticket_email(self.request, ticket)
+                self.assertTupleEqual(
+                    (rendered_email["html_render"], rendered_email["text"]),
+                    self.render_fully(ticket),
+                )
+                self.assertIn(str(ticket.uuid), rendered_email["text"])
+
+    def test_changing_the_event_renders_a_new_skeleton(self):
+        ticket = self.create_ticket("user1", "")
+        render_ticket_email(self.request, ticket)
+        self.event.title = "Changed title"
+        self.event.save()
+        ticket.refresh_from_db()
+        rendered_email = render_ticket_email(self.request, ticket)
+        self.assertIn("Changed title", rendered_email["html_render"])
+        self.assertIn("Changed title", rendered_email["subject"])
@@ -0,0 +1,164 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_hosts import reverse
+
+from news.models import Event, TimePlace
+from users.models import User
+
+
+class EventFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.localtime()
+        self.public_event = Event.objects.create(title="Public event")
+        self.private_event = Event.objects.create(title="Private event", private=True)
+        self.past_time_place = TimePlace.objects.create(
+            event=self.public_event,
+            start_time=now - timedelta(days=10, hours=2),
+            end_time=now - timedelta(days=10),
+            place="Past place",
+        )
+        self.future_time_place = TimePlace.objects.create(
+            event=self.public_event,
+            start_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=1, hours=2),
+            place="Future place",
+        )
+        self.private_time_place = TimePlace.objects.create(
+            event=self.private_event,
+            start_time=now + timedelta(days=2),
+            end_time=now + timedelta(days=2, hours=2),
+        )
+        self.url = reverse("event_list_ical")
+
+    def test_feed_is_filtered_by_visibility_and_time_window(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content = response.content.decode()
+        self.assertIn("Past place", content)
+        self.assertIn("Future place", content)
+        self.assertNotIn("Private event", content)
+
+        response = self.client.get(self.url, {"past_days": 0})
+        content = response.content.decode()
+        self.assertNotIn("Past place", content)
+        self.assertIn("Future place", content)
+
+        response = self.client.get(self.url, {"past_days": 11})
+        self.assertIn("Past place", response.content.decode())
+
+        response = self.client.get(self.url, {"past_days": -1})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+        user = User.objects.create_user("user")
+        user.add_perms("news.can_view_private")
+        private_client = Client()
+        private_client.force_login(user)
+        response = private_client.get(self.url)
+        self.assertIn("Private event", response.content.decode())
+        # The private and public variants should not share the same ETag
+        self.assertNotEqual(response["ETag"], self.client.get(self.url)["ETag"])
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_hidden_and_unpublished_occurrences_are_not_included(self):
+        now = timezone.localtime()
+        hidden_event = Event.objects.create(title="Hidden event", hidden=True)
+        hidden_event_time_place = TimePlace.objects.create(
+            event=hidden_event,
+            start_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=1, hours=2),
+        )
+        hidden_time_place = TimePlace.objects.create(
+            event=self.public_event,
+            start_time=now + timedelta(days=3),
+            end_time=now + timedelta(days=3, hours=2),
+            place="Hidden place",
+            hidden=True,
+        )
+        unpublished_time_place = TimePlace.objects.create(
+            event=self.public_event,
+            start_time=now + timedelta(days=4),
+            end_time=now + timedelta(days=4, hours=2),
+            place="Unpublished place",
+            publication_time=now + timedelta(days=1),
+        )
+        urls = [
+            self.url,
+            reverse("event_ical", args=[self.public_event.pk]),
+            reverse(
+                "time_place_ical", args=[self.public_event.pk, hidden_time_place.pk]
+            ),
+            reverse(
+                "time_place_ical",
+                args=[self.public_event.pk, unpublished_time_place.pk],
+            ),
+            reverse("event_ical", args=[hidden_event.pk]),
+            reverse(
+                "time_place_ical", args=[hidden_event.pk, hidden_event_time_place.pk]
+            ),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                content = self.client.get(url).content.decode()
+                self.assertNotIn("Hidden event", content)
+                self.assertNotIn("Hidden place", content)
+                self.assertNotIn("Unpublished place", content)
+
+        # Users who can change events should be able to see everything
+        user = User.objects.create_user("user")
+        user.add_perms("news.change_event")
+        admin_client = Client()
+        admin_client.force_login(user)
+        content = admin_client.get(self.url).content.decode()
+        self.assertIn("Hidden event", content)
+        self.assertIn("Hidden place", content)
+        self.assertIn("Unpublished place", content)
+
+    def test_unchanged_feed_is_not_regenerated(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        # The feed's last modification time can't be derived after deletions
+        self.assertFalse(response.has_header("Last-Modified"))
+
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        # The cached feed should be returned with a single query, to check whether
+        # it's outdated
+        with CaptureQueriesContext(connection) as context:
+            cached_response = self.client.get(self.url)
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(cached_response["ETag"], etag)
+
+        # Changing a time place or an event should change the feed
+        self.future_time_place.place = "Changed place"
+        self.future_time_place.save()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn("Changed place", response.content.decode())
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        self.past_time_place.delete()
+        response = self.client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn("Past place", response.content.decode())
+
+    def test_number_of_queries_does_not_depend_on_number_of_time_places(self):
+        def get_num_queries() -> int:
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(self.url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            return len(context.captured_queries)
+
+        num_queries = get_num_queries()
+        for _i in range(5):
+            TimePlace.objects.create(event=self.public_event)
+        self.assertEqual(get_num_queries(), num_queries)
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from mail.models import OutboxEmail
+from news.models import Event, EventTicket, TimePlace
+from news.reminders import send_event_reminders
+from users.models import User
+from util.test_utils import MOCK_JPG_FILE, CleanUpTempFilesTestMixin
+
+
+@override_settings(
+    PRINT_EMAILS_TO_CONSOLE=False,
+    EVENT_REMINDER_LEAD_TIMES=[timedelta(days=1), timedelta(hours=2)],
+)
+class EventReminderTests(CleanUpTempFilesTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.repeating_event = Event.objects.create(
+            title="Repeating event",
+            image=MOCK_JPG_FILE,
+            event_type=Event.Type.REPEATING,
+        )
+        self.tomorrow_time_place = self.create_time_place(
+            self.repeating_event, timedelta(hours=20)
+        )
+        self.next_week_time_place = self.create_time_place(
+            self.repeating_event, timedelta(days=7)
+        )
+        self.hidden_time_place = self.create_time_place(
+            self.repeating_event, timedelta(hours=1), hidden=True
+        )
+        self.standalone_event = Event.objects.create(
+            title="Standalone event",
+            image=MOCK_JPG_FILE,
+            event_type=Event.Type.STANDALONE,
+        )
+        self.standalone_time_place = self.create_time_place(
+            self.standalone_event, timedelta(hours=1)
+        )
+
+        self.user1 = User.objects.create_user("user1", email="user1@makentnu.no")
+        self.user2 = User.objects.create_user("user2", email="user2@makentnu.no")
+        self.ticket1 = EventTicket.objects.create(
+            user=self.user1,
+            timeplace=self.tomorrow_time_place,
+            language=EventTicket.Language.ENGLISH,
+        )
+        self.ticket2 = EventTicket.objects.create(
+            user=self.user2,
+            timeplace=self.tomorrow_time_place,
+            language=EventTicket.Language.NORWEGIAN,
+        )
+        self.standalone_ticket = EventTicket.objects.create(
+            user=self.user1, event=self.standalone_event
+        )
+        for time_place in (self.next_week_time_place, self.hidden_time_place):
+            EventTicket.objects.create(user=self.user1, timeplace=time_place)
+        EventTicket.objects.create(
+            user=self.user2, event=self.standalone_event, active=False
+        )
+
+    def create_time_place(self, event: Event, starts_in: timedelta, **kwargs):
+        return TimePlace.objects.create(
+            event=event,
+            start_time=self.now + starts_in,
+            end_time=self.now + starts_in + timedelta(hours=2),
+            place="Room 42",
+            **kwargs,
+        )
+
+    def get_reminder_recipients(self) -> list[str]:
+        return sorted(
+            outbox_email.message["to"]
+            for outbox_email in OutboxEmail.objects.filter(
+                idempotency_key__startswith="news.reminder."
+            )
+        )
+
+    def test_reminders_are_sent_to_active_tickets_of_upcoming_occurrences(self):
+        self.assertEqual(send_event_reminders(now=self.now), 3)
+        self.assertListEqual(
+            self.get_reminder_recipients(),
+            [self.user1.email, self.user1.email, self.user2.email],
+        )
+        messages = {
+            outbox_email.message["to"]: outbox_email.message
+            for outbox_email in OutboxEmail.objects.filter(
+                idempotency_key__contains=f".{self.tomorrow_time_place.pk}."
+            )
+        }
+        # The emails should be in each ticket's preferred language
+        self.assertNotEqual(
+            messages[self.user1.email]["subject"], messages[self.user2.email]["subject"]
+        )
+        self.assertIn(str(self.ticket1.uuid), messages[self.user1.email]["html_render"])
+        self.assertIn(str(self.ticket2.uuid), messages[self.user2.email]["text"])
+        self.assertNotIn(str(self.ticket1.uuid), messages[self.user2.email]["text"])
+        self.assertIn("Room 42", messages[self.user1.email]["text"])
+        self.assertIn("https://", messages[self.user1.email]["text"])
+
+    def test_reminders_are_only_sent_once_per_lead_time(self):
+        send_event_reminders(now=self.now)
+        self.assertEqual(send_event_reminders(now=self.now), 0)
+        self.assertEqual(send_event_reminders(now=self.now + timedelta(hours=10)), 0)
+        # The tickets for the occurrence tomorrow should be reminded once more, when
+        # it's starting within the shortest lead time
+        self.assertEqual(send_event_reminders(now=self.now + timedelta(hours=19)), 2)
+        self.assertEqual(len(self.get_reminder_recipients()), 5)
+
+    def test_number_of_queries_does_not_depend_on_number_of_tickets(self):
+        def get_num_queries() -> int:
+            OutboxEmail.objects.all().delete()
+            with CaptureQueriesContext(connection) as context:
+                send_event_reminders(now=self.now)
+            return len(context.captured_queries)
+
+        num_queries = get_num_queries()
+        for i in range(5):
+            user = User.objects.create_user(f"user{i + 3}", email=f"{i}@makentnu.no")
+            EventTicket.objects.create(
+                user=user,
+                timeplace=self.tomorrow_time_place,
+                language=EventTicket.Language.NORWEGIAN,
+            )
+            EventTicket.objects.create(user=user, event=self.standalone_event)
+        self.assertEqual(get_num_queries(), num_queries)
@@ -155,6 +155,7 @@ class UrlTests(NewsTestBase, TestCase):
             ],
             # specific_event_urlpatterns
             Get(reverse("event_detail", args=[self.event1.pk]), public=True),
+            Get(reverse("event_ical", args=[self.event1.pk]), public=True),
             Get(  # This event is private
                 reverse("event_detail", args=[self.event2.pk]), public=False
             ),
@@ -171,6 +172,8 @@ class UrlTests(NewsTestBase, TestCase):
             ],
             # event_urlpatterns
             Get(reverse("event_list"), public=True),
+            Get(reverse("event_list_ical"), public=True),
+            Get(f"{reverse('event_list_ical')}?past_days=0", public=True),
             # specific_ticket_urlpatterns
             *[
                 Get(reverse("event_ticket_detail", args=[ticket.pk]), public=False)
@@ -210,6 +213,16 @@ class UrlTests(NewsTestBase, TestCase):
                 # Can't test `time_place3`, as it has no tickets
                 if time_place != self.time_place3
             ],
+            *[
+                Get(
+                    reverse(
+                        "admin_time_place_participants_email",
+                        args=[time_place.event.pk, time_place.pk],
+                    ),
+                    public=False,
+                )
+                for time_place in self.time_places
+            ],
             # time_place_adminpatterns
             Get(reverse("time_place_create", args=[self.event1.pk]), public=False),
             Get(reverse("time_place_create", args=[self.event2.pk]), public=False),
@@ -221,6 +234,14 @@ class UrlTests(NewsTestBase, TestCase):
             Get(  # Can't test `event1`, as it has no tickets
                 reverse("admin_event_ticket_list", args=[self.event2.pk]), public=False
             ),
+            Get(
+                reverse("admin_event_participants_email", args=[self.event1.pk]),
+                public=False,
+            ),
+            Get(
+                reverse("admin_event_participants_email", args=[self.event2.pk]),
+                public=False,
+            ),
             # event_adminpatterns
             Get(reverse("admin_event_list"), public=False),
             Get(reverse("event_create"), public=False),
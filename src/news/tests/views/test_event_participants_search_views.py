@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django_hosts import reverse
+
+from news.models import Event, EventTicket, TimePlace
+from news.views.event import AdminEventParticipantsSearchView
+from users.models import User
+
+
+class AdminEventParticipantsSearchViewTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user("admin")
+        admin.add_perms("internal.is_internal", "news.change_event")
+        self.client = Client()
+        self.client.force_login(admin)
+        self.url = reverse("admin_event_participants_search")
+
+        event = Event.objects.create(title="Event", event_type=Event.Type.REPEATING)
+        self.time_place = TimePlace.objects.create(event=event)
+
+    def create_participants(self, count: int, *, first_pk_offset=0):
+        for i in range(first_pk_offset, first_pk_offset + count):
+            user = User.objects.create_user(
+                f"participant{i}", first_name="Participant", last_name=f"{i:03}"
+            )
+            EventTicket.objects.create(user=user, timeplace=self.time_place)
+
+    def search(self, page: int = None):
+        params = {"search_string": "participant"}
+        if page:
+            params["page"] = page
+        return self.client.get(self.url, params)
+
+    def test_results_are_paginated(self):
+        users_per_page = AdminEventParticipantsSearchView.users_per_page
+        self.create_participants(users_per_page + 1)
+
+        response = self.search()
+        self.assertEqual(
+            len(response.context["found_users_with_tickets"]), users_per_page
+        )
+        self.assertEqual(response.context["page_obj"].paginator.num_pages, 2)
+
+        response = self.search(page=2)
+        self.assertEqual(len(response.context["found_users_with_tickets"]), 1)
+        self.assertEqual(
+            len(response.context["found_users_with_tickets"][0].tickets), 1
+        )
+        # Out of range page numbers should show the last page
+        self.assertEqual(self.search(page=100).context["page_obj"].number, 2)
+
+    def test_number_of_queries_does_not_depend_on_number_of_found_users(self):
+        def get_num_queries() -> int:
+            with CaptureQueriesContext(connection) as context:
+                self.search()
+            return len(context.captured_queries)
+
+        self.create_participants(3)
+        # (Making a request first, to fill the caches that are used by every request)
+        self.search()
+        num_queries = get_num_queries()
+        self.create_participants(
+            AdminEventParticipantsSearchView.users_per_page * 2, first_pk_offset=3
+        )
+        self.assertEqual(get_num_queries(), num_queries)
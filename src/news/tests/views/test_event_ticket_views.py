@@ -10,7 +10,8 @@ from django.urls import reverse as django_reverse
 from django.utils import lorem_ipsum, timezone
 from django_hosts import reverse
 
-from news.models import Event, EventTicket, TimePlace
+from mail.models import MailingJob, MailingRecipient, OutboxEmail
+from news.models import Event, EventTicket, EventWaitlistEntry, TimePlace
 from users.models import User
 from util.model_utils import duplicate
 from util.test_utils import MOCK_JPG_FILE, CleanUpTempFilesTestMixin
@@ -149,9 +150,13 @@ class TestEventTicketViews(CleanUpTempFilesTestMixin, TestCase):
                     self.assertEqual(self.user1.event_tickets.count(), 0)
 
                     # Create a ticket by registering for the event, while capturing
-                    # whatever is printed to the console
+                    # whatever is printed to the console (which is done when the
+                    # transaction is committed)
                     console_output = io.StringIO()
-                    with redirect_stdout(console_output):
+                    with (
+                        redirect_stdout(console_output),
+                        self.captureOnCommitCallbacks(execute=True),
+                    ):
                         response = self.client1.post(url, data)
                     self.assertEqual(response.status_code, HTTPStatus.FOUND)
 
@@ -187,6 +192,14 @@ class TestEventTicketViews(CleanUpTempFilesTestMixin, TestCase):
                         count_fail_message(ticket.uuid),
                     )
 
+                    # The email should have gone through the outbox
+                    self.assertEqual(
+                        OutboxEmail.objects.get(
+                            idempotency_key__startswith=f"news.ticket.{ticket.pk}."
+                        ).status,
+                        OutboxEmail.Status.SENT,
+                    )
+
                     # Delete the ticket, so that the next for-loop iteration has a clean
                     # slate
                     ticket.delete()
@@ -323,6 +336,86 @@ class TestEventTicketViews(CleanUpTempFilesTestMixin, TestCase):
 
                 self.user1.user_permissions.clear()
 
+    def test__event_registration_view__adds_users_to_waitlist_when_sold_out(self):
+        user2 = User.objects.create_user(username="user2", email="user2@makentnu.no")
+        user3 = User.objects.create_user(username="user3", email="user3@makentnu.no")
+        client2, client3 = Client(), Client()
+        client2.force_login(user2)
+        client3.force_login(user3)
+
+        for time_place_or_event in [self.repeating_time_place, self.standalone_event]:
+            with self.subTest(time_place_or_event=time_place_or_event):
+                if isinstance(time_place_or_event, TimePlace):
+                    registration_url = reverse(
+                        "event_ticket_create",
+                        args=[self.repeating_event.pk, time_place_or_event.pk],
+                    )
+                    event = self.repeating_event
+                else:
+                    registration_url = reverse(
+                        "event_ticket_create", args=[time_place_or_event.pk]
+                    )
+                    event = time_place_or_event
+                time_place_or_event.number_of_tickets = 1
+                time_place_or_event.save()
+                data = {"language": EventTicket.Language.NORWEGIAN, "comment": "Hi"}
+
+                with redirect_stdout(io.StringIO()):
+                    self.client1.post(registration_url, data)
+                ticket1 = self.user1.event_tickets.get()
+
+                # The event is sold out, so the other users should be added to the
+                # waitlist, in the order that they registered
+                response = client2.get(registration_url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, "waitlist")
+                for client in (client2, client3):
+                    response = client.post(registration_url, data)
+                    self.assertRedirects(response, event.get_absolute_url())
+                self.assertFalse(EventTicket.objects.exclude(pk=ticket1.pk).exists())
+                entry2, entry3 = EventWaitlistEntry.objects.order_by("creation_date")
+                self.assertEqual(entry2.user, user2)
+                self.assertEqual((entry2.get_position(), entry3.get_position()), (1, 2))
+                # Registering again should not create another entry
+                response = client2.get(registration_url)
+                self.assertRedirects(response, event.get_absolute_url())
+                # The position should be shown separately from the button for
+                # leaving the waitlist, which should ask for confirmation
+                response = client3.get(event.get_absolute_url())
+                self.assertContains(response, "you are number 2 on the waitlist")
+                self.assertContains(response, "delete-modal-button")
+                self.assertContains(
+                    response,
+                    django_reverse("event_waitlist_entry_delete", args=[entry3.pk]),
+                )
+
+                # Canceling a ticket should give it to the first user in the waitlist
+                # (The email is sent when the transaction is committed)
+                console_output = io.StringIO()
+                with (
+                    redirect_stdout(console_output),
+                    self.captureOnCommitCallbacks(execute=True),
+                ):
+                    self.client1.post(reverse("event_ticket_cancel", args=[ticket1.pk]))
+                ticket2 = user2.event_tickets.get()
+                self.assertTrue(ticket2.active)
+                self.assertEqual(ticket2.language, EventTicket.Language.NORWEGIAN)
+                self.assertEqual(ticket2.comment, "Hi")
+                self.assertIn(f"To: {user2.email}", console_output.getvalue())
+                self.assertQuerySetEqual(EventWaitlistEntry.objects.all(), [entry3])
+                self.assertEqual(entry3.get_position(), 1)
+                time_place_or_event.refresh_from_db()
+                self.assertEqual(time_place_or_event.active_ticket_count, 1)
+
+                # Leaving the waitlist
+                response = client3.post(
+                    reverse("event_waitlist_entry_delete", args=[entry3.pk])
+                )
+                self.assertRedirects(response, event.get_absolute_url())
+                self.assertFalse(EventWaitlistEntry.objects.exists())
+
+                EventTicket.objects.all().delete()
+
     # noinspection HttpUrlsUsage
     def test__event_ticket_cancel_view__only_allows_expected_next_params(self):
         ticket_repeating = EventTicket.objects.create(
@@ -388,3 +481,61 @@ class TestEventTicketViews(CleanUpTempFilesTestMixin, TestCase):
                 # Some other internal URLs, which should not be allowed
                 assert_next_param_is_valid("/", False)
                 assert_next_param_is_valid(urlparse(reverse("index_page")).path, False)
+
+    def test__participants_email_view__sends_a_mailing_to_active_tickets(self):
+        admin = User.objects.create_user(username="admin")
+        admin.add_perms("internal.is_internal", "news.change_event")
+        admin_client = Client()
+        admin_client.force_login(admin)
+        user2 = User.objects.create_user(username="user2", email="user2@makentnu.no")
+        user3 = User.objects.create_user(username="user3", email="user3@makentnu.no")
+        EventTicket.objects.create(
+            user=self.user1,
+            event=self.standalone_event,
+            language=EventTicket.Language.ENGLISH,
+        )
+        EventTicket.objects.create(
+            user=user2,
+            event=self.standalone_event,
+            language=EventTicket.Language.NORWEGIAN,
+        )
+        EventTicket.objects.create(
+            user=user3, event=self.standalone_event, active=False
+        )
+
+        url = reverse("admin_event_participants_email", args=[self.standalone_event.pk])
+        self.assertEqual(self.client1.get(url).status_code, HTTPStatus.FORBIDDEN)
+        self.assertEqual(admin_client.get(url).status_code, HTTPStatus.OK)
+
+        console_output = io.StringIO()
+        with redirect_stdout(console_output):
+            response = admin_client.post(
+                url, {"subject": "Changed room", "message": "See you in room 42!"}
+            )
+        self.assertRedirects(
+            response,
+            django_reverse("admin_event_ticket_list", args=[self.standalone_event.pk]),
+            fetch_redirect_response=False,
+        )
+
+        job = MailingJob.objects.get()
+        self.assertEqual(job.created_by, admin)
+        self.assertEqual(job.status, MailingJob.Status.FINISHED)
+        # The message should have been rendered once per language
+        self.assertSetEqual(
+            set(job.rendered_messages),
+            {EventTicket.Language.ENGLISH, EventTicket.Language.NORWEGIAN},
+        )
+        self.assertSetEqual(
+            set(job.recipients.values_list("email", "status")),
+            {
+                (self.user1.email, MailingRecipient.Status.SENT),
+                (user2.email, MailingRecipient.Status.SENT),
+            },
+        )
+        printed_email_str = console_output.getvalue()
+        self.assertEqual(printed_email_str.count("Subject: Changed room"), 2)
+        self.assertIn(f"To: {self.user1.email}", printed_email_str)
+        self.assertIn(f"To: {user2.email}", printed_email_str)
+        self.assertNotIn(user3.email, printed_email_str)
+        self.assertIn("See you in room 42!", printed_email_str)
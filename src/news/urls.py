@@ -2,7 +2,7 @@ from django.contrib.auth.decorators import login_required
 from django.urls import include, path
 
 from news.api import views as api_views
-from news.ical import SingleTimePlaceFeed
+from news.ical import EventFeed, SingleEventFeed, SingleTimePlaceFeed
 from news.views import article as article_views, event as event_views
 
 article_urlpatterns = [
@@ -23,6 +23,7 @@ time_place_urlpatterns = [
 ]
 specific_event_urlpatterns = [
     path("", event_views.EventDetailView.as_view(), name="event_detail"),
+    path("ical/", SingleEventFeed(), name="event_ical"),
     path(
         "register/",
         login_required(event_views.EventTicketCreateView.as_view()),
@@ -32,6 +33,7 @@ specific_event_urlpatterns = [
 ]
 event_urlpatterns = [
     path("", event_views.EventListView.as_view(), name="event_list"),
+    path("ical/", EventFeed(), name="event_list_ical"),
     path("<int:pk>/", include(specific_event_urlpatterns)),
 ]
 
@@ -48,6 +50,11 @@ ticket_urlpatterns = [
     path(
         "me/", event_views.EventTicketMyListView.as_view(), name="event_ticket_my_list"
     ),
+    path(
+        "waitlist/<int:pk>/leave/",
+        login_required(event_views.EventWaitlistEntryDeleteView.as_view()),
+        name="event_waitlist_entry_delete",
+    ),
 ]
 
 urlpatterns = [
@@ -85,6 +92,11 @@ specific_time_place_adminpatterns = [
         event_views.AdminTimePlaceTicketListView.as_view(),
         name="admin_time_place_ticket_list",
     ),
+    path(
+        "tickets/email/",
+        event_views.AdminTimePlaceParticipantsEmailView.as_view(),
+        name="admin_time_place_participants_email",
+    ),
 ]
 time_place_adminpatterns = [
     path("add/", event_views.TimePlaceCreateView.as_view(), name="time_place_create"),
@@ -99,6 +111,11 @@ specific_event_adminpatterns = [
         event_views.AdminEventTicketListView.as_view(),
         name="admin_event_ticket_list",
     ),
+    path(
+        "tickets/email/",
+        event_views.AdminEventParticipantsEmailView.as_view(),
+        name="admin_event_participants_email",
+    ),
     path("timeplaces/", include(time_place_adminpatterns)),
 ]
 event_adminpatterns = [
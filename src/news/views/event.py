@@ -1,25 +1,26 @@
 import math
 from abc import ABC
+from collections.abc import Iterable
 from datetime import timedelta
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.core.mail import get_connection, send_mail
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Count, Max, Min, Prefetch, Q
-from django.db.models.functions import Concat
 from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.template.loader import get_template
 from django.urls import reverse, reverse_lazy
-from django.utils import timezone
+from django.utils import timezone, translation
 from django.utils.safestring import mark_safe
 from django.utils.translation import get_language, gettext_lazy as _, trim_whitespace
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
+    FormView,
     ListView,
     TemplateView,
     UpdateView,
@@ -28,16 +29,26 @@ from django.views.generic.edit import ModelFormMixin
 from django_hosts import reverse as django_hosts_reverse
 
 from mail import email
+from mail.mailing import create_mailing_job, enqueue_mailing_job
+from news.emails import send_ticket_email
 from news.forms import (
     EventForm,
+    EventParticipantsEmailForm,
     EventParticipantsSearchQueryForm,
     EventTicketForm,
     TimePlaceForm,
 )
-from news.models import Event, EventQuerySet, EventTicket, TimePlace, User
+from news.models import (
+    Event,
+    EventQuerySet,
+    EventTicket,
+    EventWaitlistEntry,
+    TimePlace,
+    User,
+)
 from news.views.article import NewsBaseFormMixin
+from users.search import search_users
 from util.locale_utils import short_datetime_format
-from util.logging_utils import log_request_exception
 from util.view_utils import (
     CleanNextParamMixin,
     CustomFieldsetFormMixin,
@@ -55,70 +66,31 @@ class EventListView(ListView):
 
     def get_context_data(self, **kwargs):
         queryset: EventQuerySet[Event] = self.get_queryset()
-
-        future = queryset.future().prefetch_related(
-            "timeplaces",
-            Prefetch(
-                "timeplaces",
-                queryset=TimePlace.objects.published().future().order_by("start_time"),
-                to_attr="future_timeplaces",
+        return {
+            **super().get_context_data(**kwargs),
+            "future_event_dicts": self.build_event_dicts(
+                queryset.future_listing_occurrences(one_per_event=False)
             ),
-        )
-        future_event_dicts = []
-        for event in future:
-            if not event.future_timeplaces:
-                continue
-            if event.standalone:
-                future_event_dicts.append(
-                    {
-                        "event": event,
-                        "shown_occurrence": event.future_timeplaces[0],
-                        "number_of_occurrences": event.timeplaces.count(),
-                    }
-                )
-            else:
-                future_event_dicts.extend(
-                    {
-                        "event": event,
-                        "shown_occurrence": timeplace,
-                        "number_of_occurrences": 1,
-                    }
-                    for timeplace in event.future_timeplaces
-                )
+            "past_event_dicts": self.build_event_dicts(
+                queryset.past_listing_occurrences()
+            ),
+        }
 
-        past = (
-            queryset.past()
-            .annotate(latest_occurrence=Max("timeplaces__start_time"))
-            .order_by("-latest_occurrence")
-            .prefetch_related(
-                Prefetch(
-                    "timeplaces",
-                    queryset=(
-                        TimePlace.objects.published().past().order_by("-start_time")
-                    ),
-                    to_attr="past_timeplaces",
-                ),
-            )
-        )
-        past_event_dicts = [
+    @staticmethod
+    def build_event_dicts(listing_occurrences: Iterable[TimePlace]) -> list[dict]:
+        """
+        :param listing_occurrences: Occurrences returned by e.g.
+            ``EventQuerySet.future_listing_occurrences()``
+        """
+        return [
             {
-                "event": event,
-                "shown_occurrence": event.past_timeplaces[0],
-                "number_of_occurrences": len(event.past_timeplaces),
+                "event": occurrence.event,
+                "shown_occurrence": occurrence,
+                "number_of_occurrences": occurrence.number_of_occurrences,
             }
-            for event in past
-            if event.past_timeplaces
+            for occurrence in listing_occurrences
         ]
 
-        return {
-            **super().get_context_data(**kwargs),
-            "future_event_dicts": sorted(
-                future_event_dicts,
-                key=lambda timeplace_: timeplace_["shown_occurrence"].start_time,
-            ),
-            "past_event_dicts": past_event_dicts,
-        }
-
 
 class EventDetailView(PermissionRequiredMixin, DetailView):
     model = Event
@@ -183,7 +155,7 @@ class AdminEventParticipantsSearchView(
         "form_title": _("Find events users have attended or are registered for"),
     }
 
-    user_search_fields = ["first_name", "last_name", "username", "email"]
+    users_per_page = 25
 
     def has_permission(self):
         return self.request.user.has_any_permissions_for(Event)
@@ -194,12 +166,16 @@ class AdminEventParticipantsSearchView(
         if self.query_params:
             search_string = self.query_params["search_string"]
             if search_string:
+                page = Paginator(
+                    search_users(search_string), self.users_per_page
+                ).get_page(self.query_params["page"])
                 found_users_with_tickets, found_users_without_tickets = (
-                    self.get_users_matching_search(search_string)
+                    self.get_users_with_and_without_tickets(page.object_list)
                 )
                 context_data.update(
                     {
                         "search_string": search_string,
+                        "page_obj": page,
                         "found_users_with_tickets": found_users_with_tickets,
                         "found_users_without_tickets": found_users_without_tickets,
                     }
@@ -207,22 +183,17 @@ class AdminEventParticipantsSearchView(
 
         return context_data
 
-    @classmethod
-    def get_users_matching_search(
-        cls, search_string: str
+    @staticmethod
+    def get_users_with_and_without_tickets(
+        user_pks: list[int],
     ) -> tuple[list[User], list[User]]:
-        query = Q()
-        for search_fragment in search_string.split():
-            user_search_field_subquery = Q()
-            for field in cls.user_search_fields:
-                user_search_field_subquery |= Q(
-                    **{f"{field}__icontains": search_fragment}
-                )
-            query &= user_search_field_subquery
+        """
+        Fetches the users with the provided pks, along with their tickets.
 
-        found_users = (
-            User.objects.filter(query)
-            .prefetch_related(
+        :param user_pks: The pks of the users, in the order they should be returned
+        """
+        found_users = sorted(
+            User.objects.filter(pk__in=user_pks).prefetch_related(
                 Prefetch(
                     "event_tickets",
                     queryset=EventTicket.objects.annotate(
@@ -235,8 +206,8 @@ class AdminEventParticipantsSearchView(
                     ).prefetch_related("timeplace__event", "event"),
                     to_attr="tickets",
                 ),
-            )
-            .order_by(Concat("first_name", "last_name"))
+            ),
+            key=lambda user: user_pks.index(user.pk),
         )
 
         found_users_with_tickets = []
@@ -514,12 +485,15 @@ class EventTicketCreateView(
             self.ticket_event = None
 
     def has_permission(self):
+        # Users are allowed to join the waitlist if there are no available tickets
         can_register_for_time_place = (
             self.ticket_time_place
-            and self.ticket_time_place.can_register(self.request.user)
+            and self.ticket_time_place.can_register(
+                self.request.user, ignore_ticket_limit=True
+            )
         )
         can_register_for_event = self.ticket_event and self.ticket_event.can_register(
-            self.request.user, fail_if_not_standalone=True
+            self.request.user, fail_if_not_standalone=True, ignore_ticket_limit=True
         )
         return can_register_for_time_place or can_register_for_event
 
@@ -534,6 +508,10 @@ class EventTicketCreateView(
             pass
         else:
             return HttpResponseRedirect(ticket.get_absolute_url())
+        # If the user is already on the waitlist, redirect to the event, which shows
+        # their position in the waitlist
+        if self.get_waitlist_entries().exists():
+            return HttpResponseRedirect(self.event.get_absolute_url())
         return super().dispatch(request, *args, **kwargs)
 
     def get_form_kwargs(self):
@@ -572,51 +550,73 @@ class EventTicketCreateView(
         # the ticket object)
         if not form_instance._state.adding:
             form_instance.active_last_modified = timezone.localtime()
-        ticket: EventTicket = form.save()
+        ticket: EventTicket = form.save(commit=False)
+        # The ticket email is enqueued in the same transaction as the ticket is saved
+        with transaction.atomic():
+            try:
+                # Admins are allowed to register more tickets than the number of
+                # available tickets (see `can_register()`)
+                ticket.save(
+                    enforce_ticket_limit=not self.request.user.has_perm(
+                        "news.cancel_ticket"
+                    )
+                )
+            except ValidationError:
+                # There are no available tickets - either when the form was shown, or
+                # because someone else has registered in the meantime
+                return self.join_waitlist(form)
+            form.save_m2m()
+
+            # The user is no longer waiting, if they had joined the waitlist
+            self.get_waitlist_entries().delete()
+
+            send_ticket_email(self.request, ticket)
 
         # noinspection PyAttributeOutsideInit
         # Setting the `object` field, as is done in the super class `ModelFormMixin`
         self.object = ticket
+        return HttpResponseRedirect(self.get_success_url())
 
-        email_message_dict = {
-            "type": "send_html",
-            "html_render": email.render_html(
-                self.request, {"ticket": ticket}, template_name="email/ticket.html"
-            ),
-            "text": email.render_text(
-                self.request, {"ticket": ticket}, template_name="email/ticket.txt"
-            ),
-            # Pass a pure string, instead of the proxy object from `gettext_lazy`
-            "subject": str(
-                _("Your ticket for “{title}”!").format(
-                    title=ticket.registered_event.title,
-                )
-            ),
-            "from": settings.EVENT_TICKET_EMAIL,
-            "to": ticket.email,
-        }
-        if settings.PRINT_EMAILS_TO_CONSOLE:
-            send_mail(
-                email_message_dict["subject"],
-                email_message_dict["text"],
-                email_message_dict["from"],
-                [email_message_dict["to"]],
-                html_message=email_message_dict["html_render"],
-                connection=get_connection(
-                    "django.core.mail.backends.console.EmailBackend"
-                ),
-            )
-        else:
-            try:
-                async_to_sync(get_channel_layer().send)("email", email_message_dict)
-            except Exception as e:  # noqa: BLE001
-                log_request_exception(
-                    "Sending event ticket email failed.", e, self.request
-                )
+    def join_waitlist(self, form):
+        EventWaitlistEntry.objects.get_or_create(
+            user=self.request.user,
+            timeplace=self.ticket_time_place,
+            event=self.ticket_event,
+            defaults={
+                "language": form.cleaned_data["language"],
+                "comment": form.cleaned_data["comment"],
+            },
+        )
+        return HttpResponseRedirect(self.event.get_absolute_url())
 
-        return HttpResponseRedirect(self.get_success_url())
+    def get_waitlist_entries(self):
+        return EventWaitlistEntry.objects.filter(
+            user=self.request.user,
+            timeplace=self.ticket_time_place,
+            event=self.ticket_event,
+        )
+
+    def has_available_tickets(self) -> bool:
+        registration_object = self.ticket_time_place or self.ticket_event
+        return (
+            registration_object.number_of_active_tickets
+            < registration_object.number_of_tickets
+            # Admins are allowed to register more tickets than the number of available
+            # tickets (see `can_register()`)
+            or self.request.user.has_perm("news.cancel_ticket")
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if not self.has_available_tickets():
+            context["save_button_text"] = _("Join the waitlist")
+        return context
 
     def get_form_title(self):
+        if not self.has_available_tickets():
+            return _("Join the waitlist for the event “{title}”").format(
+                title=self.event.title
+            )
         return _("Register for the event “{title}”").format(title=self.event.title)
 
     def get_back_button_link(self):
@@ -700,10 +700,111 @@ class AdminEventTicketListView(
                     ticket.email
                     for ticket in self.focused_object.tickets.filter(active=True)
                 ),
+                "participants_email_url": self.get_participants_email_url(),
                 **kwargs,
             }
         )
 
+    def get_participants_email_url(self):
+        return reverse("admin_event_participants_email", args=[self.event.pk])
+
+
+class AdminEventParticipantsEmailView(
+    PermissionRequiredMixin, CustomFieldsetFormMixin, EventRelatedViewMixin, FormView
+):
+    """Sends an email to everyone with an active ticket for the event, as a single
+    mailing job."""
+
+    form_class = EventParticipantsEmailForm
+    narrow = False
+    save_button_text = _("Send")
+
+    @property
+    def focused_object(self) -> Event | TimePlace:
+        return self.event
+
+    def has_permission(self):
+        return self.request.user.has_perm("news.change_event")
+
+    def get_form_title(self):
+        return _("Email the participants of “{title}”").format(title=self.event.title)
+
+    def get_back_button_link(self):
+        return self.get_success_url()
+
+    def get_back_button_text(self):
+        return _("Tickets for “{title}”").format(title=self.event.title)
+
+    def form_valid(self, form):
+        recipients = [
+            (ticket.email, ticket.language)
+            for ticket in self.focused_object.tickets.filter(
+                active=True
+            ).select_related("user")
+        ]
+        # Each template is only rendered once per language, instead of once per
+        # recipient
+        rendered_messages = {}
+        for language in {language for _email, language in recipients}:
+            with translation.override(language):
+                rendered_messages[language] = self.render_message(form, language)
+
+        job = create_mailing_job(
+            name=str(
+                _("Participants of “{title}”: {subject}").format(
+                    title=self.focused_object, subject=form.cleaned_data["subject"]
+                )
+            ),
+            from_email=settings.EVENT_TICKET_EMAIL,
+            rendered_messages=rendered_messages,
+            recipients=recipients,
+            created_by=self.request.user,
+        )
+        enqueue_mailing_job(job)
+        return super().form_valid(form)
+
+    def render_message(self, form, language: str) -> dict[str, str]:
+        context = {
+            "event": self.event,
+            "time_place": (
+                self.focused_object
+                if isinstance(self.focused_object, TimePlace)
+                else None
+            ),
+            "message": form.cleaned_data["message"],
+        }
+        return {
+            "subject": form.cleaned_data["subject"],
+            "text": email.render_text(
+                self.request,
+                context,
+                template_name="email/event_participants_message.txt",
+            ),
+            "html": email.render_html(
+                self.request,
+                context,
+                template_name="email/event_participants_message.html",
+            ),
+        }
+
+    def get_success_url(self):
+        return reverse("admin_event_ticket_list", args=[self.event.pk])
+
+
+class AdminTimePlaceParticipantsEmailView(
+    TimePlaceRelatedViewMixin, AdminEventParticipantsEmailView
+):
+    time_place: TimePlace
+
+    @property
+    def focused_object(self):
+        return self.time_place
+
+    def get_success_url(self):
+        return reverse(
+            "admin_time_place_ticket_list", args=[self.event.pk, self.time_place.pk]
+        )
+
 
 class AdminTimePlaceTicketListView(TimePlaceRelatedViewMixin, AdminEventTicketListView):
     time_place: TimePlace
@@ -712,6 +813,12 @@ class AdminTimePlaceTicketListView(TimePlaceRelatedViewMixin, AdminEventTicketLi
     def focused_object(self):
         return self.time_place
 
+    def get_participants_email_url(self):
+        return reverse(
+            "admin_time_place_participants_email",
+            args=[self.event.pk, self.time_place.pk],
+        )
+
 
 class EventTicketCancelView(PermissionRequiredMixin, CleanNextParamMixin, UpdateView):
     model = EventTicket
@@ -785,14 +892,36 @@ class EventTicketCancelView(PermissionRequiredMixin, CleanNextParamMixin, Update
 
         if self.ticket.active != previous_active_state:
             self.ticket.active_last_modified = timezone.localtime()
-            self.ticket.save()
+            with transaction.atomic():
+                self.ticket.save()
+                if not self.ticket.active:
+                    self.promote_next_waitlist_entry()
 
         # noinspection PyAttributeOutsideInit
         # Setting the `object` field, as is done in the super class `ModelFormMixin`
         self.object = self.ticket
         return HttpResponseRedirect(self.get_success_url())
 
+    def promote_next_waitlist_entry(self):
+        """Gives the canceled ticket's place to the user who has waited the longest
+        for a ticket - if anyone."""
+        promoted_ticket = EventWaitlistEntry.objects.filter(
+            event=self.ticket.event_id, timeplace=self.ticket.timeplace_id
+        ).promote_next()
+        if promoted_ticket:
+            send_ticket_email(self.request, promoted_ticket)
+
     def get_success_url(self):
         if self.cleaned_next_param:
             return self.cleaned_next_param
         return self.ticket.get_absolute_url()
+
+
+class EventWaitlistEntryDeleteView(PreventGetRequestsMixin, DeleteView):
+    model = EventWaitlistEntry
+
+    def get_queryset(self):
+        return self.request.user.event_waitlist_entries.all()
+
+    def get_success_url(self):
+        return self.object.registered_event.get_absolute_url()
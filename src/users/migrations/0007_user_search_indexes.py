@@ -0,0 +1,47 @@
+from django.db import migrations
+
+try:
+    from django.contrib.postgres.operations import TrigramExtension
+# (Requires a PostgreSQL driver to be installed, which it's not required to be when
+# using other database systems)
+except ImportError:
+    TrigramExtension = None
+
+# (Should match the names in `users/search.py`)
+SEARCH_FIELDS = ("first_name", "last_name", "username", "email")
+
+
+def get_trigram_index_name(field: str) -> str:
+    return f"users_user_{field}_trgm_idx"
+
+
+def add_search_indexes(apps, schema_editor):
+    # Other database systems are only used for development, and are searched without
+    # an index
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        # The indexed expression should match the one used by `icontains` lookups
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {get_trigram_index_name(field)}"
+            f" ON users_user USING gin (UPPER({field}::text) gin_trgm_ops);"
+        )
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {get_trigram_index_name(field)};")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0006_alter_id_fields_to_use_bigautofield"),
+    ]
+
+    operations = [
+        # (Does nothing for other database systems than PostgreSQL)
+        *([TrigramExtension()] if TrigramExtension else []),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,65 @@
+from django.db import connection
+from django.db.models import Q, QuerySet, Value
+from django.db.models.functions import Greatest
+
+from users.models import User
+
+# The fields that are searched by `search_users()`
+SEARCH_FIELDS = ("first_name", "last_name", "username", "email")
+
+
+def search_users(search_string: str) -> list[int]:
+    """
+    Finds the users matching all the whitespace-separated fragments of
+    ``search_string``, each fragment matching (case-insensitively) a part of any of
+    the ``SEARCH_FIELDS``.
+    For PostgreSQL, the search uses the trigram indexes created by the
+    ``0007_user_search_indexes`` migration, and the users are ranked by how well they
+    match; other database systems (which are only used for development) fall back to
+    an unindexed search, ordered by name.
+
+    :return: The pks of the found users, ordered from the best to the worst match
+    """
+    fragments = search_string.split()
+    if not fragments:
+        return []
+    if connection.vendor == "postgresql":
+        return _search_users_postgresql(fragments)
+    return list(
+        _filter_users_matching(User.objects.all(), fragments)
+        .order_by("first_name", "last_name", "pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def _filter_users_matching(users: QuerySet[User], fragments: list[str]):
+    query = Q()
+    for fragment in fragments:
+        fragment_query = Q()
+        for field in SEARCH_FIELDS:
+            fragment_query |= Q(**{f"{field}__icontains": fragment})
+        query &= fragment_query
+    return users.filter(query)
+
+
+def _search_users_postgresql(fragments: list[str]) -> list[int]:
+    # (Imported here, as it requires a PostgreSQL driver to be installed)
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    # Users matching more of the fragments more closely are ranked higher
+    rank = sum(
+        (
+            Greatest(
+                *(TrigramWordSimilarity(fragment, field) for field in SEARCH_FIELDS)
+            )
+            for fragment in fragments
+        ),
+        start=Value(0.0),
+    )
+    # (The `icontains` lookups use the trigram indexes)
+    return list(
+        _filter_users_matching(User.objects.all(), fragments)
+        .annotate(search_rank=rank)
+        .order_by("-search_rank", "first_name", "last_name", "pk")
+        .values_list("pk", flat=True)
+    )
@@ -0,0 +1,60 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from users.models import User
+from users.search import search_users
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.ola = User.objects.create_user(
+            "olanord", first_name="Ola", last_name="Nordmann", email="ola@example.com"
+        )
+        self.kari = User.objects.create_user(
+            "karinord",
+            first_name="Kari",
+            last_name="Nordmann",
+            email="kari@makentnu.no",
+        )
+        self.per = User.objects.create_user(
+            "perhans", first_name="Per", last_name="Hansen", email="per@makentnu.no"
+        )
+
+    def assert_search_finds(self, search_string: str, expected_users: set[User]):
+        self.assertSetEqual(
+            set(search_users(search_string)), {user.pk for user in expected_users}
+        )
+
+    def test_all_fragments_must_match_any_of_the_fields(self):
+        self.assert_search_finds("nordmann", {self.ola, self.kari})
+        self.assert_search_finds("NORD makentnu", {self.kari})
+        self.assert_search_finds("Per Hansen", {self.per})
+        self.assert_search_finds("ola ex", {self.ola})
+        # Fragments shorter than the trigram length should also be matched
+        self.assert_search_finds("a", {self.ola, self.kari, self.per})
+        self.assert_search_finds("ka nordmann", {self.kari})
+        self.assert_search_finds('"quoted', set())
+        self.assert_search_finds("nothing", set())
+        self.assert_search_finds(" ", set())
+
+    def test_changed_users_are_found(self):
+        self.per.first_name = "Peder"
+        self.per.save()
+        self.assert_search_finds("peder", {self.per})
+        self.per.delete()
+        self.assert_search_finds("hansen", set())
+        new_user = User.objects.create_user("newuser", first_name="Hansen")
+        self.assert_search_finds("hansen", {new_user})
+
+    @skipUnless(
+        connection.vendor == "postgresql", "Only PostgreSQL ranks the search results"
+    )
+    def test_better_matches_are_ranked_higher(self):
+        User.objects.create_user(
+            "nordmann", first_name="Nordmann", last_name="Nordmann"
+        )
+        self.assertEqual(
+            User.objects.get(pk=search_users("nordmann")[0]).username, "nordmann"
+        )
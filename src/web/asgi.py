@@ -8,7 +8,9 @@ import os
 # Should come before any of the other imports, in case they use the settings in some way
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "web.settings")
 
-from channels.routing import ChannelNameRouter, ProtocolTypeRouter
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
 # Initialize the Django ASGI application early to ensure the `AppRegistry`
@@ -16,7 +18,9 @@ from django.core.asgi import get_asgi_application
 # (based on https://github.com/django/channels/commit/0539bcf5be30a8f6ad7cabec794219879e43ab89#diff-d9b149498982c0663c3b7170398773361ed5678f1a627e9c2fd8d2c955c563db)
 django_asgi_app = get_asgi_application()
 
+from checkin import urls as checkin_urls  # noqa: E402
 from mail.email import EmailConsumer  # noqa: E402
+from make_queue import urls as make_queue_urls  # noqa: E402
 
 channel_routes = {
     "email": EmailConsumer.as_asgi(),
@@ -25,6 +29,16 @@ channel_routes = {
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
+        "websocket": AllowedHostsOriginValidator(
+            AuthMiddlewareStack(
+                URLRouter(
+                    [
+                        *make_queue_urls.websocket_urlpatterns,
+                        *checkin_urls.websocket_urlpatterns,
+                    ]
+                )
+            )
+        ),
         "channel": ChannelNameRouter(channel_routes),
     }
 )
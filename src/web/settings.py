@@ -1,6 +1,7 @@
 import copy
 import logging
 import sys
+from datetime import timedelta
 from importlib.util import find_spec
 from pathlib import Path
 
@@ -81,6 +82,10 @@ PARENT_HOST = env.PARENT_HOST
 IS_DEV_ENV = PARENT_HOST == "makentnu.dev"  # (custom setting)
 
 EVENT_TICKET_EMAIL = "ticket@makentnu.no"  # (custom setting)
+# How long before an event occurrence starts its ticket holders are reminded about it;
+# only the shortest of the lead times that have passed when the reminders are sent is
+# used (see `news.reminders.send_event_reminders()`)
+EVENT_REMINDER_LEAD_TIMES = [timedelta(days=1), timedelta(hours=2)]  # (custom setting)
 
 
 # When using more than one subdomain, the session cookie domain has to be set so that
@@ -242,6 +247,13 @@ CHANNEL_LAYERS = {
         },
     },
 }
+if is_testing:
+    # Makes it possible to test the consumers without running Redis
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
 
 # Database
 # https://docs.djangoproject.com/en/stable/ref/settings/#databases
@@ -557,6 +569,26 @@ if USE_DEBUG_TOOLBAR:
 
 # Emailing
 PRINT_EMAILS_TO_CONSOLE = DEBUG or is_testing  # (custom setting)
+# The number of recipients of a mailing job whose statuses are saved at a time, and
+# that the email consumer sends to per message (see `mail.mailing.send_mailing_job()`)
+MAILING_CHUNK_SIZE = 50  # (custom setting)
+# (Enforced between the chunks sent by the email consumer; see
+# `mail.email.EmailConsumer.send_mailing()`)
+MAILING_MAX_EMAILS_PER_SECOND = 10  # (custom setting)
+# How long the email consumer's connection to the email server can be left unused
+# before its liveness is checked the next time it's used
+# (see `mail.email.PersistentEmailConnection`)
+EMAIL_CONNECTION_MAX_IDLE_SECONDS = 60  # (custom setting)
+# The number of outbox emails that are sent at a time, and how many times each of them
+# is attempted sent - with exponentially increasing delays, starting at the base
+# delay - before giving up (see `mail.outbox`)
+EMAIL_OUTBOX_BATCH_SIZE = 50  # (custom setting)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 8  # (custom setting)
+EMAIL_OUTBOX_RETRY_BASE_DELAY_SECONDS = 60  # (custom setting)
+# How long a batch of outbox emails is claimed by the worker sending it, and how long
+# sent emails are kept before being deleted by the `send_outbox_emails` command
+EMAIL_OUTBOX_LEASE_SECONDS = 5 * 60  # (custom setting)
+EMAIL_OUTBOX_SENT_RETENTION_DAYS = 30  # (custom setting)
 EMAIL_HOST = env.EMAIL_HOST
 EMAIL_HOST_USER = env.EMAIL_HOST_USER
 EMAIL_PORT = env.EMAIL_PORT
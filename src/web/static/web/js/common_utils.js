@@ -6,3 +6,47 @@ const DisplayState = Object.freeze({
 function sleep(ms) {
     return new Promise(resolve => setTimeout(resolve, ms));
 }
+
+function connectToWebSocket(path, onMessage, onReconnect = null) {
+    /**
+     * Connects to the WebSocket at `path` on the current host, and calls `onMessage` with each received message event.
+     * If the connection is closed - e.g. when the server is restarted - it's reopened after a delay that doubles for
+     * each failed attempt, and `onReconnect` is called when it has been reopened, as messages might have been missed
+     * in the meantime.
+     *
+     * Returns an object whose `close()` method closes the connection without reopening it.
+     */
+    const protocol = window.location.protocol === "https:" ? "wss" : "ws";
+    const minReconnectDelay = 1000;
+    const maxReconnectDelay = 60 * 1000;
+    let reconnectDelay = minReconnectDelay;
+    let socket = null;
+    let isClosed = false;
+
+    function connect(isReconnecting) {
+        socket = new WebSocket(`${protocol}://${window.location.host}${path}`);
+        socket.onopen = () => {
+            reconnectDelay = minReconnectDelay;
+            if (isReconnecting && onReconnect)
+                onReconnect();
+        };
+        socket.onmessage = onMessage;
+        socket.onclose = () => {
+            if (isClosed)
+                return;
+            setTimeout(() => {
+                if (!isClosed)
+                    connect(true);
+            }, reconnectDelay);
+            reconnectDelay = Math.min(2 * reconnectDelay, maxReconnectDelay);
+        };
+    }
+
+    connect(false);
+    return {
+        close() {
+            isClosed = true;
+            socket.close();
+        },
+    };
+}
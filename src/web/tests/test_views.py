@@ -1,7 +1,9 @@
 from datetime import datetime, timedelta
 from http import HTTPStatus
 
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from django_hosts import reverse
 
@@ -199,6 +201,32 @@ class IndexPageViewTests(CleanUpTempFilesTestMixin, TestCase):
         self.assertEqual(response_event_dicts[0]["event"], public_event)
         self.assertEqual(response_event_dicts[1]["event"], private_event)
 
+    def test_number_of_queries_does_not_depend_on_number_of_events(self):
+        now = timezone.now()
+
+        def get_num_queries() -> int:
+            with CaptureQueriesContext(connection) as context:
+                self.get_response_context()
+            return len(context.captured_queries)
+
+        def create_events(*, num_events: int, days: tuple[int, ...]):
+            for i in range(num_events):
+                event = self.create_event(event_type=list(Event.Type)[i % 2])
+                for day in days:
+                    self.create_time_place(
+                        start_time=now + timedelta(days=day), event=event
+                    )
+
+        create_events(num_events=IndexPageView.MAX_EVENTS_SHOWN, days=(-1, 1, 2))
+        # Make sure that things like the image thumbnails have been generated before
+        # counting
+        get_num_queries()
+        num_queries = get_num_queries()
+        # These events start later than the ones above, so the shown events (and
+        # e.g. the queries made when rendering them) should stay the same
+        create_events(num_events=6, days=(-2, -1, 3, 4))
+        self.assertEqual(get_num_queries(), num_queries)
+
 
 class AdminPanelViewTests(TestCase):
     def setUp(self):
@@ -1,5 +1,4 @@
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from django.db.models import Prefetch
 from django.views.generic import TemplateView
 
 from announcements.models import Announcement
@@ -11,6 +10,7 @@ from make_queue.models.course import Printer3DCourse
 from make_queue.models.reservation import Quota
 from makerspace.models import Equipment
 from news.models import Article, Event, TimePlace
+from news.views.event import EventListView
 
 
 class IndexPageView(TemplateView):
@@ -20,34 +20,11 @@ class IndexPageView(TemplateView):
     template_name = "web/index.html"
 
     def get_context_data(self, **kwargs):
-        future_events = (
-            Event.objects.future()
-            .visible_to(self.request.user)
-            .prefetch_related(
-                "timeplaces",
-                Prefetch(
-                    "timeplaces",
-                    queryset=(
-                        TimePlace.objects.published().future().order_by("start_time")
-                    ),
-                    to_attr="future_timeplaces",
-                ),
-            )
-        )
-        future_event_dicts = [
-            {
-                "event": event,
-                "shown_occurrence": event.future_timeplaces[0],
-                "number_of_occurrences": event.timeplaces.count()
-                if event.standalone
-                else len(event.future_timeplaces),
-            }
-            for event in future_events
-            if event.future_timeplaces
-        ]
-
-        sorted_future_event_dicts = sorted(
-            future_event_dicts, key=lambda event: event["shown_occurrence"].start_time
+        # Fetching one more than shown, to find out whether there are more events
+        featured_occurrences = list(
+            Event.objects.visible_to(self.request.user).future_listing_occurrences(
+                one_per_event=True
+            )[: self.MAX_EVENTS_SHOWN + 1]
         )
         articles = (
             Article.objects.published()
@@ -57,8 +34,10 @@ class IndexPageView(TemplateView):
         )
         return {
             **super().get_context_data(**kwargs),
-            "featured_event_dicts": sorted_future_event_dicts[: self.MAX_EVENTS_SHOWN],
-            "more_events_exist": len(sorted_future_event_dicts) > self.MAX_EVENTS_SHOWN,
+            "featured_event_dicts": EventListView.build_event_dicts(
+                featured_occurrences[: self.MAX_EVENTS_SHOWN]
+            ),
+            "more_events_exist": len(featured_occurrences) > self.MAX_EVENTS_SHOWN,
             "featured_articles": articles[: self.MAX_ARTICLES_SHOWN],
         }
 